@@ -3,6 +3,7 @@ import time
 from aiohttp import web
 from core.utils.util import get_local_ip
 from core.api.base_handler import BaseHandler
+from core.providers.tools.device_mcp import device_mcp_schema_cache
 
 TAG = __name__
 
@@ -44,6 +45,13 @@ class OTAHandler(BaseHandler):
                 raise Exception("OTA请求设备ID为空")
 
             data_json = json.loads(data)
+            # 记录设备的板型和固件版本，用于按固件缓存设备端MCP工具列表
+            device_mcp_schema_cache.record_device_firmware(
+                device_id,
+                (data_json.get("board") or {}).get("type")
+                or request.headers.get("user-agent", ""),
+                (data_json.get("application") or {}).get("version", ""),
+            )
 
             server_config = self.config["server"]
             port = int(server_config.get("port", 8000))
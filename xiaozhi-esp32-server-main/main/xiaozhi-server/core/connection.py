@@ -28,8 +28,10 @@ from concurrent.futures import ThreadPoolExecutor
 from core.utils.dialogue import Message, Dialogue
 from core.providers.asr.dto.dto import InterfaceType
 from core.handle.textHandle import handleTextMessage
+from core.handle.fillerHandle import FillerAudioScheduler
 from core.providers.tools.unified_tool_handler import UnifiedToolHandler
-from plugins_func.loadplugins import auto_import_modules
+from core.providers.tools.device_iot.iot_state import IotStateTable
+from plugins_func.loadplugins import load_plugin_registry
 from plugins_func.register import Action, ActionResponse
 from core.auth import AuthMiddleware, AuthenticationError
 from config.config_loader import get_private_config_from_api
@@ -40,7 +42,7 @@ from config.manage_api_client import DeviceNotFoundException, DeviceBindExceptio
 
 TAG = __name__
 
-auto_import_modules("plugins_func.functions")
+load_plugin_registry("plugins_func.functions")
 
 
 class TTSException(RuntimeError):
@@ -125,9 +127,12 @@ class ConnectionHandler:
 
         # tts相关变量
         self.sentence_id = None
+        # 首段语音迟迟未到时播放的垫话
+        self.filler_audio = None
 
         # iot相关变量
         self.iot_descriptors = {}
+        self.iot_state_table = IotStateTable()
         self.func_handler = None
 
         self.cmd_exit = self.config["exit_commands"]
@@ -331,6 +336,9 @@ class ConnectionHandler:
             asyncio.run_coroutine_threadsafe(
                 self.tts.open_audio_channels(self), self.loop
             )
+            # 预先合成垫话
+            self.filler_audio = FillerAudioScheduler(self)
+            asyncio.run_coroutine_threadsafe(self.filler_audio.prepare(), self.loop)
 
             """加载记忆"""
             self._initialize_memory()
@@ -597,6 +605,8 @@ class ConnectionHandler:
 
         if not tool_call:
             self.dialogue.put(Message(role="user", content=query))
+            if self.filler_audio:
+                self.filler_audio.start()
 
         # Define intent functions
         functions = None
@@ -629,6 +639,8 @@ class ConnectionHandler:
                 )
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
+            if self.filler_audio:
+                self.filler_audio.cancel()
             return None
 
         # 处理流式响应
@@ -685,6 +697,7 @@ class ConnectionHandler:
                     )
                     text_index += 1
         # 处理function call
+        tool_handled = False
         if tool_call_flag:
             bHasError = False
             if function_id is None:
@@ -718,6 +731,10 @@ class ConnectionHandler:
                     "arguments": function_arguments,
                 }
 
+                # 工具执行和再次请求大模型期间尽早播放垫话
+                if self.filler_audio:
+                    self.filler_audio.hurry()
+                tool_handled = True
                 # 使用统一工具处理器处理所有工具调用
                 result = asyncio.run_coroutine_threadsafe(
                     self.func_handler.handle_llm_function_call(
@@ -740,6 +757,9 @@ class ConnectionHandler:
                     content_type=ContentType.ACTION,
                 )
             )
+        elif not tool_handled and self.filler_audio:
+            # 本轮没有需要播放的语音
+            self.filler_audio.cancel()
         self.llm_finish_task = True
         self.logger.bind(tag=TAG).debug(
             json.dumps(self.dialogue.get_llm_dialogue(), indent=4, ensure_ascii=False)
@@ -789,8 +809,8 @@ class ConnectionHandler:
             text = result.response if result.response else result.result
             self.tts.tts_one_sentence(self, ContentType.TEXT, content_detail=text)
             self.dialogue.put(Message(role="assistant", content=text))
-        else:
-            pass
+        elif self.filler_audio:
+            self.filler_audio.cancel()
 
     def _report_worker(self):
         """聊天记录上报工作线程"""
@@ -852,6 +872,10 @@ class ConnectionHandler:
             # 清空任务队列
             self.clear_queues()
 
+            # 释放TTS合成线程池和连接
+            if self.tts:
+                await self.tts.close()
+
             # 关闭WebSocket连接
             if ws:
                 await ws.close()
@@ -888,6 +912,11 @@ class ConnectionHandler:
                     except queue.Empty:
                         break
 
+            # 取消已排队但尚未开始的句子合成
+            self.tts.cancel_pending_synthesis()
+            if self.filler_audio:
+                self.filler_audio.cancel()
+
             self.logger.bind(tag=TAG).debug(
                 f"清理结束: TTS队列大小={self.tts.tts_text_queue.qsize()}, 音频队列大小={self.tts.tts_audio_queue.qsize()}"
             )
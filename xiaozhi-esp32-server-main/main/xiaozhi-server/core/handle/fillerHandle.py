@@ -0,0 +1,206 @@
+import time
+import random
+import asyncio
+from core.handle.sendAudioHandle import send_tts_message
+
+TAG = __name__
+
+# 大模型首字较慢时的垫话
+DEFAULT_TEXTS = ["嗯，让我想想"]
+# 调用工具时的垫话
+DEFAULT_TOOL_TEXTS = ["好的，我查一下"]
+
+
+class FillerAudioScheduler:
+    """
+    垫话调度器，每个连接一个
+
+    一轮对话开始后，超过设定时间仍没有播放语音（工具调用耗时或大模型首字较慢）时，
+    播放一句垫话，避免设备长时间无声。垫话能进入TTS音频缓存时在连接建立时预先合成，
+    同一音色只合成一次；否则第一次用到时才合成，合成期间不播放。
+    真正的语音开始播放前由sendAudioMessage停止垫话：在帧边界停止发送，
+    补发sentence_end后再开始下一句，设备界面的句子状态保持一致；打断时直接停止。
+    start、hurry、cancel可以在对话线程中调用，其余方法在服务器事件循环上执行。
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        config = conn.config.get("filler_audio") or {}
+        self.enable = str(config.get("enable", False)).lower() in ("true", "1", "yes")
+        self.deadline = float(config.get("deadline", 2.5))
+        self.tool_deadline = float(config.get("tool_deadline", 1.0))
+        self.texts = list(config.get("texts") or DEFAULT_TEXTS)
+        self.tool_texts = list(config.get("tool_texts") or DEFAULT_TOOL_TEXTS)
+
+        # 文本 -> 已合成的音频帧
+        self._audios = {}
+        # 正在按需合成的垫话
+        self._synthesizing = set()
+        self._synthesis_tasks = set()
+        self._timer = None
+        self._fire_at = None
+        self._texts = self.texts
+        # 本轮对话是否已经开始播放语音
+        self._audio_started = True
+        self._stopping = False
+        self._task = None
+        # 每轮对话开始和取消时递增，过期的计时回调据此忽略
+        self._generation = 0
+
+    async def prepare(self):
+        """
+        预先合成能进入TTS音频缓存的垫话，同一音色的连接共用缓存，只合成一次。
+
+        不能缓存的垫话（PCM格式、未启用缓存）每个连接都要重新合成，
+        不在连接建立时合成，第一次用到时再合成。
+        """
+        tts = self.conn.tts
+        if not self.enable or tts is None:
+            return
+        for text in dict.fromkeys(self.texts + self.tool_texts):
+            if text in self._audios or not tts._get_cache_key(text):
+                continue
+            audio_datas = await self._synthesize(text)
+            if audio_datas:
+                self._audios[text] = audio_datas
+
+    async def _synthesize(self, text):
+        """在工作线程中合成垫话，失败时返回None"""
+        try:
+            return await asyncio.to_thread(self.conn.tts._text_to_audio_datas, text)
+        except Exception as e:
+            self.conn.logger.bind(tag=TAG).warning(f"垫话合成失败: {text} {e}")
+            return None
+
+    def start(self):
+        """一轮对话开始，超过deadline仍没有语音时播放垫话"""
+        if self.enable:
+            self.conn.loop.call_soon_threadsafe(self._start)
+
+    def hurry(self):
+        """开始调用工具，超过tool_deadline仍没有语音时播放工具垫话"""
+        if self.enable:
+            self.conn.loop.call_soon_threadsafe(self._hurry)
+
+    def cancel(self):
+        """本轮不会再有语音或对话被打断，取消尚未播放的垫话并停止正在播放的垫话"""
+        self.conn.loop.call_soon_threadsafe(self._cancel)
+
+    async def stop(self):
+        """真正的语音即将播放：取消垫话计时，等待正在播放的垫话在帧边界停止"""
+        self._audio_started = True
+        self._cancel_timer()
+        task = self._task
+        if task is not None and not task.done():
+            self._stopping = True
+            await asyncio.gather(task, return_exceptions=True)
+
+    def _start(self):
+        self._cancel_timer()
+        self._generation += 1
+        self._audio_started = False
+        self._texts = self.texts
+        self._schedule(self.deadline)
+
+    def _cancel(self):
+        self._generation += 1
+        self._audio_started = True
+        self._stopping = True
+        self._cancel_timer()
+
+    def _hurry(self):
+        if self._audio_started:
+            return
+        self._texts = self.tool_texts
+        fire_at = time.monotonic() + self.tool_deadline
+        if self._fire_at is None or fire_at < self._fire_at:
+            self._cancel_timer()
+            self._schedule(self.tool_deadline)
+
+    def _schedule(self, delay):
+        self._fire_at = time.monotonic() + delay
+        self._timer = self.conn.loop.call_later(
+            delay, self._on_deadline, self._generation
+        )
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._fire_at = None
+
+    def _on_deadline(self, generation):
+        if generation != self._generation:
+            return
+        self._timer = None
+        self._fire_at = None
+        if self._audio_started or self.conn.client_abort:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        if not self._texts:
+            return
+        text = random.choice(self._texts)
+        if text in self._audios:
+            self._play_filler(text, self._audios[text])
+        elif text not in self._synthesizing and self.conn.tts is not None:
+            self._synthesizing.add(text)
+            task = asyncio.create_task(self._synthesize_and_play(text, generation))
+            self._synthesis_tasks.add(task)
+            task.add_done_callback(self._synthesis_tasks.discard)
+
+    async def _synthesize_and_play(self, text, generation):
+        """第一次用到的垫话先合成，合成完成时本轮仍没有语音才播放"""
+        try:
+            audio_datas = await self._synthesize(text)
+        finally:
+            self._synthesizing.discard(text)
+        if not audio_datas:
+            return
+        self._audios[text] = audio_datas
+        if generation != self._generation or self._audio_started:
+            return
+        if self.conn.client_abort:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        self._play_filler(text, audio_datas)
+
+    def _play_filler(self, text, audios):
+        self._stopping = False
+        self._task = asyncio.create_task(self._play(text, audios))
+
+    async def _play(self, text, audios):
+        conn = self.conn
+        conn.logger.bind(tag=TAG).info(f"播放垫话: {text}")
+        try:
+            await send_tts_message(conn, "sentence_start", text)
+            await self._send_frames(audios)
+            # 被打断时设备已收到stop，不再补发sentence_end
+            if not conn.client_abort:
+                await send_tts_message(conn, "sentence_end", text)
+        except Exception as e:
+            conn.logger.bind(tag=TAG).warning(f"播放垫话失败: {text} {e}")
+
+    async def _send_frames(self, audios):
+        conn = self.conn
+        frame_duration = 60  # 帧时长（毫秒），匹配 Opus 编码
+        # 不预缓冲，只领先设备一帧发送，停止时设备上残留的垫话不超过一帧
+        start_time = time.perf_counter()
+        play_position = 0
+        for opus_packet in audios:
+            if self._stopping or conn.client_abort:
+                return
+
+            # 重置没有声音的状态
+            conn.last_activity_time = time.time() * 1000
+
+            expected_time = start_time + (play_position / 1000)
+            delay = expected_time - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                if self._stopping or conn.client_abort:
+                    return
+
+            await conn.websocket.send(opus_packet)
+            play_position += frame_duration
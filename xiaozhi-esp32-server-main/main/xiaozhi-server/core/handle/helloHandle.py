@@ -11,6 +11,7 @@ from core.providers.tools.device_mcp import (
     MCPClient,
     send_mcp_initialize_message,
     send_mcp_tools_list_request,
+    load_cached_mcp_tools,
 )
 from core.utils.wakeup_word import WakeupWordsConfig
 
@@ -43,6 +44,8 @@ async def handleHelloMessage(conn, msg_json):
         if features.get("mcp"):
             conn.logger.bind(tag=TAG).info("客户端支持MCP")
             conn.mcp_client = MCPClient()
+            # 同一固件的工具列表已缓存时直接使用，下面的tools/list仅用于后台校验
+            await load_cached_mcp_tools(conn, conn.mcp_client)
             # 发送初始化
             asyncio.create_task(send_mcp_initialize_message(conn))
             # 发送mcp消息，获取tools列表
@@ -83,7 +86,9 @@ async def checkWakeupWords(conn, text):
 
     # 播放唤醒词回复
     conn.client_abort = False
-    opus_packets, _ = audio_to_data(response.get("file_path"))
+    opus_packets, _ = await asyncio.to_thread(
+        audio_to_data, response.get("file_path")
+    )
 
     conn.logger.bind(tag=TAG).info(f"播放唤醒词回复: {response.get('text')}")
     await sendAudioMessage(conn, SentenceType.FIRST, opus_packets, response.get("text"))
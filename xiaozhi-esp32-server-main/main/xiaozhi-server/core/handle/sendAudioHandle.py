@@ -1,7 +1,9 @@
 import json
 import asyncio
 import time
+from contextlib import aclosing
 from core.providers.tts.dto.dto import SentenceType
+from core.utils.audio_stream import AudioStream
 from core.utils.util import get_string_no_punctuation_or_emoji, analyze_emotion
 from loguru import logger
 
@@ -33,6 +35,10 @@ emoji_map = {
 
 
 async def sendAudioMessage(conn, sentenceType, audios, text):
+    # 真正的语音开始播放，停止垫话
+    if conn.filler_audio:
+        await conn.filler_audio.stop()
+
     # 发送句子开始消息
     conn.logger.bind(tag=TAG).info(f"发送音频消息: {sentenceType}, {text}")
     if text is not None:
@@ -56,7 +62,10 @@ async def sendAudioMessage(conn, sentenceType, audios, text):
 
     await send_tts_message(conn, "sentence_start", text)
 
-    await sendAudio(conn, audios, pre_buffer)
+    if isinstance(audios, AudioStream):
+        await sendAudioStream(conn, audios, pre_buffer)
+    else:
+        await sendAudio(conn, audios, pre_buffer)
 
     await send_tts_message(conn, "sentence_end", text)
 
@@ -107,6 +116,39 @@ async def sendAudio(conn, audios, pre_buffer=True):
         play_position += frame_duration
 
 
+# 流式播放音频文件，边读取边发送
+async def sendAudioStream(conn, stream, pre_buffer=True):
+    frame_duration = 60  # 帧时长（毫秒），匹配 Opus 编码
+    pre_buffer_frames = 3 if pre_buffer else 0
+    start_time = None
+    play_position = 0
+
+    async with aclosing(stream.frames()) as frames:
+        async for opus_packet in frames:
+            if conn.client_abort:
+                break
+
+            # 重置没有声音的状态
+            conn.last_activity_time = time.time() * 1000
+
+            # 预缓冲的帧直接发送，之后按帧时长控制发送节奏
+            if pre_buffer_frames > 0:
+                pre_buffer_frames -= 1
+                await conn.websocket.send(opus_packet)
+                continue
+            if start_time is None:
+                start_time = time.perf_counter()
+
+            expected_time = start_time + (play_position / 1000)
+            delay = expected_time - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await conn.websocket.send(opus_packet)
+
+            play_position += frame_duration
+
+
 async def send_tts_message(conn, state, text=None):
     """发送 TTS 状态消息"""
     message = {"type": "tts", "state": state, "session_id": conn.session_id}
@@ -4,6 +4,8 @@ from config.logger import setup_logging
 from core.api.ota_handler import OTAHandler
 from core.api.vision_handler import VisionHandler
 from core.handle.receiveAudioHandle import startToChat
+from core.utils.tts_cache import tts_audio_cache
+from core.utils.opus_encoder_utils import opus_encoder_pool
 import json
 
 TAG = __name__
@@ -61,6 +63,14 @@ class SimpleHttpServer:
         except Exception as e:
             return web.json_response({"status": "error", "msg": str(e)}, status=500)
 
+    async def tts_cache_stats_handler(self, request):
+        """TTS音频缓存的命中率和节省的音频字节数"""
+        return web.json_response(tts_audio_cache.get_statistics())
+
+    async def opus_encoder_stats_handler(self, request):
+        """Opus编码器池的复用次数和编码帧数"""
+        return web.json_response(opus_encoder_pool.get_statistics())
+
     async def start(self):
         server_config = self.config["server"]
         host = server_config.get("ip", "0.0.0.0")
@@ -87,6 +97,10 @@ class SimpleHttpServer:
                     web.post("/mcp/vision/explain", self.vision_handler.handle_post),
                     web.options("/mcp/vision/explain", self.vision_handler.handle_post),
                     web.post("/xiaozhi/temperature_alert", self.temperature_alert_handler),
+                    web.get("/xiaozhi/tts_cache/stats", self.tts_cache_stats_handler),
+                    web.get(
+                        "/xiaozhi/opus_encoder/stats", self.opus_encoder_stats_handler
+                    ),
                 ]
             )
 
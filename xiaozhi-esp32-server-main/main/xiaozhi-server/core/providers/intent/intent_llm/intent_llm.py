@@ -1,11 +1,16 @@
 from typing import List, Dict
 from ..base import IntentProviderBase
-from plugins_func.functions.play_music import initialize_music_handler
+from plugins_func.functions.play_music import (
+    initialize_music_handler,
+    search_music_candidates,
+)
+from plugins_func.functions.hass_init import get_hass_devices
 from config.logger import setup_logging
 import re
 import json
 import hashlib
 import time
+from collections import OrderedDict
 
 TAG = __name__
 logger = setup_logging()
@@ -15,7 +20,9 @@ class IntentProvider(IntentProviderBase):
     def __init__(self, config):
         super().__init__(config)
         self.llm = None
-        self.promot = ""
+        # 按工具集与动态列表指纹缓存渲染好的意图提示词，不同设备互不干扰
+        self.prompt_cache = OrderedDict()
+        self.prompt_cache_max_size = 32
         # 添加缓存管理
         self.intent_cache = {}  # 缓存意图识别结果
         self.cache_expiry = 600  # 缓存有效期10分钟
@@ -123,6 +130,61 @@ class IntentProvider(IntentProviderBase):
             for key, _ in sorted_items[: len(sorted_items) - self.cache_max_size]:
                 del self.intent_cache[key]
 
+    def _get_prompt_functions(self, conn):
+        """获取当前连接可用的函数描述包，以及描述包中缺少的设备端MCP工具"""
+        bundle = conn.func_handler.get_function_bundle()
+        extra_tools = []
+        if hasattr(conn, "mcp_client"):
+            mcp_tools = conn.mcp_client.get_available_tools()
+            if mcp_tools:
+                exist_names = set(bundle.names)
+                for tool in mcp_tools:
+                    if tool.get("function", {}).get("name") not in exist_names:
+                        extra_tools.append(tool)
+        return bundle, extra_tools
+
+    def _get_hass_devices(self, conn) -> List[str]:
+        """获取Home Assistant设备列表，开启auto_devices时随状态镜像自动更新"""
+        if conn.config["plugins"].get("home_assistant"):
+            return get_hass_devices(conn)
+        return []
+
+    def get_system_prompt(self, conn):
+        """
+        获取当前连接的意图识别系统提示词
+        以工具schema和HA设备列表的指纹作为缓存键，只有在其中任意一项变化时才重新渲染
+        候选歌曲与用户语句相关，不进入缓存，由detect_intent按需追加
+        Returns:
+            (提示词指纹, 系统提示词)
+        """
+        bundle, extra_tools = self._get_prompt_functions(conn)
+        devices = self._get_hass_devices(conn)
+
+        # 函数描述包的哈希即代表工具集内容，只需额外计算HA设备等少量数据的指纹
+        fingerprint = hashlib.md5(
+            json.dumps(
+                [bundle.version, extra_tools, devices],
+                sort_keys=True,
+                ensure_ascii=False,
+            ).encode()
+        ).hexdigest()
+
+        prompt = self.prompt_cache.get(fingerprint)
+        if prompt is not None:
+            self.prompt_cache.move_to_end(fingerprint)
+            return fingerprint, prompt
+
+        prompt = self.get_intent_system_prompt(list(bundle.functions) + extra_tools)
+        if len(devices) > 0:
+            prompt += "\n下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
+            prompt += "".join(device + "\n" for device in devices)
+
+        self.prompt_cache[fingerprint] = prompt
+        if len(self.prompt_cache) > self.prompt_cache_max_size:
+            self.prompt_cache.popitem(last=False)
+        logger.bind(tag=TAG).debug(f"渲染意图识别提示词: {fingerprint}")
+        return fingerprint, prompt
+
     def replyResult(self, text: str, original_text: str):
         llm_result = self.llm.response_no_stream(
             system_prompt=text,
@@ -144,8 +206,18 @@ class IntentProvider(IntentProviderBase):
         model_info = getattr(self.llm, "model_name", str(self.llm.__class__.__name__))
         logger.bind(tag=TAG).debug(f"使用意图识别模型: {model_info}")
 
-        # 计算缓存键
-        cache_key = hashlib.md5(text.encode()).hexdigest()
+        # 获取当前连接对应的系统提示词
+        prompt_key, prompt = self.get_system_prompt(conn)
+
+        # 只注入与当前语句相关的少量候选歌曲，提示词长度不随曲库规模增长
+        music_names = search_music_candidates(conn, text)
+        prompt_music = f"{prompt}\n<musicNames>{music_names}\n</musicNames>"
+        music_version = initialize_music_handler(conn).get("music_version", 0)
+
+        # 计算缓存键，工具集不同的设备不能共用意图结果
+        cache_key = hashlib.md5(
+            f"{prompt_key}:{music_version}:{text}".encode()
+        ).hexdigest()
 
         # 检查缓存
         if cache_key in self.intent_cache:
@@ -161,32 +233,6 @@ class IntentProvider(IntentProviderBase):
         # 清理缓存
         self.clean_cache()
 
-        if self.promot == "":
-            functions = conn.func_handler.get_functions()
-            if hasattr(conn, "mcp_client"):
-                mcp_tools = conn.mcp_client.get_available_tools()
-                if mcp_tools is not None and len(mcp_tools) > 0:
-                    if functions is None:
-                        functions = []
-                    functions.extend(mcp_tools)
-
-            self.promot = self.get_intent_system_prompt(functions)
-
-        music_config = initialize_music_handler(conn)
-        music_file_names = music_config["music_file_names"]
-        prompt_music = f"{self.promot}\n<musicNames>{music_file_names}\n</musicNames>"
-
-        home_assistant_cfg = conn.config["plugins"].get("home_assistant")
-        if home_assistant_cfg:
-            devices = home_assistant_cfg.get("devices", [])
-        else:
-            devices = []
-        if len(devices) > 0:
-            hass_prompt = "\n下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
-            for device in devices:
-                hass_prompt += device + "\n"
-            prompt_music += hass_prompt
-
         logger.bind(tag=TAG).debug(f"User prompt: {prompt_music}")
 
         # 构建用户对话历史的提示
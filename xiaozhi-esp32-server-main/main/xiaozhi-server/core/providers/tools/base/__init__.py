@@ -2,5 +2,15 @@
 
 from .tool_types import ToolType, ToolDefinition
 from .tool_executor import ToolExecutor
+from .tool_cache import ToolResultCache, tool_result_cache
+from .tool_bundle import FunctionBundle, build_function_bundle
 
-__all__ = ["ToolType", "ToolDefinition", "ToolExecutor"]
+__all__ = [
+    "ToolType",
+    "ToolDefinition",
+    "ToolExecutor",
+    "ToolResultCache",
+    "tool_result_cache",
+    "FunctionBundle",
+    "build_function_bundle",
+]
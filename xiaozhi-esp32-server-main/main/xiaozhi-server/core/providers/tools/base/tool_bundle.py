@@ -0,0 +1,54 @@
+"""函数描述包
+
+把一组工具的函数描述、工具名称和内容哈希打包。
+工具集相同的连接共享同一个描述包，工具变化时整体替换，每轮对话只需读取引用。
+"""
+
+import json
+import hashlib
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+
+@dataclass(frozen=True)
+class FunctionBundle:
+    """
+    函数描述包
+
+    functions为元组，描述字典在所有连接之间共享，调用方需要修改时先复制。
+    """
+
+    version: str  # 内容哈希，可作为提示词缓存键
+    functions: Tuple[Dict[str, Any], ...]  # 函数描述（OpenAI函数调用格式）
+    names: Tuple[str, ...]  # 工具名称
+
+
+# 按内容哈希复用描述包，没有连接引用时自动释放
+_bundles: "weakref.WeakValueDictionary[str, FunctionBundle]" = (
+    weakref.WeakValueDictionary()
+)
+_bundles_lock = threading.Lock()
+
+
+def build_function_bundle(
+    functions: List[Dict[str, Any]], names: List[str]
+) -> FunctionBundle:
+    """根据函数描述生成描述包，内容相同时返回已有的共享实例"""
+    version = hashlib.md5(
+        json.dumps([functions, names], sort_keys=True, ensure_ascii=False).encode(
+            "utf-8"
+        )
+    ).hexdigest()
+
+    with _bundles_lock:
+        bundle = _bundles.get(version)
+        if bundle is None:
+            bundle = FunctionBundle(
+                version=version,
+                functions=tuple(functions),
+                names=tuple(names),
+            )
+            _bundles[version] = bundle
+        return bundle
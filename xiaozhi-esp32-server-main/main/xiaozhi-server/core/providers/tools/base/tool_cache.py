@@ -0,0 +1,146 @@
+"""工具调用结果缓存
+
+进程内所有连接共享，按工具声明的TTL缓存结果，并对并发的相同调用做single-flight合并，
+同一时刻相同参数的调用只会真正请求一次上游服务。
+"""
+
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class ToolResultCache:
+    """带TTL的LRU结果缓存，支持异步与同步两种single-flight调用方式"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._async_inflight: Dict[str, asyncio.Future] = {}
+        self._sync_inflight: Dict[str, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """读取缓存，返回(是否命中, 值)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expire_at, value = entry
+            if expire_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: float):
+        """写入缓存"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, prefix: str):
+        """删除以prefix开头的所有缓存项"""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    async def get_or_execute(
+        self,
+        key: str,
+        ttl: float,
+        func: Callable[[], Awaitable[Any]],
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """异步读取缓存，未命中时执行func；并发的相同key只执行一次"""
+        while True:
+            hit, value = self.get(key)
+            if hit:
+                self.hits += 1
+                return value
+
+            inflight = self._async_inflight.get(key)
+            if inflight is None:
+                break
+            # 等待正在进行的相同调用，自身被取消时不影响该调用
+            self.merged += 1
+            await asyncio.wait({inflight})
+            if not inflight.cancelled():
+                return inflight.result()
+            # 正在进行的调用被取消（如超时），重新发起
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._async_inflight[key] = future
+        try:
+            value = await func()
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免出现未获取的异常警告
+            future.exception()
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def get_or_load(
+        self,
+        key: str,
+        ttl: float,
+        func: Callable[[], Any],
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """同步读取缓存，供插件在线程中缓存上游请求；并发的相同key只执行一次"""
+        while True:
+            hit, value = self.get(key)
+            if hit:
+                self.hits += 1
+                return value
+            with self._lock:
+                event = self._sync_inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._sync_inflight[key] = event
+                    break
+            # 等待正在进行的相同请求完成后重新读取缓存
+            self.merged += 1
+            event.wait()
+            hit, value = self.get(key)
+            if hit:
+                return value
+
+        self.misses += 1
+        try:
+            value = func()
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl)
+            return value
+        finally:
+            with self._lock:
+                self._sync_inflight.pop(key, None)
+            event.set()
+
+    def get_statistics(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "merged": self.merged,
+        }
+
+
+# 进程内共享的工具结果缓存
+tool_result_cache = ToolResultCache()
@@ -2,8 +2,8 @@
 
 from enum import Enum
 
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
 from plugins_func.register import Action
 
 
@@ -25,3 +25,8 @@ class ToolDefinition:
     description: Dict[str, Any]  # 工具描述（OpenAI函数调用格式）
     tool_type: ToolType  # 工具类型
     parameters: Optional[Dict[str, Any]] = None  # 额外参数
+    order_sensitive: bool = False  # 多函数调用时是否需要按声明顺序执行
+    timeout: Optional[float] = None  # 单次调用超时时间(秒)，None表示使用全局配置
+    cache_ttl: Optional[float] = None  # 结果缓存时间(秒)，None表示不缓存
+    cache_key: Optional[Callable[[Any, Dict[str, Any]], Optional[str]]] = None  # 自定义缓存键
+    cache_invalidates: List[str] = field(default_factory=list)  # 调用后需要清除缓存的工具
@@ -2,17 +2,58 @@
 
 import json
 import asyncio
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 from ..base import ToolType, ToolDefinition, ToolExecutor
 from plugins_func.register import Action, ActionResponse
 
 
+class IotCommandBatcher:
+    """IoT命令合并发送器
+
+    等待窗口内提交的命令按提交顺序合并为一条iot消息的commands数组，
+    大模型一轮返回多个控制调用时设备只收到一帧消息。
+    """
+
+    def __init__(self, conn, window: float = 0.05):
+        self.conn = conn
+        self.window = window
+        self.pending: List[Dict[str, Any]] = []
+        self.flush_future: Optional[asyncio.Future] = None
+
+    async def send(self, command: Dict[str, Any]):
+        """提交一条命令，等待所在批次发送完成，发送失败时抛出异常"""
+        self.pending.append(command)
+        if self.flush_future is None:
+            self.flush_future = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._flush(self.flush_future))
+        await asyncio.shield(self.flush_future)
+
+    async def _flush(self, future: asyncio.Future):
+        if self.window > 0:
+            await asyncio.sleep(self.window)
+        commands, self.pending = self.pending, []
+        self.flush_future = None
+        try:
+            await self.conn.websocket.send(
+                json.dumps({"type": "iot", "commands": commands})
+            )
+            future.set_result(len(commands))
+        except Exception as e:
+            future.set_exception(e)
+            # 没有调用方等待时避免未获取异常的警告
+            future.exception()
+
+
 class DeviceIoTExecutor(ToolExecutor):
     """设备端IoT工具执行器"""
 
     def __init__(self, conn):
         self.conn = conn
         self.iot_tools: Dict[str, ToolDefinition] = {}
+        tool_call_config = conn.config.get("tool_call") or {}
+        self.command_batcher = IotCommandBatcher(
+            conn, float(tool_call_config.get("iot_batch_window", 0.05))
+        )
 
     async def execute(
         self, conn, tool_name: str, arguments: Dict[str, Any]
@@ -101,36 +142,20 @@ class DeviceIoTExecutor(ToolExecutor):
 
     async def _get_iot_status(self, device_name: str, property_name: str):
         """获取IoT设备状态"""
-        for key, value in self.conn.iot_descriptors.items():
-            if key.lower() == device_name.lower():
-                for property_item in value.properties:
-                    if property_item["name"].lower() == property_name.lower():
-                        return property_item["value"]
-        return None
+        return self.conn.iot_state_table.get_value(device_name, property_name)
 
     async def _send_iot_command(
         self, device_name: str, method_name: str, parameters: Dict[str, Any]
     ):
-        """发送IoT控制命令"""
-        for key, value in self.conn.iot_descriptors.items():
-            if key.lower() == device_name.lower():
-                for method in value.methods:
-                    if method["name"].lower() == method_name.lower():
-                        command = {
-                            "name": key,
-                            "method": method["name"],
-                        }
-
-                        if parameters:
-                            command["parameters"] = parameters
-
-                        send_message = json.dumps(
-                            {"type": "iot", "commands": [command]}
-                        )
-                        await self.conn.websocket.send(send_message)
-                        return
-
-        raise Exception(f"未找到设备{device_name}的方法{method_name}")
+        """发送IoT控制命令，短时间内的多条命令合并为一条消息发送"""
+        method = self.conn.iot_state_table.get_method(device_name, method_name)
+        if method is None:
+            raise Exception(f"未找到设备{device_name}的方法{method_name}")
+
+        command = {"name": method[0], "method": method[1]}
+        if parameters:
+            command["parameters"] = parameters
+        await self.command_batcher.send(command)
 
     def register_iot_tools(self, descriptors: list):
         """注册IoT工具"""
@@ -51,6 +51,7 @@ async def handleIotDescriptors(conn, descriptors):
             descriptor["methods"],
         )
         conn.iot_descriptors[descriptor["name"]] = iot_descriptor
+        conn.iot_state_table.register(iot_descriptor)
         functions_changed = True
 
     # 如果注册了新函数，更新function描述列表
@@ -64,20 +65,14 @@ async def handleIotDescriptors(conn, descriptors):
 async def handleIotStatus(conn, states):
     """处理物联网状态"""
     for state in states:
-        for key, value in conn.iot_descriptors.items():
-            if key == state["name"]:
-                for property_item in value.properties:
-                    for k, v in state["state"].items():
-                        if property_item["name"] == k:
-                            if type(v) != type(property_item["value"]):
-                                logger.bind(tag=TAG).error(
-                                    f"属性{property_item['name']}的值类型不匹配"
-                                )
-                                break
-                            else:
-                                property_item["value"] = v
-                                logger.bind(tag=TAG).info(
-                                    f"物联网状态更新: {key} , {property_item['name']} = {v}"
-                                )
-                            break
-                break
+        for k, v in state["state"].items():
+            property_item = conn.iot_state_table.get_property(state["name"], k)
+            if property_item is None:
+                continue
+            if type(v) != type(property_item["value"]):
+                logger.bind(tag=TAG).error(f"属性{property_item['name']}的值类型不匹配")
+                continue
+            property_item["value"] = v
+            logger.bind(tag=TAG).info(
+                f"物联网状态更新: {state['name']} , {property_item['name']} = {v}"
+            )
@@ -0,0 +1,49 @@
+"""IoT设备状态表
+
+按(设备名, 属性名)和(设备名, 方法名)建立索引，名称不区分大小写，
+状态查询、状态更新和命令查找都是O(1)，不再逐个遍历设备描述符。
+"""
+
+from typing import Any, Dict, Optional, Tuple
+from .iot_descriptor import IotDescriptor
+
+
+class IotStateTable:
+    """单个连接上的IoT设备属性和方法索引"""
+
+    def __init__(self):
+        # (设备名小写, 属性名小写) -> 描述符中的属性项，与描述符共用同一个字典
+        self.properties: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # (设备名小写, 方法名小写) -> (设备名, 方法名)
+        self.methods: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def register(self, descriptor: IotDescriptor):
+        """登记设备描述符，同名设备重复上报时覆盖旧的索引"""
+        device_key = descriptor.name.lower()
+        self.properties = {
+            key: value for key, value in self.properties.items() if key[0] != device_key
+        }
+        self.methods = {
+            key: value for key, value in self.methods.items() if key[0] != device_key
+        }
+        for property_item in descriptor.properties:
+            self.properties[(device_key, property_item["name"].lower())] = property_item
+        for method in descriptor.methods:
+            self.methods[(device_key, method["name"].lower())] = (
+                descriptor.name,
+                method["name"],
+            )
+
+    def get_property(self, device_name: str, property_name: str) -> Optional[Dict]:
+        return self.properties.get((device_name.lower(), property_name.lower()))
+
+    def get_value(self, device_name: str, property_name: str) -> Any:
+        """读取属性值，设备或属性不存在时返回None"""
+        property_item = self.get_property(device_name, property_name)
+        return property_item["value"] if property_item else None
+
+    def get_method(
+        self, device_name: str, method_name: str
+    ) -> Optional[Tuple[str, str]]:
+        """查找设备方法，返回设备和方法的原始名称"""
+        return self.methods.get((device_name.lower(), method_name.lower()))
@@ -6,8 +6,10 @@ from .mcp_handler import (
     handle_mcp_message,
     send_mcp_initialize_message,
     send_mcp_tools_list_request,
+    load_cached_mcp_tools,
     call_mcp_tool,
 )
+from .mcp_schema_cache import DeviceMCPSchemaCache, device_mcp_schema_cache
 from .mcp_executor import DeviceMCPExecutor
 
 __all__ = [
@@ -16,6 +18,9 @@ __all__ = [
     "handle_mcp_message",
     "send_mcp_initialize_message",
     "send_mcp_tools_list_request",
+    "load_cached_mcp_tools",
     "call_mcp_tool",
     "DeviceMCPExecutor",
+    "DeviceMCPSchemaCache",
+    "device_mcp_schema_cache",
 ]
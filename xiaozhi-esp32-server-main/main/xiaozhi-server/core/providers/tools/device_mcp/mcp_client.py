@@ -15,6 +15,8 @@ class MCPClient:
     def __init__(self):
         self.tools = {}  # sanitized_name -> tool_data
         self.name_mapping = {}
+        self.pending_tools = []  # 分页获取中的工具列表，获取完成后整体替换
+        self.fingerprint = None  # 设备固件指纹，用于工具列表缓存
         self.ready = False
         self.call_results = {}  # To store Futures for tool call responses
         self.next_id = 1
@@ -63,6 +65,19 @@ class MCPClient:
                 None  # Invalidate the cache when a tool is added
             )
 
+    async def replace_tools(self, tools: list):
+        """用完整的工具列表整体替换当前工具"""
+        async with self.lock:
+            new_tools = {}
+            name_mapping = {}
+            for tool_data in tools:
+                sanitized_name = sanitize_tool_name(tool_data["name"])
+                new_tools[sanitized_name] = tool_data
+                name_mapping[sanitized_name] = tool_data["name"]
+            self.tools = new_tools
+            self.name_mapping = name_mapping
+            self._cached_available_tools = None
+
     async def get_next_id(self) -> int:
         async with self.lock:
             current_id = self.next_id
@@ -7,6 +7,7 @@ from concurrent.futures import Future
 from core.utils.util import get_vision_url, sanitize_tool_name
 from core.utils.auth import AuthToken
 from config.logger import setup_logging
+from .mcp_schema_cache import device_mcp_schema_cache
 
 TAG = __name__
 logger = setup_logging()
@@ -176,35 +177,32 @@ async def handle_mcp_message(conn, mcp_client: MCPClient, payload: dict):
                         "description": description,
                         "inputSchema": input_schema,
                     }
-                    await mcp_client.add_tool(new_tool)
+                    mcp_client.pending_tools.append(new_tool)
                     logger.bind(tag=TAG).debug(f"客户端工具 #{i+1}: {name}")
 
-                # 替换所有工具描述中的工具名称
-                for tool_data in mcp_client.tools.values():
-                    if "description" in tool_data:
-                        description = tool_data["description"]
-                        # 遍历所有工具名称进行替换
-                        for (
-                            sanitized_name,
-                            original_name,
-                        ) in mcp_client.name_mapping.items():
-                            description = description.replace(
-                                original_name, sanitized_name
-                            )
-                        tool_data["description"] = description
-
                 next_cursor = result.get("nextCursor", "")
                 if next_cursor:
                     logger.bind(tag=TAG).info(f"有更多工具，nextCursor: {next_cursor}")
                     await send_mcp_tools_list_continue_request(conn, next_cursor)
                 else:
+                    tools, mcp_client.pending_tools = mcp_client.pending_tools, []
+                    _replace_tool_names_in_descriptions(tools)
+                    # 校验按固件缓存的工具列表，一致时已在连接时使用缓存，无需重建函数描述
+                    cache_matched = device_mcp_schema_cache.validate(
+                        mcp_client.fingerprint, tools
+                    )
+                    if cache_matched and await mcp_client.is_ready():
+                        logger.bind(tag=TAG).info("设备工具列表与缓存一致")
+                        return
+                    if mcp_client.fingerprint and mcp_client.tools:
+                        logger.bind(tag=TAG).warning("设备工具列表与缓存不一致，已更新缓存")
+
+                    await mcp_client.replace_tools(tools)
                     await mcp_client.set_ready(True)
                     logger.bind(tag=TAG).info("所有工具已获取，MCP客户端准备就绪")
 
                     # 刷新工具缓存，确保MCP工具被包含在函数列表中
-                    if hasattr(conn, "func_handler") and conn.func_handler:
-                        conn.func_handler.tool_manager.refresh_tools()
-                        conn.func_handler.current_support_functions()
+                    refresh_device_mcp_tools(conn)
             return
 
     # Handle method calls (requests from the client)
@@ -224,6 +222,38 @@ async def handle_mcp_message(conn, mcp_client: MCPClient, payload: dict):
             )
 
 
+def _replace_tool_names_in_descriptions(tools: list):
+    """将工具描述中的原始工具名称替换为处理后的名称"""
+    name_mapping = {sanitize_tool_name(t["name"]): t["name"] for t in tools}
+    for tool_data in tools:
+        description = tool_data.get("description", "")
+        for sanitized_name, original_name in name_mapping.items():
+            description = description.replace(original_name, sanitized_name)
+        tool_data["description"] = description
+
+
+def refresh_device_mcp_tools(conn):
+    """刷新连接的工具缓存，使设备端MCP工具出现在函数列表中"""
+    if hasattr(conn, "func_handler") and conn.func_handler:
+        conn.func_handler.tool_manager.refresh_tools()
+        conn.func_handler.current_support_functions()
+
+
+async def load_cached_mcp_tools(conn, mcp_client: MCPClient) -> bool:
+    """按设备固件指纹加载缓存的工具列表，命中时客户端立即可用"""
+    mcp_client.fingerprint = device_mcp_schema_cache.get_fingerprint(
+        conn.headers, conn.features
+    )
+    tools = device_mcp_schema_cache.get(mcp_client.fingerprint)
+    if not tools:
+        return False
+    await mcp_client.replace_tools(tools)
+    await mcp_client.set_ready(True)
+    logger.bind(tag=TAG).info(f"使用缓存的设备工具列表，共 {len(tools)} 个工具")
+    refresh_device_mcp_tools(conn)
+    return True
+
+
 async def send_mcp_initialize_message(conn):
     """发送MCP初始化消息"""
 
@@ -266,6 +296,8 @@ async def send_mcp_tools_list_request(conn):
         "id": 2,  # mcpToolsListID
         "method": "tools/list",
     }
+    if getattr(conn, "mcp_client", None):
+        conn.mcp_client.pending_tools = []
     logger.bind(tag=TAG).debug("发送MCP工具列表请求")
     await send_mcp_message(conn, payload)
 
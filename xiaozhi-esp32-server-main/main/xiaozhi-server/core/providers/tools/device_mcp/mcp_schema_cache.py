@@ -0,0 +1,99 @@
+"""设备端MCP工具列表缓存
+
+同一固件版本、同一板型的设备上报的工具列表完全相同。按固件指纹缓存工具列表后，
+设备连接时可以直接使用缓存的工具，同时在后台通过tools/list校验，不一致时更新缓存。
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class DeviceMCPSchemaCache:
+    """按固件指纹缓存设备端MCP工具列表，进程内所有连接共享"""
+
+    def __init__(self, max_size: int = 256, max_devices: int = 10000):
+        self.max_size = max_size
+        self.max_devices = max_devices
+        self._schemas: "OrderedDict[str, List[dict]]" = OrderedDict()
+        # OTA请求中记录的设备固件信息 device_id -> 固件描述
+        self._device_firmware: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+
+    def record_device_firmware(self, device_id: str, board: str, version: str):
+        """记录OTA请求中上报的板型和固件版本"""
+        if not device_id or not version:
+            return
+        with self._lock:
+            self._device_firmware[device_id] = f"{board}/{version}"
+            self._device_firmware.move_to_end(device_id)
+            while len(self._device_firmware) > self.max_devices:
+                self._device_firmware.popitem(last=False)
+
+    def get_fingerprint(self, headers: Optional[dict], features: dict) -> Optional[str]:
+        """根据OTA记录和连接请求头计算固件指纹，无法确定固件版本时返回None"""
+        headers = headers or {}
+        with self._lock:
+            firmware = self._device_firmware.get(headers.get("device-id", ""))
+        # 未经过OTA的设备退而使用请求头中的User-Agent（通常为 板型/版本）
+        firmware = firmware or headers.get("user-agent")
+        if not firmware:
+            return None
+        raw = json.dumps(
+            [firmware, headers.get("protocol-version", ""), features or {}],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+    def get(self, fingerprint: Optional[str]) -> Optional[List[dict]]:
+        """读取缓存的工具列表"""
+        if not fingerprint:
+            return None
+        with self._lock:
+            tools = self._schemas.get(fingerprint)
+            if tools is None:
+                self.misses += 1
+                return None
+            self._schemas.move_to_end(fingerprint)
+            self.hits += 1
+            return [dict(tool) for tool in tools]
+
+    def validate(self, fingerprint: Optional[str], tools: List[dict]) -> bool:
+        """用设备实际上报的工具列表校验缓存，不一致时替换缓存；返回缓存是否一致"""
+        if not fingerprint:
+            return False
+        with self._lock:
+            cached = self._schemas.get(fingerprint)
+            if cached is not None and cached == tools:
+                return True
+            if cached is not None:
+                self.mismatches += 1
+            self._schemas[fingerprint] = [dict(tool) for tool in tools]
+            self._schemas.move_to_end(fingerprint)
+            while len(self._schemas) > self.max_size:
+                self._schemas.popitem(last=False)
+            return False
+
+    def invalidate(self, fingerprint: str):
+        """删除指定指纹的缓存"""
+        with self._lock:
+            self._schemas.pop(fingerprint, None)
+
+    def get_statistics(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        return {
+            "size": len(self._schemas),
+            "hits": self.hits,
+            "misses": self.misses,
+            "mismatches": self.mismatches,
+        }
+
+
+# 进程内共享的设备端MCP工具列表缓存
+device_mcp_schema_cache = DeviceMCPSchemaCache()
@@ -4,6 +4,7 @@ from .mcp_endpoint_executor import MCPEndpointExecutor
 from .mcp_endpoint_client import MCPEndpointClient
 from .mcp_endpoint_handler import (
     connect_mcp_endpoint,
+    release_mcp_endpoint,
     send_mcp_endpoint_initialize,
     send_mcp_endpoint_notification,
     send_mcp_endpoint_tools_list,
@@ -14,6 +15,7 @@ __all__ = [
     "MCPEndpointExecutor",
     "MCPEndpointClient",
     "connect_mcp_endpoint",
+    "release_mcp_endpoint",
     "send_mcp_endpoint_initialize",
     "send_mcp_endpoint_notification",
     "send_mcp_endpoint_tools_list",
@@ -10,18 +10,27 @@ logger = setup_logging()
 
 
 class MCPEndpointClient:
-    """MCP接入点客户端，用于管理MCP接入点状态和工具"""
+    """MCP接入点客户端，用于管理MCP接入点状态和工具
 
-    def __init__(self, conn=None):
-        self.conn = conn
+    同一个接入点URL在进程内只维持一个实例和一条WebSocket连接，由所有设备连接共享，
+    工具调用的JSON-RPC id按调用方加前缀区分。
+    """
+
+    def __init__(self, url: str = ""):
+        self.url = url
+        self.subscribers = set()  # 共享该接入点的设备连接
         self.tools = {}  # sanitized_name -> tool_data
         self.name_mapping = {}
+        self.pending_tools = []  # 分页获取中的工具列表，获取完成后整体替换
         self.ready = False
+        self.ready_event = asyncio.Event()
         self.call_results = {}  # To store Futures for tool call responses
         self.next_id = 1
         self.lock = asyncio.Lock()
         self._cached_available_tools = None  # Cache for get_available_tools
         self.websocket = None  # WebSocket连接
+        self.connection_task = None  # 连接维护任务（含自动重连）
+        self.closed = False
 
     def has_tool(self, name: str) -> bool:
         return name in self.tools
@@ -55,6 +64,10 @@ class MCPEndpointClient:
     async def set_ready(self, status: bool):
         async with self.lock:
             self.ready = status
+            if status:
+                self.ready_event.set()
+            else:
+                self.ready_event.clear()
 
     async def add_tool(self, tool_data: dict):
         async with self.lock:
@@ -65,11 +78,25 @@ class MCPEndpointClient:
                 None  # Invalidate the cache when a tool is added
             )
 
-    async def get_next_id(self) -> int:
+    async def replace_tools(self, tools: list):
+        """用完整的工具列表整体替换当前工具，刷新期间旧工具保持可用"""
+        async with self.lock:
+            new_tools = {}
+            name_mapping = {}
+            for tool_data in tools:
+                sanitized_name = sanitize_tool_name(tool_data["name"])
+                new_tools[sanitized_name] = tool_data
+                name_mapping[sanitized_name] = tool_data["name"]
+            self.tools = new_tools
+            self.name_mapping = name_mapping
+            self._cached_available_tools = None
+
+    async def get_next_id(self, caller: str = "") -> str:
+        """生成调用方命名空间下唯一的请求id"""
         async with self.lock:
             current_id = self.next_id
             self.next_id += 1
-            return current_id
+            return f"{caller or 'call'}-{current_id}"
 
     async def register_call_result_future(self, id: int, future: Future):
         async with self.lock:
@@ -94,6 +121,23 @@ class MCPEndpointClient:
             if id in self.call_results:
                 self.call_results.pop(id)
 
+    async def reject_all_call_results(self, exception: Exception, caller: str = None):
+        """拒绝所有（或指定调用方的）未完成调用，用于断线或设备断开"""
+        async with self.lock:
+            for call_id in list(self.call_results.keys()):
+                if caller is not None and not str(call_id).startswith(f"{caller}-"):
+                    continue
+                future = self.call_results.pop(call_id)
+                if not future.done():
+                    future.set_exception(exception)
+
+    def notify_tools_changed(self):
+        """通知所有共享该接入点的连接刷新工具列表"""
+        for conn in list(self.subscribers):
+            func_handler = getattr(conn, "func_handler", None)
+            if func_handler:
+                func_handler.tool_manager.refresh_tools()
+
     def set_websocket(self, websocket):
         """设置WebSocket连接"""
         self.websocket = websocket
@@ -106,7 +150,12 @@ class MCPEndpointClient:
             raise RuntimeError("WebSocket连接未建立")
 
     async def close(self):
-        """关闭WebSocket连接"""
+        """关闭WebSocket连接并停止自动重连"""
+        self.closed = True
+        if self.connection_task:
+            self.connection_task.cancel()
+            self.connection_task = None
         if self.websocket:
             await self.websocket.close()
             self.websocket = None
+        await self.set_ready(False)
@@ -36,7 +36,10 @@ class MCPEndpointExecutor(ToolExecutor):
 
             # 调用MCP接入点工具
             result = await call_mcp_endpoint_tool(
-                conn.mcp_endpoint_client, tool_name, args_str
+                conn.mcp_endpoint_client,
+                tool_name,
+                args_str,
+                caller=getattr(conn, "session_id", ""),
             )
 
             resultJson = None
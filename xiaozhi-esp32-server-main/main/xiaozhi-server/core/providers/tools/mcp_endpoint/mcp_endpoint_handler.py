@@ -4,42 +4,119 @@ import json
 import asyncio
 import re
 import websockets
+from typing import Dict
 from config.logger import setup_logging
+from core.utils.util import sanitize_tool_name
 from .mcp_endpoint_client import MCPEndpointClient
 
 TAG = __name__
 logger = setup_logging()
 
 
+# 进程内共享的MCP接入点客户端，按URL复用同一条WebSocket连接
+_endpoint_clients: Dict[str, MCPEndpointClient] = {}
+_endpoint_clients_lock = asyncio.Lock()
+
+# 断线重连的退避时间范围(秒)
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 30
+# 首个连接等待接入点就绪的最长时间(秒)
+CONNECT_READY_TIMEOUT = 10
+
+
 async def connect_mcp_endpoint(mcp_endpoint_url: str, conn=None) -> MCPEndpointClient:
-    """连接到MCP接入点"""
+    """连接到MCP接入点，同一URL已有连接时直接复用"""
     if not mcp_endpoint_url or "你的" in mcp_endpoint_url or mcp_endpoint_url == "null":
         return None
 
     try:
-        websocket = await websockets.connect(mcp_endpoint_url)
+        async with _endpoint_clients_lock:
+            mcp_client = _endpoint_clients.get(mcp_endpoint_url)
+            if mcp_client is None:
+                mcp_client = MCPEndpointClient(mcp_endpoint_url)
+                mcp_client.connection_task = asyncio.create_task(
+                    _connection_loop(mcp_client)
+                )
+                _endpoint_clients[mcp_endpoint_url] = mcp_client
+                logger.bind(tag=TAG).info("创建共享的MCP接入点连接")
+            if conn is not None:
+                mcp_client.subscribers.add(conn)
+
+        # 已就绪的共享连接无需等待；新建的连接等待首次握手完成，超时也不影响后续自动就绪
+        if not await mcp_client.is_ready():
+            try:
+                await asyncio.wait_for(
+                    mcp_client.ready_event.wait(), timeout=CONNECT_READY_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.bind(tag=TAG).warning("MCP接入点暂未就绪，将在后台继续连接")
 
-        mcp_client = MCPEndpointClient(conn)
-        mcp_client.set_websocket(websocket)
+        logger.bind(tag=TAG).info(
+            f"MCP接入点连接成功，共享连接数: {len(mcp_client.subscribers)}"
+        )
+        return mcp_client
 
-        # 启动消息监听器
-        asyncio.create_task(_message_listener(mcp_client))
+    except Exception as e:
+        logger.bind(tag=TAG).error(f"连接MCP接入点失败: {e}")
+        return None
 
-        # 发送初始化消息
-        await send_mcp_endpoint_initialize(mcp_client)
 
-        # 发送初始化完成通知
-        await send_mcp_endpoint_notification(mcp_client, "notifications/initialized")
+async def release_mcp_endpoint(mcp_client: MCPEndpointClient, conn=None):
+    """设备连接释放MCP接入点，最后一个连接释放后关闭共享连接"""
+    if mcp_client is None:
+        return
+    caller = getattr(conn, "session_id", None)
+    if caller:
+        await mcp_client.reject_all_call_results(
+            ConnectionError("设备连接已断开"), caller=caller
+        )
+    async with _endpoint_clients_lock:
+        mcp_client.subscribers.discard(conn)
+        if mcp_client.subscribers:
+            return
+        if _endpoint_clients.get(mcp_client.url) is mcp_client:
+            del _endpoint_clients[mcp_client.url]
+    await mcp_client.close()
+    logger.bind(tag=TAG).info("MCP接入点共享连接已关闭")
+
+
+async def _connection_loop(mcp_client: MCPEndpointClient):
+    """维持与MCP接入点的连接，断开后按指数退避自动重连"""
+    delay = RECONNECT_MIN_DELAY
+    while not mcp_client.closed:
+        try:
+            async with websockets.connect(mcp_client.url) as websocket:
+                mcp_client.set_websocket(websocket)
+                delay = RECONNECT_MIN_DELAY
+
+                # 发送初始化消息
+                await send_mcp_endpoint_initialize(mcp_client)
+
+                # 发送初始化完成通知
+                await send_mcp_endpoint_notification(
+                    mcp_client, "notifications/initialized"
+                )
 
-        # 获取工具列表
-        await send_mcp_endpoint_tools_list(mcp_client)
+                # 获取工具列表
+                await send_mcp_endpoint_tools_list(mcp_client)
 
-        logger.bind(tag=TAG).info("MCP接入点连接成功")
-        return mcp_client
+                await _message_listener(mcp_client)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"连接MCP接入点失败: {e}")
+        finally:
+            mcp_client.websocket = None
+            await mcp_client.set_ready(False)
+            await mcp_client.reject_all_call_results(
+                ConnectionError("MCP接入点连接已断开")
+            )
 
-    except Exception as e:
-        logger.bind(tag=TAG).error(f"连接MCP接入点失败: {e}")
-        return None
+        if mcp_client.closed:
+            break
+        logger.bind(tag=TAG).info(f"{delay}秒后重新连接MCP接入点")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RECONNECT_MAX_DELAY)
 
 
 async def _message_listener(mcp_client: MCPEndpointClient):
@@ -49,10 +126,6 @@ async def _message_listener(mcp_client: MCPEndpointClient):
             await handle_mcp_endpoint_message(mcp_client, message)
     except websockets.exceptions.ConnectionClosed:
         logger.bind(tag=TAG).info("MCP接入点连接已关闭")
-    except Exception as e:
-        logger.bind(tag=TAG).error(f"MCP接入点消息监听器错误: {e}")
-    finally:
-        await mcp_client.set_ready(False)
 
 
 async def handle_mcp_endpoint_message(mcp_client: MCPEndpointClient, message: str):
@@ -68,9 +141,8 @@ async def handle_mcp_endpoint_message(mcp_client: MCPEndpointClient, message: st
         # Handle result
         if "result" in payload:
             result = payload["result"]
-            # 安全地获取消息ID，如果为None则使用0
-            msg_id_raw = payload.get("id")
-            msg_id = int(msg_id_raw) if msg_id_raw is not None else 0
+            # 工具调用使用带调用方前缀的字符串ID，初始化和工具列表使用固定的整数ID
+            msg_id = payload.get("id")
 
             # Check for tool call response first
             if msg_id in mcp_client.call_results:
@@ -141,23 +213,9 @@ async def handle_mcp_endpoint_message(mcp_client: MCPEndpointClient, message: st
                             "description": description,
                             "inputSchema": input_schema,
                         }
-                        await mcp_client.add_tool(new_tool)
+                        mcp_client.pending_tools.append(new_tool)
                         logger.bind(tag=TAG).debug(f"MCP接入点工具 #{i+1}: {name}")
 
-                    # 替换所有工具描述中的工具名称
-                    for tool_data in mcp_client.tools.values():
-                        if "description" in tool_data:
-                            description = tool_data["description"]
-                            # 遍历所有工具名称进行替换
-                            for (
-                                sanitized_name,
-                                original_name,
-                            ) in mcp_client.name_mapping.items():
-                                description = description.replace(
-                                    original_name, sanitized_name
-                                )
-                            tool_data["description"] = description
-
                     next_cursor = (
                         result.get("nextCursor", "") if result is not None else ""
                     )
@@ -169,20 +227,16 @@ async def handle_mcp_endpoint_message(mcp_client: MCPEndpointClient, message: st
                             mcp_client, next_cursor
                         )
                     else:
+                        tools, mcp_client.pending_tools = mcp_client.pending_tools, []
+                        _replace_tool_names_in_descriptions(tools)
+                        await mcp_client.replace_tools(tools)
                         await mcp_client.set_ready(True)
                         logger.bind(tag=TAG).info(
                             "所有MCP接入点工具已获取，客户端准备就绪"
                         )
 
-                        # 刷新工具缓存，确保MCP接入点工具被包含在函数列表中
-                        if (
-                            hasattr(mcp_client, "conn")
-                            and mcp_client.conn
-                            and hasattr(mcp_client.conn, "func_handler")
-                            and mcp_client.conn.func_handler
-                        ):
-                            mcp_client.conn.func_handler.tool_manager.refresh_tools()
-                            mcp_client.conn.func_handler.current_support_functions()
+                        # 刷新所有共享连接的工具缓存，确保MCP接入点工具被包含在函数列表中
+                        mcp_client.notify_tools_changed()
 
                         logger.bind(tag=TAG).info(
                             f"MCP接入点工具获取完成，共 {len(mcp_client.tools)} 个工具"
@@ -197,15 +251,16 @@ async def handle_mcp_endpoint_message(mcp_client: MCPEndpointClient, message: st
         elif "method" in payload:
             method = payload["method"]
             logger.bind(tag=TAG).info(f"收到MCP接入点请求: {method}")
+            if method == "notifications/tools/list_changed":
+                # 工具列表变化时重新拉取，获取完成后整体替换共享的工具列表
+                await send_mcp_endpoint_tools_list(mcp_client)
 
         elif "error" in payload:
             error_data = payload["error"]
             error_msg = error_data.get("message", "未知错误")
             logger.bind(tag=TAG).error(f"收到MCP接入点错误响应: {error_msg}")
 
-            # 安全地获取消息ID，如果为None则使用0
-            msg_id_raw = payload.get("id")
-            msg_id = int(msg_id_raw) if msg_id_raw is not None else 0
+            msg_id = payload.get("id")
 
             if msg_id in mcp_client.call_results:
                 await mcp_client.reject_call_result(
@@ -221,6 +276,16 @@ async def handle_mcp_endpoint_message(mcp_client: MCPEndpointClient, message: st
         logger.bind(tag=TAG).error(f"错误详情: {traceback.format_exc()}")
 
 
+def _replace_tool_names_in_descriptions(tools: list):
+    """将工具描述中的原始工具名称替换为处理后的名称"""
+    name_mapping = {sanitize_tool_name(t["name"]): t["name"] for t in tools}
+    for tool_data in tools:
+        description = tool_data.get("description", "")
+        for sanitized_name, original_name in name_mapping.items():
+            description = description.replace(original_name, sanitized_name)
+        tool_data["description"] = description
+
+
 async def send_mcp_endpoint_initialize(mcp_client: MCPEndpointClient):
     """发送MCP接入点初始化消息"""
     payload = {
@@ -264,6 +329,7 @@ async def send_mcp_endpoint_tools_list(mcp_client: MCPEndpointClient):
         "method": "tools/list",
     }
     message = json.dumps(payload)
+    mcp_client.pending_tools = []
     logger.bind(tag=TAG).debug("发送MCP接入点工具列表请求")
     await mcp_client.send_message(message)
 
@@ -284,10 +350,14 @@ async def send_mcp_endpoint_tools_list_continue(
 
 
 async def call_mcp_endpoint_tool(
-    mcp_client: MCPEndpointClient, tool_name: str, args: str = "{}", timeout: int = 30
+    mcp_client: MCPEndpointClient,
+    tool_name: str,
+    args: str = "{}",
+    timeout: int = 30,
+    caller: str = "",
 ):
     """
-    调用指定的MCP接入点工具，并等待响应
+    调用指定的MCP接入点工具，并等待响应；caller用于区分共享连接上不同设备的请求ID
     """
     if not await mcp_client.is_ready():
         raise RuntimeError("MCP接入点客户端尚未准备就绪")
@@ -295,7 +365,7 @@ async def call_mcp_endpoint_tool(
     if not mcp_client.has_tool(tool_name):
         raise ValueError(f"工具 {tool_name} 不存在")
 
-    tool_call_id = await mcp_client.get_next_id()
+    tool_call_id = await mcp_client.get_next_id(caller)
     result_future = asyncio.Future()
     await mcp_client.register_call_result_future(tool_call_id, result_future)
 
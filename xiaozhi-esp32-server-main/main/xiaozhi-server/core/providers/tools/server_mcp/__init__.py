@@ -1,7 +1,8 @@
 """服务端MCP工具模块"""
 
+from .mcp_pool import ServerMCPPool
 from .mcp_manager import ServerMCPManager
 from .mcp_executor import ServerMCPExecutor
 from .mcp_client import ServerMCPClient
 
-__all__ = ["ServerMCPManager", "ServerMCPExecutor", "ServerMCPClient"]
+__all__ = ["ServerMCPPool", "ServerMCPManager", "ServerMCPExecutor", "ServerMCPClient"]
@@ -21,6 +21,10 @@ class ServerMCPExecutor(ToolExecutor):
             await self.mcp_manager.initialize_servers()
             self._initialized = True
 
+            # 刷新工具缓存，确保服务端MCP工具被包含在函数列表中
+            if hasattr(self.conn, "func_handler") and self.conn.func_handler:
+                self.conn.func_handler.tool_manager.refresh_tools()
+
     async def execute(
         self, conn, tool_name: str, arguments: Dict[str, Any]
     ) -> ActionResponse:
@@ -0,0 +1,254 @@
+"""服务端MCP客户端池
+
+由WebSocketServer持有，所有设备连接共享。每个MCP服务最多维持max_sessions个会话，
+在第一个连接需要时才启动，最后一个连接释放后延迟关闭，连接建立耗时和子进程数量不再随设备数增长。
+"""
+
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+from config.config_loader import get_project_dir
+from config.logger import setup_logging
+from .mcp_client import ServerMCPClient
+
+TAG = __name__
+logger = setup_logging()
+
+# 启动失败的MCP服务的重试间隔（秒），连续失败时按指数增长
+RETRY_BACKOFF_BASE = 5
+RETRY_BACKOFF_MAX = 300
+
+
+class ServerMCPSessionGroup:
+    """单个MCP服务的会话组，按需创建会话并分配给调用方"""
+
+    def __init__(self, name: str, config: Dict[str, Any], max_sessions: int):
+        self.name = name
+        self.config = config
+        self.max_sessions = max(1, int(config.get("max_sessions", max_sessions)))
+        self.clients: List[ServerMCPClient] = []
+        self.inflight: Dict[ServerMCPClient, int] = {}
+        self.lock = asyncio.Lock()
+
+    async def _start_client(self) -> ServerMCPClient:
+        """启动一个新的会话"""
+        logger.bind(tag=TAG).info(
+            f"启动服务端MCP会话: {self.name} ({len(self.clients) + 1}/{self.max_sessions})"
+        )
+        client = ServerMCPClient(self.config)
+        await client.initialize()
+        if not client.is_connected():
+            await client.cleanup()
+            raise RuntimeError(f"服务端MCP服务 {self.name} 连接失败")
+        self.clients.append(client)
+        self.inflight[client] = 0
+        return client
+
+    async def ensure_started(self) -> ServerMCPClient:
+        """确保至少有一个可用会话，用于获取工具列表"""
+        async with self.lock:
+            for client in self.clients:
+                if client.is_connected():
+                    return client
+            return await self._start_client()
+
+    @asynccontextmanager
+    async def borrow(self):
+        """借用一个会话，优先选择空闲会话，全部繁忙且未达上限时新建会话"""
+        async with self.lock:
+            self.clients = [c for c in self.clients if c.is_connected()]
+            client = min(self.clients, key=lambda c: self.inflight.get(c, 0), default=None)
+            if client is None or (
+                self.inflight.get(client, 0) > 0 and len(self.clients) < self.max_sessions
+            ):
+                client = await self._start_client()
+            self.inflight[client] = self.inflight.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            self.inflight[client] = self.inflight.get(client, 1) - 1
+
+    async def discard(self, client: ServerMCPClient):
+        """丢弃异常的会话，下次借用时重新创建"""
+        async with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+            self.inflight.pop(client, None)
+        await client.cleanup()
+
+    async def close(self):
+        """关闭所有会话"""
+        async with self.lock:
+            clients, self.clients = self.clients, []
+            self.inflight.clear()
+        for client in clients:
+            try:
+                await asyncio.wait_for(client.cleanup(), timeout=20)
+            except (asyncio.TimeoutError, Exception) as e:
+                logger.bind(tag=TAG).error(f"关闭服务端MCP会话 {self.name} 时出错: {e}")
+
+
+class ServerMCPPool:
+    """进程级共享的服务端MCP客户端池，按引用计数管理生命周期"""
+
+    def __init__(self, max_sessions: int = 2, idle_close_seconds: float = 60):
+        self.config_path = get_project_dir() + "data/.mcp_server_settings.json"
+        self.max_sessions = max_sessions
+        self.idle_close_seconds = idle_close_seconds
+        self.ref_count = 0
+        self.groups: Dict[str, ServerMCPSessionGroup] = {}
+        self.tools: List[Dict[str, Any]] = []
+        self.tool_servers: Dict[str, str] = {}
+        self._started = False
+        # 启动失败的服务，在之后的acquire中按退避间隔重试
+        self._failed: Dict[str, Dict[str, Any]] = {}
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self._close_task: Optional[asyncio.Task] = None
+
+    def load_config(self) -> Dict[str, Any]:
+        """加载MCP服务配置"""
+        if not os.path.exists(self.config_path):
+            logger.bind(tag=TAG).warning(
+                "请检查mcp服务配置文件：data/.mcp_server_settings.json"
+            )
+            return {}
+
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            return config.get("mcpServers", {})
+        except Exception as e:
+            logger.bind(tag=TAG).error(
+                f"Error loading MCP config from {self.config_path}: {e}"
+            )
+            return {}
+
+    async def acquire(self):
+        """连接开始使用服务端MCP，首次使用时启动所有MCP服务"""
+        async with self._lock:
+            self.ref_count += 1
+            if self._close_task:
+                self._close_task.cancel()
+                self._close_task = None
+            if not self._started:
+                await self._start()
+            elif self._failed and time.monotonic() >= self._retry_at:
+                await self._start_servers(self._failed)
+
+    async def release(self):
+        """连接释放服务端MCP，没有连接使用时延迟关闭所有会话"""
+        async with self._lock:
+            self.ref_count = max(0, self.ref_count - 1)
+            if self.ref_count == 0 and self._started and not self._close_task:
+                self._close_task = asyncio.create_task(self._close_when_idle())
+
+    async def _start(self):
+        """启动所有配置的MCP服务，并汇总工具列表"""
+        servers = {}
+        for name, srv_config in self.load_config().items():
+            if not srv_config.get("command") and not srv_config.get("url"):
+                logger.bind(tag=TAG).warning(
+                    f"Skipping server {name}: neither command nor url specified"
+                )
+                continue
+            servers[name] = srv_config
+        self._failures = 0
+        await self._start_servers(servers)
+        self._started = True
+
+    async def _start_servers(self, servers: Dict[str, Dict[str, Any]]):
+        """启动指定的MCP服务，失败的服务记录下来，退避后重试"""
+        failed = {}
+        for name, srv_config in servers.items():
+            group = ServerMCPSessionGroup(name, srv_config, self.max_sessions)
+            try:
+                logger.bind(tag=TAG).info(f"初始化服务端MCP客户端: {name}")
+                client = await group.ensure_started()
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"Failed to initialize MCP server {name}: {e}"
+                )
+                failed[name] = srv_config
+                continue
+
+            self.groups[name] = group
+            for tool in client.get_available_tools():
+                tool_name = tool["function"]["name"]
+                self.tool_servers[tool_name] = name
+                self.tools.append(tool)
+
+        self._failed = failed
+        if failed:
+            self._failures += 1
+            delay = min(
+                RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (self._failures - 1)
+            )
+            self._retry_at = time.monotonic() + delay
+            logger.bind(tag=TAG).warning(
+                f"服务端MCP服务启动失败: {', '.join(failed)}，{delay}秒后重试"
+            )
+        else:
+            self._failures = 0
+
+    async def _close_when_idle(self):
+        """空闲一段时间后关闭所有会话"""
+        try:
+            await asyncio.sleep(self.idle_close_seconds)
+        except asyncio.CancelledError:
+            return
+        async with self._lock:
+            self._close_task = None
+            if self.ref_count > 0:
+                return
+            await self.close()
+
+    async def close(self):
+        """关闭所有MCP服务会话"""
+        groups, self.groups = self.groups, {}
+        for group in groups.values():
+            await group.close()
+        self.tools = []
+        self.tool_servers = {}
+        self._failed = {}
+        self._started = False
+        logger.bind(tag=TAG).info("服务端MCP客户端池已关闭")
+
+    def get_all_tools(self) -> List[Dict[str, Any]]:
+        """获取所有服务的工具function定义"""
+        return self.tools
+
+    def is_mcp_tool(self, tool_name: str) -> bool:
+        """检查是否是MCP工具"""
+        return tool_name in self.tool_servers
+
+    async def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """借用会话执行工具调用，失败时丢弃该会话并重试"""
+        server_name = self.tool_servers.get(tool_name)
+        group = self.groups.get(server_name) if server_name else None
+        if not group:
+            raise ValueError(f"工具 {tool_name} 在任意MCP服务中未找到")
+
+        max_retries = 3  # 最大重试次数
+        retry_interval = 2  # 重试间隔(秒)
+
+        for attempt in range(max_retries):
+            async with group.borrow() as client:
+                try:
+                    return await client.call_tool(tool_name, arguments)
+                except Exception as e:
+                    # 最后一次尝试失败时直接抛出异常
+                    if attempt == max_retries - 1:
+                        raise
+                    logger.bind(tag=TAG).warning(
+                        f"执行工具 {tool_name} 失败 (尝试 {attempt+1}/{max_retries}): {e}"
+                    )
+                    failed_client = client
+            # 丢弃异常会话，下次借用时重新连接
+            logger.bind(tag=TAG).info(f"重试前尝试重新连接 MCP 客户端 {server_name}")
+            await group.discard(failed_client)
+            await asyncio.sleep(retry_interval)
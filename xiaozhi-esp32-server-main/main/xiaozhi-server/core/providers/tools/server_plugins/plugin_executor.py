@@ -1,5 +1,7 @@
 """服务端插件工具执行器"""
 
+import asyncio
+import inspect
 from typing import Dict, Any
 from ..base import ToolType, ToolDefinition, ToolExecutor
 from plugins_func.register import all_function_registry, Action, ActionResponse
@@ -27,16 +29,26 @@ class ServerPluginExecutor(ToolExecutor):
             if hasattr(func_item, "type"):
                 func_type = func_item.type
                 if func_type.code in [4, 5]:  # SYSTEM_CTL, IOT_CTL (需要conn参数)
-                    result = func_item.func(conn, **arguments)
+                    args = (conn,)
                 elif func_type.code == 2:  # WAIT
-                    result = func_item.func(**arguments)
+                    args = ()
                 elif func_type.code == 3:  # CHANGE_SYS_PROMPT
-                    result = func_item.func(conn, **arguments)
+                    args = (conn,)
                 else:
-                    result = func_item.func(**arguments)
+                    args = ()
             else:
                 # 默认不传conn参数
-                result = func_item.func(**arguments)
+                args = ()
+
+            if asyncio.iscoroutinefunction(func_item.func):
+                # 异步插件直接在事件循环上执行
+                result = await func_item.func(*args, **arguments)
+            else:
+                # 同步插件放到线程中执行，避免阻塞事件循环，多个调用可并行
+                result = await asyncio.to_thread(func_item.func, *args, **arguments)
+                # 延迟加载的插件首次调用时返回的可能是协程
+                if inspect.isawaitable(result):
+                    result = await result
 
             return result
 
@@ -75,6 +87,11 @@ class ServerPluginExecutor(ToolExecutor):
                     name=func_name,
                     description=func_item.description,
                     tool_type=ToolType.SERVER_PLUGIN,
+                    order_sensitive=func_item.order_sensitive,
+                    timeout=func_item.timeout,
+                    cache_ttl=func_item.cache_ttl,
+                    cache_key=func_item.cache_key,
+                    cache_invalidates=func_item.cache_invalidates,
                 )
 
         return tools
@@ -1,9 +1,10 @@
 """统一工具处理器"""
 
 import json
+import asyncio
 from typing import Dict, List, Any, Optional
 from config.logger import setup_logging
-from plugins_func.loadplugins import auto_import_modules
+from plugins_func.loadplugins import load_plugin_registry
 
 from .base import ToolType
 from plugins_func.register import Action, ActionResponse
@@ -50,14 +51,21 @@ class UnifiedToolHandler:
             ToolType.MCP_ENDPOINT, self.mcp_endpoint_executor
         )
 
+        # 多函数调用并发控制
+        tool_call_config = self.config.get("tool_call") or {}
+        self.tool_call_timeout = float(tool_call_config.get("timeout", 30))
+        self.tool_call_semaphore = asyncio.Semaphore(
+            int(tool_call_config.get("max_concurrency", 4))
+        )
+
         # 初始化标志
         self.finish_init = False
 
     async def _initialize(self):
         """异步初始化"""
         try:
-            # 自动导入插件模块
-            auto_import_modules("plugins_func.functions")
+            # 加载插件注册表，进程内只加载一次，插件模块在首次调用时导入
+            load_plugin_registry("plugins_func.functions")
 
             # 初始化服务端MCP
             await self.server_mcp_executor.initialize()
@@ -98,6 +106,8 @@ class UnifiedToolHandler:
                 if mcp_endpoint_client:
                     # 将MCP接入点客户端保存到连接对象中
                     self.conn.mcp_endpoint_client = mcp_endpoint_client
+                    # 共享连接可能已经就绪，立即刷新工具列表
+                    self.tool_manager.refresh_tools()
                     self.logger.info("MCP接入点初始化成功")
                 else:
                     self.logger.warning("MCP接入点初始化失败")
@@ -120,6 +130,10 @@ class UnifiedToolHandler:
         """获取所有工具的函数描述"""
         return self.tool_manager.get_function_descriptions()
 
+    def get_function_bundle(self):
+        """获取当前工具集的函数描述包（函数描述、工具名称与内容哈希）"""
+        return self.tool_manager.get_function_bundle()
+
     def current_support_functions(self) -> List[str]:
         """获取当前支持的函数名称列表"""
         func_names = self.tool_manager.get_supported_tool_names()
@@ -142,39 +156,94 @@ class UnifiedToolHandler:
         try:
             # 处理多函数调用
             if "function_calls" in function_call_data:
-                responses = []
-                for call in function_call_data["function_calls"]:
-                    result = await self.tool_manager.execute_tool(
-                        call["name"], call.get("arguments", {})
-                    )
-                    responses.append(result)
+                responses = await self._execute_function_calls(
+                    function_call_data["function_calls"]
+                )
                 return self._combine_responses(responses)
 
             # 处理单函数调用
             function_name = function_call_data["name"]
-            arguments = function_call_data.get("arguments", {})
-
-            # 如果arguments是字符串，尝试解析为JSON
-            if isinstance(arguments, str):
-                try:
-                    arguments = json.loads(arguments) if arguments else {}
-                except json.JSONDecodeError:
-                    self.logger.error(f"无法解析函数参数: {arguments}")
-                    return ActionResponse(
-                        action=Action.ERROR,
-                        response="无法解析函数参数",
-                    )
+            arguments = self._parse_arguments(function_call_data.get("arguments", {}))
+            if arguments is None:
+                return ActionResponse(
+                    action=Action.ERROR,
+                    response="无法解析函数参数",
+                )
 
             self.logger.debug(f"调用函数: {function_name}, 参数: {arguments}")
 
             # 执行工具调用
-            result = await self.tool_manager.execute_tool(function_name, arguments)
+            result = await self._execute_tool_call(function_name, arguments)
             return result
 
         except Exception as e:
             self.logger.error(f"处理function call错误: {e}")
             return ActionResponse(action=Action.ERROR, response=str(e))
 
+    def _parse_arguments(self, arguments) -> Optional[Dict[str, Any]]:
+        """解析函数参数，字符串形式的参数尝试解析为JSON，失败返回None"""
+        if isinstance(arguments, str):
+            try:
+                return json.loads(arguments) if arguments else {}
+            except json.JSONDecodeError:
+                self.logger.error(f"无法解析函数参数: {arguments}")
+                return None
+        return arguments or {}
+
+    async def _execute_tool_call(
+        self, tool_name: str, arguments: Dict[str, Any]
+    ) -> ActionResponse:
+        """在并发上限和超时限制下执行单个工具调用"""
+        tool_def = self.tool_manager.get_tool_definition(tool_name)
+        timeout = self.tool_call_timeout
+        if tool_def and tool_def.timeout is not None:
+            timeout = tool_def.timeout
+
+        async with self.tool_call_semaphore:
+            try:
+                return await asyncio.wait_for(
+                    self.tool_manager.execute_tool(tool_name, arguments), timeout
+                )
+            except asyncio.TimeoutError:
+                self.logger.error(f"工具 {tool_name} 执行超时({timeout}秒)")
+                return ActionResponse(
+                    action=Action.ERROR, response=f"工具 {tool_name} 执行超时"
+                )
+
+    async def _execute_function_calls(
+        self, function_calls: List[Dict[str, Any]]
+    ) -> List[ActionResponse]:
+        """并发执行多个函数调用，顺序敏感的工具按声明顺序串行执行，结果保持原始顺序"""
+        responses: List[Optional[ActionResponse]] = [None] * len(function_calls)
+
+        async def run_call(index: int):
+            call = function_calls[index]
+            arguments = self._parse_arguments(call.get("arguments", {}))
+            if arguments is None:
+                responses[index] = ActionResponse(
+                    action=Action.ERROR, response="无法解析函数参数"
+                )
+                return
+            responses[index] = await self._execute_tool_call(call["name"], arguments)
+
+        async def run_ordered(indexes: List[int]):
+            for index in indexes:
+                await run_call(index)
+
+        ordered_indexes = []
+        tasks = []
+        for index, call in enumerate(function_calls):
+            tool_def = self.tool_manager.get_tool_definition(call["name"])
+            if tool_def and tool_def.order_sensitive:
+                ordered_indexes.append(index)
+            else:
+                tasks.append(run_call(index))
+        if ordered_indexes:
+            tasks.append(run_ordered(ordered_indexes))
+
+        await asyncio.gather(*tasks)
+        return responses
+
     def _combine_responses(self, responses: List[ActionResponse]) -> ActionResponse:
         """合并多个函数调用的响应"""
         if not responses:
@@ -223,12 +292,15 @@ class UnifiedToolHandler:
         try:
             await self.server_mcp_executor.cleanup()
 
-            # 清理MCP接入点连接
+            # 释放共享的MCP接入点连接
             if (
                 hasattr(self.conn, "mcp_endpoint_client")
                 and self.conn.mcp_endpoint_client
             ):
-                await self.conn.mcp_endpoint_client.close()
+                from .mcp_endpoint import release_mcp_endpoint
+
+                await release_mcp_endpoint(self.conn.mcp_endpoint_client, self.conn)
+                self.conn.mcp_endpoint_client = None
 
             self.logger.info("工具处理器清理完成")
         except Exception as e:
@@ -1,9 +1,18 @@
 """统一工具管理器"""
 
+import json
+import hashlib
 from typing import Dict, List, Optional, Any
 from config.logger import setup_logging
 from plugins_func.register import Action, ActionResponse
-from .base import ToolType, ToolDefinition, ToolExecutor
+from .base import (
+    ToolType,
+    ToolDefinition,
+    ToolExecutor,
+    FunctionBundle,
+    build_function_bundle,
+    tool_result_cache,
+)
 
 
 class ToolManager:
@@ -14,7 +23,10 @@ class ToolManager:
         self.logger = setup_logging()
         self.executors: Dict[ToolType, ToolExecutor] = {}
         self._cached_tools: Optional[Dict[str, ToolDefinition]] = None
-        self._cached_function_descriptions: Optional[List[Dict[str, Any]]] = None
+        self._function_bundle: Optional[FunctionBundle] = None
+        tool_call_config = conn.config.get("tool_call") or {}
+        self.cache_enabled = tool_call_config.get("cache_enabled", True)
+        self.cache_exclude = set(tool_call_config.get("cache_exclude") or [])
 
     def register_executor(self, tool_type: ToolType, executor: ToolExecutor):
         """注册工具执行器"""
@@ -25,7 +37,7 @@ class ToolManager:
     def _invalidate_cache(self):
         """使缓存失效"""
         self._cached_tools = None
-        self._cached_function_descriptions = None
+        self._function_bundle = None
 
     def get_all_tools(self) -> Dict[str, ToolDefinition]:
         """获取所有工具定义"""
@@ -46,24 +58,36 @@ class ToolManager:
         self._cached_tools = all_tools
         return all_tools
 
-    def get_function_descriptions(self) -> List[Dict[str, Any]]:
-        """获取所有工具的函数描述（OpenAI格式）"""
-        if self._cached_function_descriptions is not None:
-            return self._cached_function_descriptions
+    def get_function_bundle(self) -> FunctionBundle:
+        """获取当前工具集的函数描述包，工具未变化时直接返回已生成的描述包"""
+        bundle = self._function_bundle
+        if bundle is not None:
+            return bundle
 
-        descriptions = []
         tools = self.get_all_tools()
-        for tool_definition in tools.values():
-            descriptions.append(tool_definition.description)
+        bundle = build_function_bundle(
+            [tool_definition.description for tool_definition in tools.values()],
+            list(tools.keys()),
+        )
+        # 工具在生成期间发生变化时不保存，下次读取重新生成
+        if self._cached_tools is tools:
+            self._function_bundle = bundle
+        return bundle
 
-        self._cached_function_descriptions = descriptions
-        return descriptions
+    def get_function_descriptions(self) -> List[Dict[str, Any]]:
+        """获取所有工具的函数描述（OpenAI格式）"""
+        return list(self.get_function_bundle().functions)
 
     def has_tool(self, tool_name: str) -> bool:
         """检查是否存在指定工具"""
         tools = self.get_all_tools()
         return tool_name in tools
 
+    def get_tool_definition(self, tool_name: str) -> Optional[ToolDefinition]:
+        """获取工具定义"""
+        tools = self.get_all_tools()
+        return tools.get(tool_name)
+
     def get_tool_type(self, tool_name: str) -> Optional[ToolType]:
         """获取工具类型"""
         tools = self.get_all_tools()
@@ -93,7 +117,19 @@ class ToolManager:
 
             # 执行工具
             self.logger.info(f"执行工具: {tool_name}，参数: {arguments}")
-            result = await executor.execute(self.conn, tool_name, arguments)
+            tool_def = self.get_tool_definition(tool_name)
+            cache_key = self._build_cache_key(tool_def, arguments)
+            if cache_key is None:
+                result = await executor.execute(self.conn, tool_name, arguments)
+            else:
+                result = await tool_result_cache.get_or_execute(
+                    cache_key,
+                    tool_def.cache_ttl,
+                    lambda: executor.execute(self.conn, tool_name, arguments),
+                    should_cache=self._is_cacheable_result,
+                )
+            for invalidate_name in tool_def.cache_invalidates:
+                tool_result_cache.invalidate(f"{invalidate_name}:")
             self.logger.debug(f"工具执行结果: {result}")
             return result
 
@@ -101,10 +137,42 @@ class ToolManager:
             self.logger.error(f"执行工具 {tool_name} 时出错: {e}")
             return ActionResponse(action=Action.ERROR, response=str(e))
 
+    def _build_cache_key(
+        self, tool_def: ToolDefinition, arguments: Dict[str, Any]
+    ) -> Optional[str]:
+        """生成工具结果缓存键，返回None表示本次调用不使用缓存"""
+        if (
+            not self.cache_enabled
+            or not tool_def.cache_ttl
+            or tool_def.name in self.cache_exclude
+        ):
+            return None
+
+        if tool_def.cache_key is not None:
+            scope = tool_def.cache_key(self.conn, arguments)
+            if scope is None:
+                return None
+        else:
+            scope = json.dumps(arguments, sort_keys=True, ensure_ascii=False)
+
+        # 插件配置（api_key、服务地址等）不同的连接不能共用结果
+        plugin_config = self.conn.config.get("plugins", {}).get(tool_def.name)
+        config_hash = hashlib.md5(
+            json.dumps(plugin_config, sort_keys=True, ensure_ascii=False).encode()
+        ).hexdigest()
+        return f"{tool_def.name}:{config_hash}:{scope}"
+
+    @staticmethod
+    def _is_cacheable_result(result: ActionResponse) -> bool:
+        """只缓存成功的结果"""
+        return isinstance(result, ActionResponse) and result.action not in (
+            Action.ERROR,
+            Action.NOTFOUND,
+        )
+
     def get_supported_tool_names(self) -> List[str]:
         """获取所有支持的工具名称"""
-        tools = self.get_all_tools()
-        return list(tools.keys())
+        return list(self.get_function_bundle().names)
 
     def refresh_tools(self):
         """刷新工具缓存"""
@@ -1,5 +1,6 @@
 import uuid
 import json
+import asyncio
 import hmac
 import hashlib
 import base64
@@ -112,6 +113,7 @@ class TTSProvider(TTSProviderBase):
         self.host = config.get("host", "nls-gateway-cn-shanghai.aliyuncs.com")
         self.api_url = f"https://{self.host}/stream/v1/tts"
         self.header = {"Content-Type": "application/json"}
+        self.use_shared_http(self.api_url)
 
         if self.access_key_id and self.access_key_secret:
             # 使用密钥对生成临时token
@@ -163,7 +165,7 @@ class TTSProvider(TTSProviderBase):
     async def text_to_speak(self, text, output_file):
         if self._is_token_expired():
             logger.warning("Token已过期，正在自动刷新...")
-            self._refresh_token()
+            await asyncio.to_thread(self._refresh_token)
         request_json = {
             "appkey": self.appkey,
             "token": self.token,
@@ -178,19 +180,22 @@ class TTSProvider(TTSProviderBase):
 
         # print(self.api_url, json.dumps(request_json, ensure_ascii=False))
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            resp = await self.http_request(
+                "POST", self.api_url, data=json.dumps(request_json), headers=self.header
             )
             if resp.status_code == 401:  # Token过期特殊处理
-                self._refresh_token()
-                resp = requests.post(
-                    self.api_url, json.dumps(request_json), headers=self.header
+                await asyncio.to_thread(self._refresh_token)
+                request_json["token"] = self.token
+                resp = await self.http_request(
+                    "POST",
+                    self.api_url,
+                    data=json.dumps(request_json),
+                    headers=self.header,
                 )
             # 检查返回请求数据的mime类型是否是audio/***，是则保存到指定路径下；返回的是binary格式的
-            if resp.headers["Content-Type"].startswith("audio/"):
+            if resp.headers.get("Content-Type", "").startswith("audio/"):
                 if output_file:
-                    with open(output_file, "wb") as f:
-                        f.write(resp.content)
+                    await self.save_audio_file(output_file, resp.content)
                     return output_file
                 else:
                     return resp.content
@@ -4,13 +4,18 @@ import queue
 import uuid
 import asyncio
 import threading
+from contextlib import aclosing, nullcontext
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
 from core.utils import p3
 from datetime import datetime
-from core.utils import textUtils
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from core.utils.util import audio_to_data, audio_bytes_to_data
 from core.utils.tts import MarkdownCleaner
+from core.utils.text_segmenter import TextSegmenter
+from core.utils.audio_stream import AudioFileStream, AudioStream, decode_audio_chunks
+from core.utils.tts_cache import tts_audio_cache, get_params_fingerprint
+from core.utils.http_client import tts_http_client
 from core.utils.output_counter import add_device_output
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
@@ -26,6 +31,117 @@ import traceback
 TAG = __name__
 logger = setup_logging()
 
+# 合成线程各自复用一个事件循环，不再为每句话创建和销毁事件循环
+_thread_loops = threading.local()
+
+
+def run_in_thread_loop(coro):
+    """在当前线程的持久事件循环上执行协程"""
+    loop = getattr(_thread_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _thread_loops.loop = loop
+    return loop.run_until_complete(coro)
+
+
+class TTSAudioStream(AudioStream):
+    """流式合成的一句语音
+
+    提交时就在服务器事件循环上开始合成，音频块经解码、编码后逐帧缓存，
+    播放到这一句时从已合成的帧开始发送，不需要等整句合成完成。
+    """
+
+    def __init__(self, provider, text, cache_key=None):
+        self.provider = provider
+        self.text = text
+        self.cache_key = cache_key
+        self.loop = provider.conn.loop
+        self.is_opus = provider.conn.audio_format != "pcm"
+        self.buffer = []
+        self.finished = False
+        self.cancelled = False
+        self.task = None
+        self.changed = asyncio.Event()
+
+    def start(self):
+        """在服务器事件循环上启动合成，可在任意线程调用"""
+        self.loop.call_soon_threadsafe(self._start)
+
+    def _start(self):
+        if self.cancelled:
+            self._finish()
+            return
+        self.task = self.loop.create_task(self._run())
+
+    def cancel(self):
+        """取消合成，可在任意线程调用"""
+        self.cancelled = True
+        self.loop.call_soon_threadsafe(self._cancel)
+
+    def _cancel(self):
+        if self.task:
+            self.task.cancel()
+        self._finish()
+
+    def _finish(self):
+        self.finished = True
+        self.changed.set()
+        self.provider._discard_synthesis(self)
+
+    async def _run(self):
+        max_repeat_time = 5
+        try:
+            async with self.provider.get_stream_semaphore():
+                while max_repeat_time > 0:
+                    try:
+                        chunks = self.provider.text_to_speak_stream(
+                            MarkdownCleaner.clean_markdown(self.text)
+                        )
+                        async with aclosing(
+                            decode_audio_chunks(
+                                chunks, self.provider.audio_file_type, self.is_opus
+                            )
+                        ) as frames:
+                            async for frame in frames:
+                                self.buffer.append(frame)
+                                self.changed.set()
+                        break
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        max_repeat_time -= 1
+                        if self.buffer:
+                            # 已经开始播放的句子不再重试，避免重复
+                            logger.bind(tag=TAG).error(f"流式语音生成中断: {self.text}，错误: {e}")
+                            return
+                        logger.bind(tag=TAG).warning(
+                            f"语音生成失败{5 - max_repeat_time}次: {self.text}，错误: {e}"
+                        )
+                if max_repeat_time <= 0:
+                    logger.bind(tag=TAG).error(
+                        f"语音生成失败: {self.text}，请检查网络或服务是否正常"
+                    )
+                elif self.cache_key and self.buffer:
+                    await asyncio.to_thread(
+                        tts_audio_cache.set, self.cache_key, list(self.buffer)
+                    )
+        finally:
+            self._finish()
+
+    async def frames(self):
+        index = 0
+        while True:
+            while index < len(self.buffer):
+                yield self.buffer[index]
+                index += 1
+            if self.finished:
+                return
+            self.changed.clear()
+            await self.changed.wait()
+
+    def report_frames(self):
+        return self.buffer
+
 
 class TTSProviderBase(ABC):
     def __init__(self, config, delete_audio_file):
@@ -35,12 +151,12 @@ class TTSProviderBase(ABC):
         self.delete_audio_file = delete_audio_file
         self.audio_file_type = "wav"
         self.output_file = config.get("output_dir", "tmp/")
+        self.cache_config = config
         self.tts_text_queue = queue.Queue()
         self.tts_audio_queue = queue.Queue()
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
 
-        self.tts_text_buff = []
         self.punctuations = (
             "。",
             "？",
@@ -66,9 +182,29 @@ class TTSProviderBase(ABC):
             ";",
             "：",
         )
+        # LLM输出的流式分句器，每轮对话开始时重置
+        self.segmenter = TextSegmenter(
+            self.punctuations, self.first_sentence_punctuations
+        )
         self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+
+        # text_to_speak内部完全异步时设为True，直接在服务器事件循环上执行，
+        # 可以跨句子复用连接；内部有阻塞调用的实现在合成线程的事件循环上执行
+        self.native_async = False
+        # 实现了text_to_speak_stream流式合成接口时设为True，需同时设置native_async
+        self.stream_synthesis = False
+        # 通过TTS共享连接池请求的服务地址，打开音频通道时预热到该主机的连接
+        self.http_warmup_url = None
+        self.http_warmup_task = None
+        # 同一TTS服务在所有连接上同时进行的请求数上限
+        self.request_concurrency = 10
+
+        # 非流式TTS同时合成的句子数量，合成结果按句子顺序播放
+        self.tts_max_concurrency = 3
+        self.synthesis_executor = None
+        self.stream_semaphore = None
+        self.pending_synthesis = set()
+        self.pending_synthesis_lock = threading.Lock()
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -83,7 +219,7 @@ class TTSProviderBase(ABC):
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
+                    audio_bytes = self._run_text_to_speak(text, None)
                     if audio_bytes:
                         audio_datas, _ = audio_bytes_to_data(
                             audio_bytes, file_type=self.audio_file_type, is_opus=True
@@ -110,7 +246,7 @@ class TTSProviderBase(ABC):
             try:
                 while not os.path.exists(tmp_file) and max_repeat_time > 0:
                     try:
-                        asyncio.run(self.text_to_speak(text, tmp_file))
+                        self._run_text_to_speak(text, tmp_file)
                     except Exception as e:
                         logger.bind(tag=TAG).warning(
                             f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -138,6 +274,114 @@ class TTSProviderBase(ABC):
     async def text_to_speak(self, text, output_file):
         pass
 
+    def text_to_speak_stream(self, text):
+        """
+        流式合成接口，返回按到达顺序产出音频块（audio_file_type格式）的异步迭代器。
+
+        支持流式返回音频的TTS重写该方法，并设置native_async和stream_synthesis为True；
+        合成时音频块边到达边解码、编码并发送给设备。
+        """
+        raise NotImplementedError
+
+    def get_stream_semaphore(self):
+        """限制同时进行的流式合成数量，在服务器事件循环上创建"""
+        if self.stream_semaphore is None:
+            self.stream_semaphore = asyncio.Semaphore(self.tts_max_concurrency)
+        return self.stream_semaphore
+
+    def _run_text_to_speak(self, *args):
+        """在合成线程中同步执行text_to_speak"""
+        coro = self.text_to_speak(*args)
+        if self.native_async and self.conn and self.conn.loop.is_running():
+            return asyncio.run_coroutine_threadsafe(coro, self.conn.loop).result()
+        return run_in_thread_loop(coro)
+
+    def use_shared_http(self, url):
+        """
+        声明通过http_request使用TTS共享连接池请求url：text_to_speak在服务器事件循环上
+        执行，连接跨句子和设备复用，打开音频通道时预热到该主机的连接。
+        """
+        self.native_async = True
+        self.http_warmup_url = url
+
+    async def http_request(self, method, url, **kwargs):
+        """
+        通过TTS共享连接池发送请求，按主机复用keep-alive连接，
+        同一TTS服务的并发请求数受request_concurrency限制。
+        """
+        params = kwargs.get("params")
+        if params:
+            # 与requests一致：忽略值为None的参数，列表展开为同名参数，其余值转为字符串
+            query = []
+            for key, value in params.items():
+                values = value if isinstance(value, (list, tuple)) else [value]
+                query.extend((key, str(v)) for v in values if v is not None)
+            kwargs["params"] = query
+        async with self._get_request_semaphore():
+            return await tts_http_client.request(method, url, **kwargs)
+
+    def _get_request_semaphore(self):
+        # 信号量只能在服务器事件循环上使用，其他事件循环上不做限制
+        if not self.conn or asyncio.get_running_loop() is not self.conn.loop:
+            return nullcontext()
+        # 同一TTS服务在所有连接上共享并发限制，按TTS模块区分
+        return tts_http_client.limiter(
+            self.__class__.__module__, self.request_concurrency
+        )
+
+    async def save_audio_file(self, output_file, audio_bytes):
+        """在工作线程中写入音频文件，不阻塞事件循环"""
+
+        def write():
+            with open(output_file, "wb") as f:
+                f.write(audio_bytes)
+
+        await asyncio.to_thread(write)
+
+    def get_cache_fingerprint(self):
+        """TTS音频缓存的参数指纹，包含TTS类型、配置和当前音色"""
+        return get_params_fingerprint(
+            self.__class__.__module__,
+            self.cache_config,
+            voice=getattr(self, "voice", None),
+            audio_file_type=self.audio_file_type,
+        )
+
+    def _get_cache_key(self, text):
+        """TTS音频缓存键，只缓存Opus格式的音频"""
+        if self.conn.audio_format == "pcm":
+            return None
+        return tts_audio_cache.make_key(
+            self.get_cache_fingerprint(), MarkdownCleaner.clean_markdown(text)
+        )
+
+    def _get_cached_audio(self, cache_key, text):
+        if not cache_key:
+            return None
+        audio_datas = tts_audio_cache.get(cache_key)
+        if audio_datas:
+            logger.bind(tag=TAG).debug(f"TTS音频缓存命中: {text}")
+        return audio_datas
+
+    def _text_to_audio_datas(self, text):
+        """合成一段文本并返回音频帧，Opus格式时优先使用TTS音频缓存"""
+        cache_key = self._get_cache_key(text)
+        audio_datas = self._get_cached_audio(cache_key, text)
+        if audio_datas:
+            return audio_datas
+
+        if self.delete_audio_file:
+            audio_datas = self.to_tts(text)
+        else:
+            tts_file = self.to_tts(text)
+            if not tts_file or not os.path.exists(tts_file):
+                return None
+            audio_datas = self._process_audio_file(tts_file)
+
+        if cache_key and audio_datas:
+            tts_audio_cache.set(cache_key, audio_datas)
+        return audio_datas
+
     def audio_to_pcm_data(self, audio_file_path):
         """音频文件转换为PCM编码"""
         return audio_to_data(audio_file_path, is_opus=False)
@@ -191,6 +435,25 @@ class TTSProviderBase(ABC):
     async def open_audio_channels(self, conn):
         self.conn = conn
         self.tts_timeout = conn.config.get("tts_timeout", 10)
+        self.tts_max_concurrency = max(1, int(conn.config.get("tts_max_concurrency", 3)))
+        self.segmenter.first_max_chars = int(
+            conn.config.get("tts_first_segment_max_chars", 24)
+        )
+        self.segmenter.first_max_wait = float(
+            conn.config.get("tts_first_segment_max_wait", 0.8)
+        )
+        tts_http_config = conn.config.get("tts_http") or {}
+        self.request_concurrency = int(
+            self.cache_config.get(
+                "max_concurrency",
+                tts_http_config.get("max_concurrency_per_provider", 10),
+            )
+        )
+        if self.http_warmup_url and tts_http_config.get("warmup", True):
+            # 保留任务引用，避免预热完成前被垃圾回收
+            self.http_warmup_task = asyncio.create_task(
+                tts_http_client.warmup(self.http_warmup_url)
+            )
         # tts 消化线程
         self.tts_priority_thread = threading.Thread(
             target=self.tts_text_priority_thread, daemon=True
@@ -215,32 +478,22 @@ class TTSProviderBase(ABC):
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
+                    self.segmenter.reset()
                     self.tts_audio_first_sentence = True
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        if self.delete_audio_file:
-                            audio_datas = self.to_tts(segment_text)
-                            if audio_datas:
-                                self.tts_audio_queue.put(
-                                    (message.sentence_type, audio_datas, segment_text)
-                                )
-                        else:
-                            tts_file = self.to_tts(segment_text)
-                            if tts_file:
-                                audio_datas = self._process_audio_file(tts_file)
-                                self.tts_audio_queue.put(
-                                    (message.sentence_type, audio_datas, segment_text)
-                                )
+                    for segment_text in self._get_segment_text(message.content_detail):
+                        self.tts_audio_queue.put(
+                            (
+                                message.sentence_type,
+                                self._submit_synthesis(segment_text),
+                                segment_text,
+                            )
+                        )
                 elif ContentType.FILE == message.content_type:
                     self._process_remaining_text()
                     tts_file = message.content_file
                     if tts_file and os.path.exists(tts_file):
-                        audio_datas = self._process_audio_file(tts_file)
+                        audio_datas = self._open_audio_stream(tts_file)
                         self.tts_audio_queue.put(
                             (message.sentence_type, audio_datas, message.content_detail)
                         )
@@ -271,6 +524,16 @@ class TTSProviderBase(ABC):
                     if self.conn.stop_event.is_set():
                         break
                     continue
+                if isinstance(audio_datas, Future):
+                    # 等待该句合成完成，后面的句子在此期间继续并发合成
+                    try:
+                        audio_datas = audio_datas.result()
+                    except CancelledError:
+                        continue
+                    if not audio_datas:
+                        continue
+                if isinstance(audio_datas, TTSAudioStream) and audio_datas.cancelled:
+                    continue
                 future = asyncio.run_coroutine_threadsafe(
                     sendAudioMessage(self.conn, sentence_type, audio_datas, text),
                     self.conn.loop,
@@ -278,6 +541,9 @@ class TTSProviderBase(ABC):
                 future.result()
                 if self.conn.max_output_size > 0 and text:
                     add_device_output(self.conn.headers.get("device-id"), len(text))
+                # 流式播放的音频只上报已合成的语音，音频文件不上报
+                if isinstance(audio_datas, AudioStream):
+                    audio_datas = audio_datas.report_frames()
                 enqueue_tts_report(self.conn, text, audio_datas)
             except Exception as e:
                 logger.bind(tag=TAG).error(
@@ -292,47 +558,59 @@ class TTSProviderBase(ABC):
 
     async def close(self):
         """资源清理方法"""
+        self.cancel_pending_synthesis()
+        if self.http_warmup_task:
+            self.http_warmup_task.cancel()
+            self.http_warmup_task = None
+        if self.synthesis_executor:
+            self.synthesis_executor.shutdown(wait=False, cancel_futures=True)
+            self.synthesis_executor = None
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
-    def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(
-                segment_text_raw
+    def _submit_synthesis(self, text):
+        """
+        提交一段文本合成，返回交给播放线程的音频：
+        支持流式合成时返回边合成边播放的TTSAudioStream，
+        否则提交到合成线程池并返回Future，由播放线程按提交顺序等待。
+        """
+        if self.native_async and self.stream_synthesis:
+            cache_key = self._get_cache_key(text)
+            audio_datas = self._get_cached_audio(cache_key, text)
+            if audio_datas:
+                return audio_datas
+            stream = TTSAudioStream(self, text, cache_key)
+            with self.pending_synthesis_lock:
+                self.pending_synthesis.add(stream)
+            stream.start()
+            return stream
+
+        if self.synthesis_executor is None:
+            self.synthesis_executor = ThreadPoolExecutor(
+                max_workers=self.tts_max_concurrency,
+                thread_name_prefix="tts-synthesis",
             )
-            self.processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-            # 如果是第一句话，在找到第一个逗号后，将标志设置为False
-            if self.is_first_sentence:
-                self.is_first_sentence = False
-
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
-            return segment_text
-        else:
-            return None
+        future = self.synthesis_executor.submit(self._text_to_audio_datas, text)
+        with self.pending_synthesis_lock:
+            self.pending_synthesis.add(future)
+        future.add_done_callback(self._discard_synthesis)
+        return future
+
+    def _discard_synthesis(self, synthesis):
+        with self.pending_synthesis_lock:
+            self.pending_synthesis.discard(synthesis)
+
+    def cancel_pending_synthesis(self):
+        """取消尚未开始的合成任务和正在进行的流式合成，线程池中正在合成的句子结果会被丢弃"""
+        with self.pending_synthesis_lock:
+            futures = list(self.pending_synthesis)
+            self.pending_synthesis.clear()
+        for future in futures:
+            future.cancel()
+
+    def _get_segment_text(self, text):
+        """把新到达的文本交给分句器，返回本次切出的句子"""
+        return self.segmenter.feed(text)
 
     def _process_audio_file(self, tts_file):
         """处理音频文件并转换为指定格式
@@ -361,10 +639,14 @@ class TTSProviderBase(ABC):
             os.remove(tts_file)
         return audio_datas
 
+    def _open_audio_stream(self, audio_file):
+        """音频文件按帧流式播放，发送时才读取和解码，不在内存中保留整首音频"""
+        return AudioFileStream(audio_file, self.conn.audio_format)
+
     def _process_before_stop_play_files(self):
         for tts_file, text in self.before_stop_play_files:
             if tts_file and os.path.exists(tts_file):
-                audio_datas = self._process_audio_file(tts_file)
+                audio_datas = self._open_audio_stream(tts_file)
                 self.tts_audio_queue.put((SentenceType.MIDDLE, audio_datas, text))
         self.before_stop_play_files.clear()
         self.tts_audio_queue.put((SentenceType.LAST, [], None))
@@ -375,23 +657,13 @@ class TTSProviderBase(ABC):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                if self.delete_audio_file:
-                    audio_datas = self.to_tts(segment_text)
-                    if audio_datas:
-                        self.tts_audio_queue.put(
-                            (SentenceType.MIDDLE, audio_datas, segment_text)
-                        )
-                else:
-                    tts_file = self.to_tts(segment_text)
-                    audio_datas = self._process_audio_file(tts_file)
-                    self.tts_audio_queue.put(
-                        (SentenceType.MIDDLE, audio_datas, segment_text)
-                    )
-                self.processed_chars += len(full_text)
-                return True
-        return False
+        segments = self.segmenter.flush()
+        for segment_text in segments:
+            self.tts_audio_queue.put(
+                (
+                    SentenceType.MIDDLE,
+                    self._submit_synthesis(segment_text),
+                    segment_text,
+                )
+            )
+        return bool(segments)
@@ -1,4 +1,3 @@
-import requests
 from core.providers.tts.base import TTSProviderBase
 
 
@@ -15,6 +14,7 @@ class TTSProvider(TTSProviderBase):
         self.audio_file_type = config.get("response_format", "wav")
         self.host = "api.coze.cn"
         self.api_url = f"https://{self.host}/v1/audio/speech"
+        self.use_shared_http(self.api_url)
 
     async def text_to_speak(self, text, output_file):
         request_json = {
@@ -29,13 +29,12 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            response = requests.request(
+            response = await self.http_request(
                 "POST", self.api_url, json=request_json, headers=headers
             )
             data = response.content
             if output_file:
-                with open(output_file, "wb") as file_to_save:
-                    file_to_save.write(data)
+                await self.save_audio_file(output_file, data)
             else:
                 return data
         except Exception as e:
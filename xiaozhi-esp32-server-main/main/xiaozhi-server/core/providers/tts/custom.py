@@ -1,7 +1,6 @@
 import os
 import json
 import uuid
-import requests
 from config.logger import setup_logging
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
@@ -28,6 +27,8 @@ class TTSProvider(TTSProviderBase):
         elif not isinstance(self.params, dict):
             raise TypeError("Custom TTS配置参数出错, 请参考配置说明")
 
+        self.use_shared_http(self.url)
+
     def generate_filename(self):
         return os.path.join(self.output_file, f"tts-{datetime.now().date()}@{uuid.uuid4().hex}.{self.format}")
 
@@ -39,13 +40,16 @@ class TTSProvider(TTSProviderBase):
             request_params[k] = v
 
         if self.method.upper() == "POST":
-            resp = requests.post(self.url, json=request_params, headers=self.headers)
+            resp = await self.http_request(
+                "POST", self.url, json=request_params, headers=self.headers
+            )
         else:
-            resp = requests.get(self.url, params=request_params, headers=self.headers)
+            resp = await self.http_request(
+                "GET", self.url, params=request_params, headers=self.headers
+            )
         if resp.status_code == 200:
             if output_file:
-                with open(output_file, "wb") as file:
-                    file.write(resp.content)
+                await self.save_audio_file(output_file, resp.content)
             else:
                 return resp.content
         else:
@@ -1,7 +1,6 @@
 import uuid
 import json
 import base64
-import requests
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
@@ -37,6 +36,7 @@ class TTSProvider(TTSProviderBase):
         self.api_url = config.get("api_url")
         self.authorization = config.get("authorization")
         self.header = {"Authorization": f"{self.authorization}{self.access_token}"}
+        self.use_shared_http(self.api_url)
         model_key_msg = check_model_key("TTS", self.access_token)
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
@@ -67,15 +67,15 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            resp = await self.http_request(
+                "POST", self.api_url, data=json.dumps(request_json), headers=self.header
             )
-            if "data" in resp.json():
-                data = resp.json()["data"]
+            resp_json = resp.json()
+            if "data" in resp_json:
+                data = resp_json["data"]
                 audio_bytes = base64.b64decode(data)
                 if output_file:
-                    with open(output_file, "wb") as file_to_save:
-                        file_to_save.write(audio_bytes)
+                    await self.save_audio_file(output_file, audio_bytes)
                 else:
                     return audio_bytes
             else:
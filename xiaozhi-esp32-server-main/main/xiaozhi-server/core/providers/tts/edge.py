@@ -13,6 +13,9 @@ class TTSProvider(TTSProviderBase):
         else:
             self.voice = config.get("voice")
         self.audio_file_type = config.get("format", "mp3")
+        # edge_tts是纯异步实现，直接在服务器事件循环上合成
+        self.native_async = True
+        self.stream_synthesis = True
 
     def generate_filename(self, extension=".mp3"):
         return os.path.join(
@@ -43,4 +46,11 @@ class TTSProvider(TTSProviderBase):
                 return audio_bytes
         except Exception as e:
             error_msg = f"Edge TTS请求失败: {e}"
-            raise Exception(error_msg)  # 抛出异常，让调用方捕获
\ No newline at end of file
+            raise Exception(error_msg)  # 抛出异常，让调用方捕获
+
+    async def text_to_speak_stream(self, text):
+        """流式合成，音频块到达后立即交给解码和发送"""
+        communicate = edge_tts.Communicate(text, voice=self.voice)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
@@ -1,5 +1,5 @@
 import base64
-import requests
+import asyncio
 import ormsgpack
 from pathlib import Path
 from pydantic import BaseModel, Field, conint, model_validator
@@ -130,11 +130,17 @@ class TTSProvider(TTSProviderBase):
         self.use_memory_cache = config.get("use_memory_cache", "on")
         self.seed = int(config.get("seed")) if config.get("seed") else None
         self.api_url = config.get("api_url", "http://127.0.0.1:8080/v1/tts")
+        self.use_shared_http(self.api_url)
 
-    async def text_to_speak(self, text, output_file):
-        # Prepare reference data
+    def _read_references(self):
+        """读取参考音频和文本，在工作线程中执行"""
         byte_audios = [audio_to_bytes(ref_audio) for ref_audio in self.reference_audio]
         ref_texts = [read_ref_text(ref_text) for ref_text in self.reference_text]
+        return byte_audios, ref_texts
+
+    async def text_to_speak(self, text, output_file):
+        # Prepare reference data
+        byte_audios, ref_texts = await asyncio.to_thread(self._read_references)
 
         data = {
             "text": text,
@@ -157,7 +163,8 @@ class TTSProvider(TTSProviderBase):
 
         pydantic_data = ServeTTSRequest(**data)
 
-        response = requests.post(
+        response = await self.http_request(
+            "POST",
             self.api_url,
             data=ormsgpack.packb(
                 pydantic_data, option=ormsgpack.OPT_SERIALIZE_PYDANTIC
@@ -172,8 +179,7 @@ class TTSProvider(TTSProviderBase):
             audio_content = response.content
 
             if output_file:
-                with open(output_file, "wb") as audio_file:
-                    audio_file.write(audio_content)
+                await self.save_audio_file(output_file, audio_content)
             else:
                 return audio_content
 
@@ -1,4 +1,3 @@
-import requests
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
 from core.utils.util import parse_string_to_list
@@ -11,6 +10,7 @@ class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.url = config.get("url")
+        self.use_shared_http(self.url)
         self.text_lang = config.get("text_lang", "zh")
         self.ref_audio_path = config.get("ref_audio_path")
         self.prompt_text = config.get("prompt_text")
@@ -90,11 +90,10 @@ class TTSProvider(TTSProviderBase):
             "repetition_penalty": self.repetition_penalty,
         }
 
-        resp = requests.post(self.url, json=request_json)
+        resp = await self.http_request("POST", self.url, json=request_json)
         if resp.status_code == 200:
             if output_file:
-                with open(output_file, "wb") as file:
-                    file.write(resp.content)
+                await self.save_audio_file(output_file, resp.content)
             else:
                 return resp.content
         else:
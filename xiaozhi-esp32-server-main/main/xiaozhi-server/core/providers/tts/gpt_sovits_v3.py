@@ -1,4 +1,3 @@
-import requests
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
 from core.utils.util import parse_string_to_list
@@ -11,6 +10,7 @@ class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.url = config.get("url")
+        self.use_shared_http(self.url)
         self.refer_wav_path = config.get("refer_wav_path")
         self.prompt_text = config.get("prompt_text")
         self.prompt_language = config.get("prompt_language")
@@ -51,11 +51,10 @@ class TTSProvider(TTSProviderBase):
             "if_sr": self.if_sr,
         }
 
-        resp = requests.get(self.url, params=request_params)
+        resp = await self.http_request("GET", self.url, params=request_params)
         if resp.status_code == 200:
             if output_file:
-                with open(output_file, "wb") as file:
-                    file.write(resp.content)
+                await self.save_audio_file(output_file, resp.content)
             else:
                 return resp.content
         else:
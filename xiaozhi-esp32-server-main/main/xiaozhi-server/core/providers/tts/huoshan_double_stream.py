@@ -1,18 +1,20 @@
 import os
+import time
 import uuid
 import json
 import queue
 import asyncio
 import traceback
 import websockets
+from typing import Dict, List, Tuple
+from websockets.protocol import State
 from core.utils.tts import MarkdownCleaner
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.util import check_model_key
-from core.providers.tts.base import TTSProviderBase
+from core.providers.tts.base import TTSProviderBase, run_in_thread_loop
 from core.handle.abortHandle import handleAbortMessage
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
-from asyncio import Task
 
 
 TAG = __name__
@@ -138,12 +140,144 @@ class Response:
         return super().__str__()
 
 
+
+# 连接池默认最多保留的空闲连接数和空闲连接的最长保留时间（秒）
+DEFAULT_MAX_IDLE_CONNECTIONS = 4
+DEFAULT_MAX_IDLE_TIME = 60
+# 建连失败后的退避时间（秒），连续失败时按指数增长
+BACKOFF_BASE = 1
+BACKOFF_MAX = 30
+# 等待建连握手和结束会话的超时时间（秒）
+HANDSHAKE_TIMEOUT = 5
+SESSION_FINISH_TIMEOUT = 2
+# 非流式合成时等待下一条响应的超时时间（秒）
+ONE_SHOT_RECV_TIMEOUT = 30
+
+# 后台关闭中的连接，保留引用避免任务被回收
+_closing_tasks = set()
+
+
+def _is_open(ws) -> bool:
+    return ws is not None and ws.state is State.OPEN
+
+
+async def _close_quietly(ws):
+    if ws is None:
+        return
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+
+def _close_in_background(ws):
+    """不等待关闭握手，在后台关闭连接"""
+    task = asyncio.create_task(_close_quietly(ws))
+    _closing_tasks.add(task)
+    task.add_done_callback(_closing_tasks.discard)
+
+
+class HuoshanConnectionPool:
+    """
+    火山引擎双流式TTS的WebSocket连接池
+
+    连接完成StartConnection握手后才会交给TTS使用，设备断开后连接归还连接池，
+    新设备连接时直接复用，不再为每轮对话重新建立TLS连接和鉴权。
+    取出连接时检查连接状态和空闲时长，空闲期间的心跳由websockets的ping维持；
+    建连失败后按指数退避，退避期间直接失败，不再反复请求服务端。
+    连接只能在服务器事件循环上复用，其他事件循环上的请求直接新建连接，用完即关闭。
+    """
+
+    def __init__(self):
+        self._idle: Dict[tuple, List[Tuple[object, float]]] = {}
+        self._loop = None
+        self._failures: Dict[tuple, int] = {}
+        self._retry_at: Dict[tuple, float] = {}
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.configure()
+
+    def configure(self, config=None):
+        config = config or {}
+        self.max_idle_connections = int(
+            config.get("max_idle_connections", DEFAULT_MAX_IDLE_CONNECTIONS)
+        )
+        self.max_idle_time = float(config.get("max_idle_time", DEFAULT_MAX_IDLE_TIME))
+
+    def bind_loop(self, loop):
+        """绑定服务器事件循环，只有该循环上的连接会放入连接池"""
+        if self._loop is not loop:
+            self._idle.clear()
+            self._loop = loop
+
+    def _on_pool_loop(self) -> bool:
+        return self._loop is not None and asyncio.get_running_loop() is self._loop
+
+    async def acquire(self, provider):
+        """取出一个可用的连接，没有空闲连接时新建"""
+        key = provider.connection_key()
+        if self._on_pool_loop():
+            now = time.monotonic()
+            idle = self._idle.get(key, [])
+            while idle:
+                ws, released_at = idle.pop()
+                if _is_open(ws) and now - released_at < self.max_idle_time:
+                    self.reused += 1
+                    return ws
+                self.discarded += 1
+                _close_in_background(ws)
+
+        retry_at = self._retry_at.get(key, 0)
+        if time.monotonic() < retry_at:
+            raise ConnectionError(
+                f"火山引擎TTS建连失败，{retry_at - time.monotonic():.1f}秒后重试"
+            )
+        try:
+            ws = await provider.open_connection()
+        except Exception:
+            failures = self._failures.get(key, 0) + 1
+            self._failures[key] = failures
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (failures - 1))
+            self._retry_at[key] = time.monotonic() + delay
+            raise
+        self._failures.pop(key, None)
+        self._retry_at.pop(key, None)
+        self.created += 1
+        return ws
+
+    async def release(self, provider, ws):
+        """归还没有进行中会话的连接"""
+        if not self._on_pool_loop():
+            await _close_quietly(ws)
+            return
+        idle = self._idle.setdefault(provider.connection_key(), [])
+        if not _is_open(ws) or len(idle) >= self.max_idle_connections:
+            self.discarded += 1
+            _close_in_background(ws)
+            return
+        idle.append((ws, time.monotonic()))
+
+    def get_statistics(self):
+        """获取连接池统计信息"""
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+            "idle": sum(len(idle) for idle in self._idle.values()),
+            "backoff": len(self._retry_at),
+        }
+
+
+# 进程内共享的连接池，所有设备连接复用
+connection_pool = HuoshanConnectionPool()
+
+
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.ws = None
         self.interface_type = InterfaceType.DUAL_STREAM
-        self._monitor_task = None  # 监听任务引用
         self.appId = config.get("appid")
         self.access_token = config.get("access_token")
         self.cluster = config.get("cluster")
@@ -160,10 +294,30 @@ class TTSProvider(TTSProviderBase):
         self.opus_encoder = opus_encoder_utils.OpusEncoderUtils(
             sample_rate=16000, channels=1, frame_size_ms=60
         )
+        # 上一轮会话结束后是否提前为下一轮启动会话
+        self.session_prestart = str(config.get("session_prestart", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        connection_pool.configure(config)
+
+        self._connection_lock = asyncio.Lock()
+        self._reader_task = None  # 连接上的响应读取任务
+        self.session_id = None  # 当前轮对话的会话ID
+        self._ready_session = None  # 预先启动、尚未使用的会话：(会话ID, 音色)
+        self._sessions = {}  # 连接上未结束的会话，会话结束时完成对应的Future
+        self._finish_sent = set()  # 已发送FinishSession的会话
+        self._reset_turn_state()
+
         model_key_msg = check_model_key("TTS", self.access_token)
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
+    def connection_key(self):
+        """连接池按服务地址和鉴权信息区分连接"""
+        return (self.ws_url, self.appId, self.access_token, self.resource_id)
+
     async def open_audio_channels(self, conn):
         try:
             await super().open_audio_channels(conn)
@@ -171,26 +325,71 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).error(f"Failed to open audio channels: {str(e)}")
             self.ws = None
             raise
+        connection_pool.bind_loop(conn.loop)
+        # 设备连接后就准备好连接和会话，第一轮对话不再等待建连和会话握手
+        asyncio.create_task(self._warmup())
 
-    async def _ensure_connection(self):
-        """建立新的WebSocket连接"""
+    async def _warmup(self):
         try:
-            logger.bind(tag=TAG).info("开始建立新连接...")
-            ws_header = {
-                "X-Api-App-Key": self.appId,
-                "X-Api-Access-Key": self.access_token,
-                "X-Api-Resource-Id": self.resource_id,
-                "X-Api-Connect-Id": uuid.uuid4(),
-            }
-            self.ws = await websockets.connect(
-                self.ws_url, additional_headers=ws_header, max_size=1000000000
-            )
-            logger.bind(tag=TAG).info("WebSocket连接建立成功")
-            return self.ws
+            await self._ensure_connection()
+            if self.session_prestart:
+                await self._prestart_session()
         except Exception as e:
-            logger.bind(tag=TAG).error(f"建立连接失败: {str(e)}")
-            self.ws = None
+            logger.bind(tag=TAG).warning(f"预热TTS连接失败: {str(e)}")
+
+    async def open_connection(self):
+        """建立新的WebSocket连接并完成StartConnection握手"""
+        logger.bind(tag=TAG).info("开始建立新连接...")
+        ws_header = {
+            "X-Api-App-Key": self.appId,
+            "X-Api-Access-Key": self.access_token,
+            "X-Api-Resource-Id": self.resource_id,
+            "X-Api-Connect-Id": str(uuid.uuid4()),
+        }
+        ws = await websockets.connect(
+            self.ws_url,
+            additional_headers=ws_header,
+            max_size=1000000000,
+            open_timeout=HANDSHAKE_TIMEOUT,
+        )
+        try:
+            await self.start_connection(ws)
+            msg = await asyncio.wait_for(ws.recv(), timeout=HANDSHAKE_TIMEOUT)
+            res = self.parser_response(msg)
+            if res.optional.event != EVENT_ConnectionStarted:
+                raise RuntimeError(f"建连失败: {res.optional.response_meta_json}")
+        except BaseException:
+            await _close_quietly(ws)
             raise
+        logger.bind(tag=TAG).info("WebSocket连接建立成功")
+        return ws
+
+    async def _ensure_connection(self):
+        """返回当前可用的连接，没有时从连接池取出并启动响应读取任务"""
+        async with self._connection_lock:
+            if _is_open(self.ws) and self._reader_task is not None:
+                return self.ws
+            if self.ws is not None:
+                await self._discard_connection()
+            try:
+                ws = await connection_pool.acquire(self)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"建立连接失败: {str(e)}")
+                raise
+            self.ws = ws
+            self._reader_task = asyncio.create_task(self._read_responses(ws))
+            return ws
+
+    async def _discard_connection(self):
+        """关闭当前连接，连接上未结束的会话一并结束"""
+        ws, self.ws = self.ws, None
+        reader, self._reader_task = self._reader_task, None
+        if reader is not None:
+            reader.cancel()
+        self._ready_session = None
+        for session_id in list(self._sessions):
+            self._end_session(session_id)
+        await _close_quietly(ws)
 
     def tts_text_priority_thread(self):
         """火山引擎双流式TTS的文本处理线程"""
@@ -207,7 +406,7 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     try:
-                        if not getattr(self.conn, "sentence_id", None): 
+                        if not getattr(self.conn, "sentence_id", None):
                             self.conn.sentence_id = uuid.uuid4().hex
                             logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
 
@@ -271,221 +470,246 @@ class TTSProvider(TTSProviderBase):
     async def text_to_speak(self, text, _):
         """发送文本到TTS服务"""
         try:
-            # 建立新连接
-            if self.ws is None:
-                logger.bind(tag=TAG).warning(f"WebSocket连接不存在，终止发送文本")
+            if not _is_open(self.ws) or self.session_id is None:
+                logger.bind(tag=TAG).warning(f"TTS会话不存在，终止发送文本")
                 return
 
             #  过滤Markdown
             filtered_text = MarkdownCleaner.clean_markdown(text)
 
             # 发送文本
-            await self.send_text(self.voice, filtered_text, self.conn.sentence_id)
+            await self.send_text(self.voice, filtered_text, self.session_id)
             return
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            await self._discard_connection()
             raise
 
     async def start_session(self, session_id):
         logger.bind(tag=TAG).info(f"开始会话～～{session_id}")
+        # 上一轮会话可能仍在输出（例如被打断），新会话开始前不再接收它的音频
+        self.session_id = None
+        self._reset_turn_state()
         try:
-            task = self._monitor_task
+            await self._ensure_connection()
+            ready, self._ready_session = self._ready_session, None
             if (
-                task is not None
-                and isinstance(task, Task)
-                and not task.done()
+                ready is not None
+                and ready[1] == self.voice
+                and ready[0] in self._sessions
             ):
-                logger.bind(tag=TAG).info("等待上一个监听任务结束...")
-                if self.ws is not None:
-                    logger.bind(tag=TAG).info("强制关闭上一个WebSocket连接以唤醒监听任务...")
-                    try:
-                        await self.ws.close()
-                    except Exception as e:
-                        logger.bind(tag=TAG).warning(f"关闭上一个ws异常: {e}")
-                    self.ws = None
-                try:
-                    await asyncio.wait_for(task, timeout=8)
-                except Exception as e:
-                    logger.bind(tag=TAG).warning(f"等待监听任务异常: {e}")
-                self._monitor_task = None
-            # 建立新连接
-            await self._ensure_connection()
+                self.session_id = ready[0]
+                logger.bind(tag=TAG).info(f"使用预启动的会话: {self.session_id}")
+                return
 
-            # 启动监听任务
-            self._monitor_task = asyncio.create_task(self._start_monitor_tts_response())
-
-            header = Header(
-                message_type=FULL_CLIENT_REQUEST,
-                message_type_specific_flags=MsgTypeFlagWithEvent,
-                serial_method=JSON,
-            ).as_bytes()
-            optional = Optional(
-                event=EVENT_StartSession, sessionId=session_id
-            ).as_bytes()
-            payload = self.get_payload_bytes(
-                event=EVENT_StartSession, speaker=self.voice
+            # 同一连接上的会话串行执行，未结束的会话先结束
+            if self._sessions:
+                await self._finish_open_sessions()
+                await self._ensure_connection()
+
+            self._sessions[session_id] = self.conn.loop.create_future()
+            self.session_id = session_id
+            await self._send_session_event(
+                EVENT_StartSession,
+                session_id,
+                self.get_payload_bytes(event=EVENT_StartSession, speaker=self.voice),
             )
-            await self.send_event(self.ws, header, optional, payload)
             logger.bind(tag=TAG).info("会话启动请求已发送")
         except Exception as e:
             logger.bind(tag=TAG).error(f"启动会话失败: {str(e)}")
             # 确保清理资源
-            if hasattr(self, "_monitor_task"):
-                try:
-                    self._monitor_task.cancel()
-                    await self._monitor_task
-                except:
-                    pass
-                self._monitor_task = None
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            self.session_id = None
+            await self._discard_connection()
             raise
 
     async def finish_session(self, session_id):
         logger.bind(tag=TAG).info(f"关闭会话～～{session_id}")
+        current = self.session_id
+        if current is None or not _is_open(self.ws):
+            return
         try:
-            if self.ws:
-                header = Header(
-                    message_type=FULL_CLIENT_REQUEST,
-                    message_type_specific_flags=MsgTypeFlagWithEvent,
-                    serial_method=JSON,
-                ).as_bytes()
-                optional = Optional(
-                    event=EVENT_FinishSession, sessionId=session_id
-                ).as_bytes()
-                payload = str.encode("{}")
-                await self.send_event(self.ws, header, optional, payload)
-                logger.bind(tag=TAG).info("会话结束请求已发送")
-
-                # 等待监听任务完成
-                if hasattr(self, "_monitor_task"):
-                    try:
-                        await self._monitor_task
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(
-                            f"等待监听任务完成时发生错误: {str(e)}"
-                        )
-                    finally:
-                        self._monitor_task = None
+            await self._send_finish_session(current)
+            logger.bind(tag=TAG).info("会话结束请求已发送")
 
-                # 关闭连接
-                await self.close()
+            # 等待本轮音频全部收到，连接保留给下一轮对话
+            finished = self._sessions.get(current)
+            if finished is not None:
+                await asyncio.shield(finished)
         except Exception as e:
             logger.bind(tag=TAG).error(f"关闭会话失败: {str(e)}")
             # 确保清理资源
-            if hasattr(self, "_monitor_task"):
-                try:
-                    self._monitor_task.cancel()
-                    await self._monitor_task
-                except:
-                    pass
-                self._monitor_task = None
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            await self._discard_connection()
             raise
 
+    async def _prestart_session(self):
+        """提前为下一轮对话启动会话，下一轮开始时省去StartSession的往返"""
+        if not _is_open(self.ws) or self._sessions or self._ready_session:
+            return
+        session_id = uuid.uuid4().hex
+        self._sessions[session_id] = asyncio.get_running_loop().create_future()
+        self._ready_session = (session_id, self.voice)
+        try:
+            await self._send_session_event(
+                EVENT_StartSession,
+                session_id,
+                self.get_payload_bytes(event=EVENT_StartSession, speaker=self.voice),
+            )
+            logger.bind(tag=TAG).debug(f"预启动会话: {session_id}")
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"预启动会话失败: {str(e)}")
+            await self._discard_connection()
+
+    async def _finish_open_sessions(self):
+        """结束连接上所有未结束的会话，等待超时则丢弃该连接"""
+        try:
+            for session_id in list(self._sessions):
+                await self._send_finish_session(session_id)
+            pending = list(self._sessions.values())
+            if pending:
+                _, not_done = await asyncio.wait(
+                    pending, timeout=SESSION_FINISH_TIMEOUT
+                )
+                if not_done:
+                    logger.bind(tag=TAG).warning("等待上一个会话结束超时，丢弃当前连接")
+                    await self._discard_connection()
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"结束上一个会话失败: {str(e)}")
+            await self._discard_connection()
+
+    async def _send_finish_session(self, session_id):
+        if session_id in self._finish_sent:
+            return
+        self._finish_sent.add(session_id)
+        await self._send_session_event(EVENT_FinishSession, session_id, b"{}")
+
+    def _end_session(self, session_id):
+        """会话结束或失败"""
+        self._finish_sent.discard(session_id)
+        finished = self._sessions.pop(session_id, None)
+        if finished is not None and not finished.done():
+            finished.set_result(None)
+        if self._ready_session and self._ready_session[0] == session_id:
+            self._ready_session = None
+        if session_id is None or session_id != self.session_id:
+            return
+        self.session_id = None
+        logger.bind(tag=TAG).debug(f"会话结束～～")
+        if not self.conn.client_abort:
+            self._process_before_stop_play_files()
+        if self.session_prestart and _is_open(self.ws):
+            asyncio.create_task(self._prestart_session())
+
     async def close(self):
-        """资源清理方法"""
-        if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
-            self.ws = None
+        """资源清理方法：没有进行中的会话时把连接归还连接池，供其他设备连接复用"""
+        ready = self._ready_session
+        if _is_open(self.ws) and ready and list(self._sessions) == [ready[0]]:
+            # 预启动的会话不再使用
+            await self._finish_open_sessions()
+        if _is_open(self.ws) and not self._sessions:
+            ws, self.ws = self.ws, None
+            reader, self._reader_task = self._reader_task, None
+            if reader is not None:
+                reader.cancel()
+                await asyncio.gather(reader, return_exceptions=True)
+            await connection_pool.release(self, ws)
+        else:
+            await self._discard_connection()
+        await super().close()
 
-    async def _start_monitor_tts_response(self):
-        """监听TTS响应"""
-        opus_datas_cache = []
-        is_first_sentence = True
-        first_sentence_segment_count = 0  # 添加计数器
+    async def _read_responses(self, ws):
+        """持续读取连接上的响应，按会话ID分发"""
         try:
-            while not self.conn.stop_event.is_set():
-                try:
-                    # 确保 `recv()` 运行在同一个 event loop
-                    msg = await self.ws.recv()
-                    res = self.parser_response(msg)
-                    self.print_response(res, "send_text res:")
-
-                    # 检查客户端是否中止
-                    if self.conn.client_abort:
-                        logger.bind(tag=TAG).info("收到打断信息，终止监听TTS响应")
-                        break
-
-                    if res.optional.event == EVENT_TTSSentenceStart:
-                        json_data = json.loads(res.payload.decode("utf-8"))
-                        self.tts_text = json_data.get("text", "")
-                        logger.bind(tag=TAG).debug(f"句子语音生成开始: {self.tts_text}")
-                        self.tts_audio_queue.put(
-                            (SentenceType.FIRST, [], self.tts_text)
-                        )
-                        opus_datas_cache = []
-                        first_sentence_segment_count = 0  # 重置计数器
-                    elif (
-                        res.optional.event == EVENT_TTSResponse
-                        and res.header.message_type == AUDIO_ONLY_RESPONSE
-                    ):
-                        logger.bind(tag=TAG).debug(f"推送数据到队列里面～～")
-                        opus_datas = self.wav_to_opus_data_audio_raw(res.payload)
-                        logger.bind(tag=TAG).debug(
-                            f"推送数据到队列里面帧数～～{len(opus_datas)}"
-                        )
-                        if is_first_sentence:
-                            first_sentence_segment_count += 1
-                            if first_sentence_segment_count <= 6:
-                                self.tts_audio_queue.put(
-                                    (SentenceType.MIDDLE, opus_datas, None)
-                                )
-                            else:
-                                opus_datas_cache = opus_datas_cache + opus_datas
-                        else:
-                            # 后续句子缓存
-                            opus_datas_cache = opus_datas_cache + opus_datas
-                    elif res.optional.event == EVENT_TTSSentenceEnd:
-                        logger.bind(tag=TAG).info(f"句子语音生成成功：{self.tts_text}")
-                        if not is_first_sentence or first_sentence_segment_count > 10:
-                            # 发送缓存的数据
-                            self.tts_audio_queue.put(
-                                (SentenceType.MIDDLE, opus_datas_cache, None)
-                            )
-                        # 第一句话结束后，将标志设置为False
-                        is_first_sentence = False
-                    elif res.optional.event == EVENT_SessionFinished:
-                        logger.bind(tag=TAG).debug(f"会话结束～～")
-                        self._process_before_stop_play_files()
-                        break
-                except websockets.ConnectionClosed:
-                    logger.bind(tag=TAG).warning("WebSocket连接已关闭")
-                    break
-                except Exception as e:
-                    logger.bind(tag=TAG).error(
-                        f"Error in _start_monitor_tts_response: {e}"
-                    )
-                    traceback.print_exc()
-                    break
+            while True:
+                msg = await ws.recv()
+                res = self.parser_response(msg)
+                self.print_response(res, "send_text res:")
+                self._dispatch_response(res)
+        except websockets.ConnectionClosed:
+            logger.bind(tag=TAG).warning("WebSocket连接已关闭")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in _read_responses: {e}")
+            traceback.print_exc()
         finally:
-            # 确保清理资源
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
-            # 监听任务退出时清理引用
-            self._monitor_task = None
+            # 连接异常断开时清理，主动关闭或归还连接时读取任务已被替换
+            if self._reader_task is asyncio.current_task():
+                self._reader_task = None
+                await self._discard_connection()
+
+    def _dispatch_response(self, res: Response):
+        event = res.optional.event
+        session_id = res.optional.sessionId
+        if event == EVENT_SessionFailed:
+            logger.bind(tag=TAG).error(f"TTS会话失败: {res.optional.response_meta_json}")
+            self._end_session(session_id)
+            return
+        if event == EVENT_SessionFinished:
+            self._end_session(session_id)
+            return
+        # 不属于当前轮对话的响应（被打断的会话、预启动的会话）直接丢弃
+        if session_id is None or session_id != self.session_id:
+            return
+
+        # 检查客户端是否中止
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("收到打断信息，结束当前TTS会话")
+            self.session_id = None
+            asyncio.create_task(self._abort_session(session_id))
+            return
+
+        if event == EVENT_TTSSentenceStart:
+            json_data = json.loads(res.payload.decode("utf-8"))
+            self.tts_text = json_data.get("text", "")
+            logger.bind(tag=TAG).debug(f"句子语音生成开始: {self.tts_text}")
+            self.tts_audio_queue.put((SentenceType.FIRST, [], self.tts_text))
+            self._opus_datas_cache = []
+            self._first_sentence_segment_count = 0  # 重置计数器
+        elif (
+            event == EVENT_TTSResponse
+            and res.header.message_type == AUDIO_ONLY_RESPONSE
+        ):
+            logger.bind(tag=TAG).debug(f"推送数据到队列里面～～")
+            opus_datas = self.wav_to_opus_data_audio_raw(res.payload)
+            logger.bind(tag=TAG).debug(f"推送数据到队列里面帧数～～{len(opus_datas)}")
+            if self._is_first_sentence:
+                self._first_sentence_segment_count += 1
+                if self._first_sentence_segment_count <= 6:
+                    self.tts_audio_queue.put((SentenceType.MIDDLE, opus_datas, None))
+                    return
+            # 后续句子缓存
+            self._opus_datas_cache.extend(opus_datas)
+        elif event == EVENT_TTSSentenceEnd:
+            logger.bind(tag=TAG).info(f"句子语音生成成功：{self.tts_text}")
+            if self._opus_datas_cache:
+                # 发送缓存的数据
+                self.tts_audio_queue.put(
+                    (SentenceType.MIDDLE, self._opus_datas_cache, None)
+                )
+                self._opus_datas_cache = []
+            # 第一句话结束后，将标志设置为False
+            self._is_first_sentence = False
+
+    async def _abort_session(self, session_id):
+        try:
+            await self._send_finish_session(session_id)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"结束被打断的会话失败: {str(e)}")
+            await self._discard_connection()
+
+    def _reset_turn_state(self):
+        """每轮对话开始时重置句子缓存和编码器状态"""
+        self.opus_encoder.reset_state()
+        self._opus_datas_cache = []
+        self._is_first_sentence = True
+        self._first_sentence_segment_count = 0
+
+    async def _send_session_event(self, event, session_id, payload, ws=None):
+        header = Header(
+            message_type=FULL_CLIENT_REQUEST,
+            message_type_specific_flags=MsgTypeFlagWithEvent,
+            serial_method=JSON,
+        ).as_bytes()
+        optional = Optional(event=event, sessionId=session_id).as_bytes()
+        await self.send_event(ws or self.ws, header, optional, payload)
 
     async def send_event(
         self,
@@ -508,22 +732,16 @@ class TTSProvider(TTSProviderBase):
             raise
 
     async def send_text(self, speaker: str, text: str, session_id):
-        header = Header(
-            message_type=FULL_CLIENT_REQUEST,
-            message_type_specific_flags=MsgTypeFlagWithEvent,
-            serial_method=JSON,
-        ).as_bytes()
-        optional = Optional(event=EVENT_TaskRequest, sessionId=session_id).as_bytes()
         payload = self.get_payload_bytes(
             event=EVENT_TaskRequest, text=text, speaker=speaker
         )
-        return await self.send_event(self.ws, header, optional, payload)
+        return await self._send_session_event(EVENT_TaskRequest, session_id, payload)
 
     # 读取 res 数组某段 字符串内容
     def read_res_content(self, res: bytes, offset: int):
         content_size = int.from_bytes(res[offset : offset + 4], "big", signed=True)
         offset += 4
-        content = str(res[offset : offset + content_size])
+        content = res[offset : offset + content_size].decode("utf-8", errors="replace")
         offset += content_size
         return content, offset
 
@@ -588,14 +806,14 @@ class TTSProvider(TTSProviderBase):
             response.payload, offset = self.read_res_payload(res, offset)
         return response
 
-    async def start_connection(self):
+    async def start_connection(self, ws):
         header = Header(
             message_type=FULL_CLIENT_REQUEST,
             message_type_specific_flags=MsgTypeFlagWithEvent,
         ).as_bytes()
         optional = Optional(event=EVENT_Start_Connection).as_bytes()
         payload = str.encode("{}")
-        return await self.send_event(self.ws, header, optional, payload)
+        return await self.send_event(ws, header, optional, payload)
 
     def print_response(self, res, tag_msg: str):
         logger.bind(tag=TAG).debug(f"===>{tag_msg} header:{res.header.__dict__}")
@@ -632,9 +850,12 @@ class TTSProvider(TTSProviderBase):
         opus_datas = self.opus_encoder.encode_pcm_to_opus(raw_data_var, is_end)
         return opus_datas
 
+
     def to_tts(self, text: str) -> list:
         """非流式生成音频数据，用于生成音频及测试场景
 
+        在服务器事件循环上执行时复用连接池中的连接。
+
         Args:
             text: 要转换的文本
 
@@ -642,96 +863,65 @@ class TTSProvider(TTSProviderBase):
             list: 音频数据列表
         """
         try:
-            # 创建事件循环
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            # 生成会话ID
-            session_id = uuid.uuid4().__str__().replace("-", "")
-
-            # 存储音频数据
-            audio_data = []
-
-            async def _generate_audio():
-                # 创建新的WebSocket连接
-                ws_header = {
-                    "X-Api-App-Key": self.appId,
-                    "X-Api-Access-Key": self.access_token,
-                    "X-Api-Resource-Id": self.resource_id,
-                    "X-Api-Connect-Id": uuid.uuid4(),
-                }
-                ws = await websockets.connect(
-                    self.ws_url, additional_headers=ws_header, max_size=1000000000
-                )
-
-                try:
-                    # 启动会话
-                    header = Header(
-                        message_type=FULL_CLIENT_REQUEST,
-                        message_type_specific_flags=MsgTypeFlagWithEvent,
-                        serial_method=JSON,
-                    ).as_bytes()
-                    optional = Optional(
-                        event=EVENT_StartSession, sessionId=session_id
-                    ).as_bytes()
-                    payload = self.get_payload_bytes(
-                        event=EVENT_StartSession, speaker=self.voice
-                    )
-                    await self.send_event(ws, header, optional, payload)
-
-                    # 发送文本
-                    header = Header(
-                        message_type=FULL_CLIENT_REQUEST,
-                        message_type_specific_flags=MsgTypeFlagWithEvent,
-                        serial_method=JSON,
-                    ).as_bytes()
-                    optional = Optional(
-                        event=EVENT_TaskRequest, sessionId=session_id
-                    ).as_bytes()
-                    payload = self.get_payload_bytes(
-                        event=EVENT_TaskRequest, text=text, speaker=self.voice
-                    )
-                    await self.send_event(ws, header, optional, payload)
-
-                    # 发送结束会话请求
-                    header = Header(
-                        message_type=FULL_CLIENT_REQUEST,
-                        message_type_specific_flags=MsgTypeFlagWithEvent,
-                        serial_method=JSON,
-                    ).as_bytes()
-                    optional = Optional(
-                        event=EVENT_FinishSession, sessionId=session_id
-                    ).as_bytes()
-                    payload = str.encode("{}")
-                    await self.send_event(ws, header, optional, payload)
-
-                    # 接收音频数据
-                    while True:
-                        msg = await ws.recv()
-                        res = self.parser_response(msg)
-
-                        if (
-                            res.optional.event == EVENT_TTSResponse
-                            and res.header.message_type == AUDIO_ONLY_RESPONSE
-                        ):
-                            opus_datas = self.wav_to_opus_data_audio_raw(res.payload)
-                            audio_data.extend(opus_datas)
-                        elif res.optional.event == EVENT_SessionFinished:
-                            break
-
-                finally:
-                    # 清理资源
-                    try:
-                        await ws.close()
-                    except:
-                        pass
-
-            # 运行异步任务
-            loop.run_until_complete(_generate_audio())
-            loop.close()
-
-            return audio_data
-
+            coro = self._synthesize_once(text)
+            if self.conn and self.conn.loop.is_running():
+                return asyncio.run_coroutine_threadsafe(coro, self.conn.loop).result()
+            return run_in_thread_loop(coro)
         except Exception as e:
             logger.bind(tag=TAG).error(f"生成音频数据失败: {str(e)}")
             return []
+
+    async def _synthesize_once(self, text: str) -> list:
+        """在一个独立会话中合成整段文本，会话正常结束后连接归还连接池"""
+        ws = await connection_pool.acquire(self)
+        # 不与当前轮对话共用编码器
+        opus_encoder = opus_encoder_utils.OpusEncoderUtils(
+            sample_rate=16000, channels=1, frame_size_ms=60
+        )
+        session_id = uuid.uuid4().hex
+        audio_data = []
+        reusable = False
+        try:
+            # 启动会话、发送文本、结束会话
+            await self._send_session_event(
+                EVENT_StartSession,
+                session_id,
+                self.get_payload_bytes(event=EVENT_StartSession, speaker=self.voice),
+                ws,
+            )
+            await self._send_session_event(
+                EVENT_TaskRequest,
+                session_id,
+                self.get_payload_bytes(
+                    event=EVENT_TaskRequest, text=text, speaker=self.voice
+                ),
+                ws,
+            )
+            await self._send_session_event(EVENT_FinishSession, session_id, b"{}", ws)
+
+            # 接收音频数据
+            while True:
+                msg = await asyncio.wait_for(ws.recv(), timeout=ONE_SHOT_RECV_TIMEOUT)
+                res = self.parser_response(msg)
+                if res.optional.sessionId != session_id:
+                    continue
+                if (
+                    res.optional.event == EVENT_TTSResponse
+                    and res.header.message_type == AUDIO_ONLY_RESPONSE
+                ):
+                    opus_datas = opus_encoder.encode_pcm_to_opus(res.payload, False)
+                    audio_data.extend(opus_datas)
+                elif res.optional.event == EVENT_SessionFailed:
+                    raise RuntimeError(
+                        f"TTS会话失败: {res.optional.response_meta_json}"
+                    )
+                elif res.optional.event == EVENT_SessionFinished:
+                    audio_data.extend(opus_encoder.encode_pcm_to_opus(b"", True))
+                    reusable = True
+                    break
+        finally:
+            if reusable:
+                await connection_pool.release(self, ws)
+            else:
+                await _close_quietly(ws)
+        return audio_data
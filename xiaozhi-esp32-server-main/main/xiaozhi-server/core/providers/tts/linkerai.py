@@ -7,7 +7,7 @@ import time
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
 from core.providers.tts.base import TTSProviderBase
-from core.utils import opus_encoder_utils, textUtils
+from core.utils import opus_encoder_utils
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 
 TAG = __name__
@@ -33,8 +33,10 @@ class TTSProvider(TTSProviderBase):
         # 添加文本缓冲区
         self.text_buffer = ""
 
-        # PCM缓冲区
-        self.pcm_buffer = bytearray()
+        # 在服务器事件循环上请求，HTTP会话跨句子复用
+        self.native_async = True
+        self.session = None
+        self.session_loop = None
 
     ###################################################################################
     # linkerai单流式TTS重写父类的方法--开始
@@ -48,15 +50,12 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
+                    self.segmenter.reset()
                     self.segment_count = 0
                     self.tts_audio_first_sentence = True
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
+                    for segment_text in self._get_segment_text(message.content_detail):
                         self.to_tts_single_stream(segment_text)
 
                 elif ContentType.FILE == message.content_type:
@@ -84,24 +83,19 @@ class TTSProvider(TTSProviderBase):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
-            else:
-                self._process_before_stop_play_files()
-        else:
+        segments = self.segmenter.flush()
+        if not segments:
             self._process_before_stop_play_files()
+            return
+        for i, segment_text in enumerate(segments):
+            self.to_tts_single_stream(segment_text, is_last and i == len(segments) - 1)
 
     def to_tts_single_stream(self, text, is_last=False):
         try:
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
             try:
-                asyncio.run(self.text_to_speak(text, is_last))
+                self._run_text_to_speak(text, is_last)
             except Exception as e:
                 logger.bind(tag=TAG).warning(
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -132,9 +126,24 @@ class TTSProvider(TTSProviderBase):
     async def close(self):
         """资源清理"""
         await super().close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
         if hasattr(self, "opus_encoder"):
             self.opus_encoder.close()
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取复用的HTTP会话，会话只能在创建它的事件循环上使用"""
+        loop = asyncio.get_running_loop()
+        if (
+            self.session is None
+            or self.session.closed
+            or self.session_loop is not loop
+        ):
+            self.session = aiohttp.ClientSession()
+            self.session_loop = loop
+        return self.session
+
     async def _tts_request(self, text: str, is_last: bool) -> None:
         params = {
             "tts_text": text,
@@ -150,90 +159,65 @@ class TTSProvider(TTSProviderBase):
             "Content-Type": "application/json",
         }
 
-        # 一帧 PCM 所需字节数：60 ms &times; 16 kHz &times; 1 ch &times; 2 B = 1 920
-        frame_bytes = int(
-            self.opus_encoder.sample_rate
-            * self.opus_encoder.channels  # 1
-            * self.opus_encoder.frame_size_ms
-            / 1000
-            * 2
-        )  # 16-bit = 2 bytes
-
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.api_url, params=params, headers=headers, timeout=10
-                ) as resp:
-
-                    if resp.status != 200:
-                        logger.bind(tag=TAG).error(
-                            f"TTS请求失败: {resp.status}, {await resp.text()}"
-                        )
-                        self.tts_audio_queue.put((SentenceType.LAST, [], None))
-                        return
-
-                    self.pcm_buffer.clear()
-                    opus_datas_cache = []
-
-                    self.tts_audio_queue.put((SentenceType.FIRST, [], text))
-
-                    # 兼容 iter_chunked / iter_chunks / iter_any
-                    async for chunk in resp.content.iter_any():
-                        data = chunk[0] if isinstance(chunk, (list, tuple)) else chunk
-                        if not data:
-                            continue
-
-                        # 拼到 buffer
-                        self.pcm_buffer.extend(data)
-
-                        # 够一帧就编码
-                        while len(self.pcm_buffer) >= frame_bytes:
-                            frame = bytes(self.pcm_buffer[:frame_bytes])
-                            del self.pcm_buffer[:frame_bytes]
-
-                            opus = self.opus_encoder.encode_pcm_to_opus(
-                                frame, end_of_stream=False
-                            )
-                            if opus:
-                                if self.segment_count < 10:  # 前10个片段直接发送
-                                    self.tts_audio_queue.put(
-                                        (SentenceType.MIDDLE, opus, None)
-                                    )
-                                    self.segment_count += 1
-                                else:
-                                    opus_datas_cache.extend(opus)
-
-                    # flush 剩余不足一帧的数据
-                    if self.pcm_buffer:
-                        opus = self.opus_encoder.encode_pcm_to_opus(
-                            bytes(self.pcm_buffer), end_of_stream=True
-                        )
-                        if opus:
-                            if self.segment_count < 10:  # 前10个片段直接发送
-                                # 直接发送
-                                self.tts_audio_queue.put(
-                                    (SentenceType.MIDDLE, opus, None)
-                                )
-                                self.segment_count += 1
-                            else:
-                                # 后续片段缓存
-                                opus_datas_cache.extend(opus)
-                        self.pcm_buffer.clear()
-
-                    # 如果不是前10个片段，发送缓存的数据
-                    if self.segment_count >= 10 and opus_datas_cache:
-                        self.tts_audio_queue.put(
-                            (SentenceType.MIDDLE, opus_datas_cache, None)
-                        )
-
-                    # 如果是最后一段，输出音频获取完毕
-                    if is_last:
-                        self._process_before_stop_play_files()
+            session = self._get_session()
+            async with session.get(
+                self.api_url, params=params, headers=headers, timeout=10
+            ) as resp:
+
+                if resp.status != 200:
+                    logger.bind(tag=TAG).error(
+                        f"TTS请求失败: {resp.status}, {await resp.text()}"
+                    )
+                    self.tts_audio_queue.put((SentenceType.LAST, [], None))
+                    return
+
+                self.opus_encoder.reset_state()
+                opus_datas_cache = []
+
+                self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+
+                # 兼容 iter_chunked / iter_chunks / iter_any
+                async for chunk in resp.content.iter_any():
+                    data = chunk[0] if isinstance(chunk, (list, tuple)) else chunk
+                    if not data:
+                        continue
+
+                    # 收到的整块PCM在工作线程中编码，不足一帧的部分留在编码器缓冲区
+                    opus = await asyncio.to_thread(
+                        self.opus_encoder.encode_pcm_to_opus, data, False
+                    )
+                    self._put_opus_datas(opus, opus_datas_cache)
+
+                # flush 剩余不足一帧的数据
+                opus = await asyncio.to_thread(
+                    self.opus_encoder.encode_pcm_to_opus, b"", True
+                )
+                self._put_opus_datas(opus, opus_datas_cache)
+
+                # 如果不是前10个片段，发送缓存的数据
+                if self.segment_count >= 10 and opus_datas_cache:
+                    self.tts_audio_queue.put(
+                        (SentenceType.MIDDLE, opus_datas_cache, None)
+                    )
+
+                # 如果是最后一段，输出音频获取完毕
+                if is_last:
+                    self._process_before_stop_play_files()
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
             self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
+    def _put_opus_datas(self, opus_datas, opus_datas_cache):
+        """前10个片段逐帧直接发送，后续片段先缓存"""
+        for opus in opus_datas:
+            if self.segment_count < 10:
+                self.tts_audio_queue.put((SentenceType.MIDDLE, [opus], None))
+                self.segment_count += 1
+            else:
+                opus_datas_cache.append(opus)
+
     def to_tts(self, text: str) -> list:
         """非流式TTS处理，用于测试及保存音频文件的场景
 
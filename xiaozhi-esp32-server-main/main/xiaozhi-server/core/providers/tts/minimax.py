@@ -1,7 +1,6 @@
 import os
 import uuid
 import json
-import requests
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
 from core.utils.util import parse_string_to_list
@@ -53,6 +52,7 @@ class TTSProvider(TTSProviderBase):
             "Authorization": f"Bearer {self.api_key}",
         }
         self.audio_file_type = defult_audio_setting.get("format", "mp3")
+        self.use_shared_http(self.api_url)
 
     def generate_filename(self, extension=".mp3"):
         return os.path.join(
@@ -75,16 +75,16 @@ class TTSProvider(TTSProviderBase):
             request_json["voice_setting"]["voice_id"] = ""
 
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            resp = await self.http_request(
+                "POST", self.api_url, data=json.dumps(request_json), headers=self.header
             )
+            resp_json = resp.json()
             # 检查返回请求数据的status_code是否为0
-            if resp.json()["base_resp"]["status_code"] == 0:
-                data = resp.json()["data"]["audio"]
+            if resp_json["base_resp"]["status_code"] == 0:
+                data = resp_json["data"]["audio"]
                 audio_bytes = bytes.fromhex(data)
                 if output_file:
-                    with open(output_file, "wb") as file_to_save:
-                        file_to_save.write(audio_bytes)
+                    await self.save_audio_file(output_file, audio_bytes)
                 else:
                     return audio_bytes
             else:
@@ -1,4 +1,3 @@
-import requests
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
@@ -25,6 +24,7 @@ class TTSProvider(TTSProviderBase):
         self.speed = float(speed) if speed else 1.0
 
         self.output_file = config.get("output_dir", "tmp/")
+        self.use_shared_http(self.api_url)
         model_key_msg = check_model_key("TTS", self.api_key)
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
@@ -41,11 +41,12 @@ class TTSProvider(TTSProviderBase):
             "response_format": "wav",
             "speed": self.speed,
         }
-        response = requests.post(self.api_url, json=data, headers=headers)
+        response = await self.http_request(
+            "POST", self.api_url, json=data, headers=headers
+        )
         if response.status_code == 200:
             if output_file:
-                with open(output_file, "wb") as audio_file:
-                    audio_file.write(response.content)
+                await self.save_audio_file(output_file, response.content)
             else:
                 return response.content
         else:
@@ -4,7 +4,6 @@ import time
 import uuid
 import json
 import base64
-import requests
 from datetime import datetime, timezone
 from core.providers.tts.base import TTSProviderBase
 
@@ -23,6 +22,7 @@ class TTSProvider(TTSProviderBase):
         self.region = config.get("region")
         self.output_file = config.get("output_dir")
         self.audio_file_type = config.get("format", "wav")
+        self.use_shared_http(self.api_url)
 
     def _get_auth_headers(self, request_body):
         """生成鉴权请求头"""
@@ -134,8 +134,8 @@ class TTSProvider(TTSProviderBase):
             headers = self._get_auth_headers(request_json)
 
             # 发送请求
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=headers
+            resp = await self.http_request(
+                "POST", self.api_url, data=json.dumps(request_json), headers=headers
             )
 
             # 检查响应
@@ -153,8 +153,7 @@ class TTSProvider(TTSProviderBase):
                 audio_bytes = base64.b64decode(response_data["Response"].get("Audio"))
                 if audio_bytes:
                     if output_file:
-                        with open(output_file, "wb") as f:
-                            f.write(audio_bytes)
+                        await self.save_audio_file(output_file, audio_bytes)
                     else:
                         return audio_bytes
                 else:
@@ -1,7 +1,6 @@
 import os
 import uuid
 import json
-import requests
 import shutil
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
@@ -33,6 +32,7 @@ class TTSProvider(TTSProviderBase):
         self.audio_file_type = config.get("format", "mp3")
         self.emotion = int(config.get("emotion", 1))
         self.header = {"Content-Type": "application/json"}
+        self.use_shared_http(self.url)
 
     def generate_filename(self, extension=".mp3"):
         return os.path.join(
@@ -57,7 +57,7 @@ class TTSProvider(TTSProviderBase):
             }
         )
 
-        resp = requests.request("POST", url, data=payload)
+        resp = await self.http_request("POST", url, data=payload)
         if resp.status_code != 200:
             logger.bind(tag=TAG).error(f"TTSON 请求失败: {resp.text}")
             raise Exception(f"{__name__}: TTS请求失败")
@@ -73,10 +73,9 @@ class TTSProvider(TTSProviderBase):
                 + resp_json["voice_path"]
             )
 
-            audio_content = requests.get(result)
+            audio_content = await self.http_request("GET", result)
             if output_file:
-                with open(output_file, "wb") as f:
-                    f.write(audio_content.content)
+                await self.save_audio_file(output_file, audio_content.content)
             else:
                 return audio_content.content
             voice_path = resp_json.get("voice_path")
@@ -0,0 +1,503 @@
+"""进程内音频解码
+
+TTS返回的音频和本地提示音优先在进程内解码，不再为每句话启动ffmpeg子进程：
+WAV直接解析，Ogg/Opus按原始Opus包重新打包为60ms一包而不重新编码，
+MP3等格式在安装了soundfile时由libsndfile解码；重采样使用soxr或numpy向量化滤波。
+无法在进程内处理的格式返回None，由调用方回退到pydub/ffmpeg。
+"""
+
+import io
+import wave
+import struct
+from typing import List, Optional, Tuple
+import numpy as np
+import opuslib_next
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+try:
+    import soxr
+except ImportError:
+    soxr = None
+
+SAMPLE_RATE = 16000
+FRAME_DURATION = 60  # 帧时长（毫秒）
+# Opus单个包最长120ms，按此计算解码缓冲区的样本数
+MAX_OPUS_FRAME_SIZE = SAMPLE_RATE * 120 // 1000
+# 降采样抗混叠滤波器单侧的系数个数
+LOWPASS_HALF_TAPS = 32
+
+
+def _lowpass_taps(src_rate: int, dst_rate: int) -> np.ndarray:
+    """降采样前抗混叠用的加窗sinc低通滤波器"""
+    cutoff = 0.5 * dst_rate / src_rate
+    n = np.arange(-LOWPASS_HALF_TAPS, LOWPASS_HALF_TAPS + 1)
+    taps = np.sinc(2 * cutoff * n) * 2 * cutoff * np.hamming(len(n))
+    return taps / taps.sum()
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """把float32单声道样本从src_rate重采样到dst_rate"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    if soxr is not None:
+        return soxr.resample(samples, src_rate, dst_rate).astype(np.float32)
+
+    if dst_rate < src_rate:
+        taps = _lowpass_taps(src_rate, dst_rate)
+        samples = np.convolve(samples, taps, mode="same").astype(np.float32)
+
+    out_length = int(len(samples) * dst_rate / src_rate)
+    positions = np.arange(out_length) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class StreamResampler:
+    """
+    分块重采样，保留块之间的滤波状态，各块结果拼接后与整段调用resample一致。
+
+    只保留尚未用完的输入样本，每个输入样本只参与一次计算。
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self._soxr = None
+        if soxr is not None and src_rate != dst_rate:
+            self._soxr = soxr.ResampleStream(src_rate, dst_rate, 1, dtype="float32")
+        self._taps = None
+        self._half = 0
+        if dst_rate < src_rate:
+            self._taps = _lowpass_taps(src_rate, dst_rate)
+            self._half = LOWPASS_HALF_TAPS
+        self._step = src_rate / dst_rate
+        # 保留的输入样本及其第一个样本在整段输入中的位置
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0
+        # 下一个输出样本的序号
+        self._next_output = 0
+
+    def process(self, samples: np.ndarray, last: bool = False) -> np.ndarray:
+        """输入一块float32单声道样本，last为True表示输入结束，返回新产出的样本"""
+        samples = samples.astype(np.float32)
+        if self.src_rate == self.dst_rate:
+            return samples
+        if self._soxr is not None:
+            return self._soxr.resample_chunk(samples, last=last).astype(np.float32)
+
+        buffer = np.concatenate((self._buffer, samples))
+        total = self._buffer_start + len(buffer)
+        if last:
+            end = int(total * self.dst_rate / self.src_rate)
+        else:
+            # 插值位置右侧的样本及其滤波窗口都已到达时才能输出
+            available = total - 2 - self._half
+            end = int(available / self._step) + 1 if available >= 0 else 0
+        if end <= self._next_output:
+            self._buffer = buffer
+            return np.zeros(0, dtype=np.float32)
+
+        positions = np.arange(self._next_output, end) * self._step
+        first = int(positions[0])
+        last_index = min(int(positions[-1]) + 1, total - 1)
+        # 取出[first, last_index]的滤波窗口，整段开头和结尾之外按零处理
+        start = first - self._half
+        stop = last_index + self._half + 1
+        window = buffer[max(start, 0) - self._buffer_start : stop - self._buffer_start]
+        window = np.concatenate(
+            (
+                np.zeros(max(-start, 0), dtype=np.float32),
+                window,
+                np.zeros(max(stop - total, 0), dtype=np.float32),
+            )
+        )
+        if self._taps is not None:
+            window = np.convolve(window, self._taps, mode="valid")
+        output = np.interp(positions, np.arange(first, last_index + 1), window)
+
+        self._next_output = end
+        keep_from = max(int(end * self._step) - self._half, 0)
+        self._buffer = buffer[keep_from - self._buffer_start :]
+        self._buffer_start = keep_from
+        return output.astype(np.float32)
+
+
+def _to_pcm_bytes(samples: np.ndarray, sample_rate: int) -> bytes:
+    """float32样本（范围-1~1，可为多声道）转为16kHz单声道16位PCM"""
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    samples = resample(samples.astype(np.float32), sample_rate, SAMPLE_RATE)
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def _is_chunk_end(audio_bytes: bytes, offset: int) -> bool:
+    """offset处是文件结尾或另一个完整的RIFF块"""
+    if offset == len(audio_bytes):
+        return True
+    header = audio_bytes[offset : offset + 8]
+    if len(header) < 8 or not all(32 <= c < 127 for c in header[:4]):
+        return False
+    size = struct.unpack("<I", header[4:])[0]
+    return offset + 8 + size <= len(audio_bytes)
+
+
+def _wav_data(audio_bytes: bytes) -> Optional[bytes]:
+    """
+    取出WAV中data块的数据。
+
+    流式返回的WAV在头部写入0或占位的长度，声明的长度为0、超出实际数据，
+    或者之后紧跟的不是另一个块时，取到文件结尾。
+    """
+    offset = 12
+    while offset + 8 <= len(audio_bytes):
+        chunk_id = audio_bytes[offset : offset + 4]
+        size = struct.unpack("<I", audio_bytes[offset + 4 : offset + 8])[0]
+        start = offset + 8
+        if chunk_id == b"data":
+            end = start + size
+            if size == 0 or not _is_chunk_end(audio_bytes, end + (size & 1)):
+                end = len(audio_bytes)
+            return audio_bytes[start:end]
+        offset = start + size + (size & 1)
+    return None
+
+
+def _pcm_samples(
+    frames: bytes, sample_width: int, channels: int
+) -> Optional[np.ndarray]:
+    """整数PCM数据转为float32样本，多声道时每行一个采样，不支持的位宽返回None"""
+    if sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(frames[: len(frames) // 2 * 2], dtype="<i2") / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(frames[: len(frames) // 3 * 3], dtype=np.uint8)
+        raw = raw.reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = np.where(values & 0x800000, values - 0x1000000, values)
+        samples = values / 8388608.0
+    elif sample_width == 4:
+        samples = np.frombuffer(frames[: len(frames) // 4 * 4], dtype="<i4") / 2147483648.0
+    else:
+        return None
+    samples = samples.astype(np.float32)
+    if channels > 1:
+        samples = samples[: len(samples) // channels * channels].reshape(-1, channels)
+    return samples
+
+
+def _decode_wav(audio_bytes: bytes) -> Optional[bytes]:
+    """解析整数PCM编码的WAV，其他编码或没有音频数据时返回None"""
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+            channels = wav.getnchannels()
+            sample_width = wav.getsampwidth()
+            sample_rate = wav.getframerate()
+    except (wave.Error, EOFError):
+        return None
+    frames = _wav_data(audio_bytes)
+    if not frames:
+        return None
+
+    if sample_width == 2 and channels == 1 and sample_rate == SAMPLE_RATE:
+        return frames[: len(frames) // 2 * 2]
+    samples = _pcm_samples(frames, sample_width, channels)
+    if samples is None:
+        return None
+    return _to_pcm_bytes(samples, sample_rate)
+
+
+def _decode_with_soundfile(audio_bytes: bytes) -> Optional[bytes]:
+    """使用libsndfile解码MP3、FLAC、Ogg Vorbis等格式"""
+    if soundfile is None:
+        return None
+    try:
+        samples, sample_rate = soundfile.read(io.BytesIO(audio_bytes), dtype="float32")
+    except Exception:
+        return None
+    return _to_pcm_bytes(samples, sample_rate)
+
+
+def decode_to_pcm(audio_bytes: bytes, file_type: str) -> Optional[bytes]:
+    """
+    在进程内把音频解码为16kHz单声道16位PCM。
+
+    Returns:
+        PCM数据，无法在进程内解码时返回None
+    """
+    file_type = (file_type or "").lower().lstrip(".")
+    if file_type == "wav" or audio_bytes[:4] == b"RIFF":
+        pcm = _decode_wav(audio_bytes)
+        if pcm is not None:
+            return pcm
+    if file_type in ("ogg", "opus") or audio_bytes[:4] == b"OggS":
+        packets = read_ogg_opus_packets(audio_bytes)
+        if packets is not None:
+            return decode_opus_packets(packets)
+    return _decode_with_soundfile(audio_bytes)
+
+
+def read_ogg_opus_packets(audio_bytes: bytes) -> Optional[List[bytes]]:
+    """从Ogg容器中取出Opus音频包，不是Ogg/Opus时返回None"""
+    packets = []
+    pending = b""
+    offset = 0
+    while offset + 27 <= len(audio_bytes):
+        if audio_bytes[offset : offset + 4] != b"OggS":
+            return None
+        segment_count = audio_bytes[offset + 26]
+        lacing = audio_bytes[offset + 27 : offset + 27 + segment_count]
+        offset += 27 + segment_count
+        for size in lacing:
+            pending += audio_bytes[offset : offset + size]
+            offset += size
+            # 长度小于255的段表示一个包结束，否则包延续到下一段
+            if size < 255:
+                packets.append(pending)
+                pending = b""
+    if not packets or not packets[0].startswith(b"OpusHead"):
+        return None
+    # 去掉OpusHead和OpusTags头部包
+    return [p for p in packets[1:] if not p.startswith(b"OpusTags")]
+
+
+def decode_opus_packets(packets: List[bytes]) -> bytes:
+    """把Opus包解码为16kHz单声道PCM"""
+    decoder = opuslib_next.Decoder(SAMPLE_RATE, 1)
+    return b"".join(decoder.decode(packet, MAX_OPUS_FRAME_SIZE) for packet in packets)
+
+
+def _opus_frame_duration(toc: int) -> float:
+    """根据TOC字节计算单帧时长（毫秒）"""
+    config = toc >> 3
+    if config < 12:
+        return (10, 20, 40, 60)[config & 3]
+    if config < 16:
+        return (10, 20)[config & 1]
+    return (2.5, 5, 10, 20)[config & 3]
+
+
+def _parse_frame_size(data: bytes, index: int) -> Tuple[int, int]:
+    """解析Opus包中的帧长度，返回(长度, 占用字节数)"""
+    if data[index] < 252:
+        return data[index], 1
+    return data[index] + 4 * data[index + 1], 2
+
+
+def _encode_frame_size(size: int) -> bytes:
+    if size < 252:
+        return bytes([size])
+    first = 252 + ((size - 252) & 3)
+    return bytes([first, (size - first) // 4])
+
+
+def _split_opus_packet(packet: bytes) -> List[bytes]:
+    """按RFC 6716第3.2节把Opus包拆成帧"""
+    code = packet[0] & 3
+    data = packet[1:]
+    if code == 0:
+        return [data]
+    if code == 1:
+        half = len(data) // 2
+        return [data[:half], data[half:]]
+    if code == 2:
+        size, used = _parse_frame_size(data, 0)
+        return [data[used : used + size], data[used + size :]]
+
+    header = data[0]
+    count = header & 0x3F
+    index = 1
+    padding = 0
+    if header & 0x40:
+        while True:
+            value = data[index]
+            index += 1
+            padding += 254 if value == 255 else value
+            if value != 255:
+                break
+    end = len(data) - padding
+    if header & 0x80:
+        sizes = []
+        for _ in range(count - 1):
+            size, used = _parse_frame_size(data, index)
+            index += used
+            sizes.append(size)
+        frames = []
+        for size in sizes:
+            frames.append(data[index : index + size])
+            index += size
+        frames.append(data[index:end])
+        return frames
+    size = (end - index) // count
+    return [data[index + i * size : index + (i + 1) * size] for i in range(count)]
+
+
+def _build_opus_packet(toc: int, frames: List[bytes]) -> bytes:
+    """把配置相同的多个帧组合为一个Opus包（code 3，VBR）"""
+    if len(frames) == 1:
+        return bytes([toc & 0xFC]) + frames[0]
+    sizes = b"".join(_encode_frame_size(len(frame)) for frame in frames[:-1])
+    return bytes([(toc & 0xFC) | 3, 0x80 | len(frames)]) + sizes + b"".join(frames)
+
+
+def repacketize_opus(
+    packets: List[bytes], frame_duration: int = FRAME_DURATION
+) -> Optional[List[bytes]]:
+    """
+    不重新编码，把Opus包重新组合为每包frame_duration毫秒。
+
+    只有最后一包允许不足frame_duration，中途编码配置变化导致无法凑整时返回None。
+    """
+    result = []
+    group: List[bytes] = []
+    group_toc = None
+    group_duration = 0.0
+    try:
+        for packet in packets:
+            if not packet:
+                continue
+            toc = packet[0]
+            duration = _opus_frame_duration(toc)
+            for frame in _split_opus_packet(packet):
+                if group and (toc & 0xFC) != (group_toc & 0xFC):
+                    return None
+                group.append(frame)
+                group_toc = toc
+                group_duration += duration
+                if group_duration == frame_duration:
+                    result.append(_build_opus_packet(group_toc, group))
+                    group, group_duration = [], 0.0
+                elif group_duration > frame_duration:
+                    return None
+    except (IndexError, struct.error):
+        return None
+    if group:
+        result.append(_build_opus_packet(group_toc, group))
+    return result
+
+
+def ogg_opus_to_packets(audio_bytes: bytes) -> Optional[List[bytes]]:
+    """Ogg/Opus音频直接转为60ms一包的Opus数据，无法直接转换时返回None"""
+    packets = read_ogg_opus_packets(audio_bytes)
+    if packets is None:
+        return None
+    return repacketize_opus(packets)
+
+
+class StreamingAudioDecoder:
+    """
+    在进程内解码陆续到达的一段音频，输出16kHz单声道16位PCM。
+
+    整数PCM编码的WAV解析完头部后，每次只转换新到达的完整采样，重采样保留块之间的
+    滤波状态，每个字节只处理一次。MP3等压缩格式不完整的数据无法增量解码，
+    音频全部到达后在flush中解码一次。
+    """
+
+    def __init__(self, file_type: str):
+        self.file_type = (file_type or "").lower().lstrip(".")
+        self.data = bytearray()
+        # WAV的格式(声道数, 采样位宽, 采样率)，头部未解析或无法增量解码时为None
+        self._wav_format: Optional[Tuple[int, int, int]] = None
+        self._wav_parsed = False
+        # data块的起止位置及下一个未转换字节的位置，结束位置为None时取到数据结尾
+        self._data_start = 0
+        self._data_end: Optional[int] = None
+        self._offset = 0
+        self._resampler: Optional[StreamResampler] = None
+
+    @staticmethod
+    def supports(file_type: str) -> bool:
+        """能否在进程内解码该格式，不能时由调用方使用ffmpeg"""
+        file_type = (file_type or "").lower().lstrip(".")
+        if file_type == "wav":
+            return True
+        if soundfile is None:
+            return False
+        return file_type.upper() in soundfile.available_formats()
+
+    def feed(self, chunk: bytes) -> bytes:
+        """追加一块音频，返回新增的PCM，暂时没有可输出的数据时返回空"""
+        self.data += chunk
+        if self.file_type != "wav":
+            return b""
+        if not self._wav_parsed:
+            self._parse_wav_header()
+        if self._wav_format is None:
+            return b""
+        end = len(self.data) if self._data_end is None else self._data_end
+        return self._convert(end, last=False)
+
+    def flush(self) -> Optional[bytes]:
+        """音频全部到达，返回剩余的PCM，无法解码时返回None"""
+        if self._wav_format is None:
+            return decode_to_pcm(bytes(self.data), self.file_type)
+        end = self._data_end
+        padding = (end - self._data_start) & 1 if end is not None else 0
+        if end is None or not _is_chunk_end(self.data, end + padding):
+            # 与_wav_data一致，声明的长度之后不是另一个块时取到文件结尾
+            end = len(self.data)
+        pcm = self._convert(end, last=True)
+        if self._offset == self._data_start:
+            # 没有音频数据
+            return None
+        return pcm
+
+    def _parse_wav_header(self):
+        """头部完整到达后解析fmt块并找到data块，不是整数PCM编码时按整段解码"""
+        data = self.data
+        if len(data) >= 12 and (data[:4] != b"RIFF" or data[8:12] != b"WAVE"):
+            self._wav_parsed = True
+            return
+        offset = 12
+        wav_format = None
+        while offset + 8 <= len(data):
+            chunk_id = bytes(data[offset : offset + 4])
+            size = struct.unpack("<I", data[offset + 4 : offset + 8])[0]
+            start = offset + 8
+            if chunk_id == b"data":
+                self._wav_parsed = True
+                if wav_format is None:
+                    return
+                self._wav_format = wav_format
+                self._data_start = self._offset = start
+                if size not in (0, 0xFFFFFFFF):
+                    self._data_end = start + size
+                if wav_format != (1, 2, SAMPLE_RATE):
+                    self._resampler = StreamResampler(wav_format[2], SAMPLE_RATE)
+                return
+            if start + size > len(data):
+                return
+            if chunk_id == b"fmt ":
+                if size < 16:
+                    self._wav_parsed = True
+                    return
+                tag, channels, sample_rate, _, _, bits = struct.unpack(
+                    "<HHIIHH", data[start : start + 16]
+                )
+                if tag == 0xFFFE and size >= 26:
+                    # WAVE_FORMAT_EXTENSIBLE，子格式的前两个字节为实际编码
+                    tag = struct.unpack("<H", data[start + 24 : start + 26])[0]
+                if tag != 1 or not 1 <= bits // 8 <= 4 or channels < 1:
+                    self._wav_parsed = True
+                    return
+                wav_format = (channels, bits // 8, sample_rate)
+            offset = start + size + (size & 1)
+
+    def _convert(self, end: int, last: bool) -> bytes:
+        """转换data块中[_offset, end)内完整的采样"""
+        channels, sample_width, _ = self._wav_format
+        block = channels * sample_width
+        end = min(end, len(self.data))
+        end = self._offset + max(end - self._offset, 0) // block * block
+        frames = bytes(self.data[self._offset : end])
+        self._offset = end
+        if self._resampler is None:
+            return frames
+        samples = _pcm_samples(frames, sample_width, channels)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        samples = self._resampler.process(samples, last=last)
+        return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
@@ -0,0 +1,504 @@
+"""音频文件流式播放与p3转码缓存
+
+播放音乐时不再整首解码、编码到内存，而是在发送时逐帧读取：
+已有p3缓存的文件直接按帧读取，没有缓存时由ffmpeg流式解码并逐帧编码为Opus，
+同时把编码结果写入缓存，下次播放直接读取。每路播放只占用固定大小的内存。
+流式合成的TTS音频优先在进程内解码，无法解码时才交给ffmpeg。
+"""
+
+import os
+import uuid
+import struct
+import asyncio
+import hashlib
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import aclosing, nullcontext
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+from config.config_loader import get_project_dir
+from config.logger import setup_logging
+from core.utils.audio_decoder import StreamingAudioDecoder
+from core.utils.opus_encoder_utils import opus_encoder_pool
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+FRAME_DURATION = 60  # 帧时长（毫秒）
+FRAME_SIZE = int(SAMPLE_RATE * FRAME_DURATION / 1000)  # 960 samples/frame
+FRAME_BYTES = FRAME_SIZE * 2  # 16bit单声道
+# 流式解码时每批最多读取并编码的帧数
+BATCH_FRAMES = 16
+
+# p3转码缓存目录
+MUSIC_CACHE_DIR = get_project_dir() + "data/music_p3/"
+
+
+def _ffmpeg_pcm_command(file_path: str, input_options=("-nostdin",)):
+    """ffmpeg解码为16kHz单声道16位PCM并输出到标准输出，读取文件时用-nostdin避免阻塞"""
+    return [
+        "ffmpeg",
+        "-loglevel",
+        "error",
+        *input_options,
+        "-i",
+        file_path,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-",
+    ]
+
+
+def _pooled_encoder(is_opus: bool, profile: str):
+    """从编码器池借出编码器，输出PCM时不需要编码器"""
+    if not is_opus:
+        return nullcontext()
+    return opus_encoder_pool.encoder(SAMPLE_RATE, 1, profile)
+
+
+def _encode_pcm_frames(encoder, pcm: bytes) -> List[bytes]:
+    """按帧编码整帧的PCM，输出PCM时只按帧切分"""
+    if encoder is None:
+        return [pcm[i : i + FRAME_BYTES] for i in range(0, len(pcm), FRAME_BYTES)]
+    return opus_encoder_pool.encode_frames(encoder, pcm, FRAME_SIZE)
+
+
+async def _encode_batch(encoder, pcm: bytes) -> List[bytes]:
+    """在工作线程中编码一批PCM，不在事件循环上逐帧编码"""
+    if encoder is None:
+        return _encode_pcm_frames(None, pcm)
+    return await asyncio.to_thread(_encode_pcm_frames, encoder, pcm)
+
+
+async def _read_pcm_batches(stdout: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    """
+    从ffmpeg标准输出读取已解码的PCM，每批为整帧且最多BATCH_FRAMES帧。
+
+    有数据到达就立即返回，不等凑满一批；最后不足一帧时补零。
+    """
+    pending = bytearray()
+    while True:
+        data = await stdout.read(FRAME_BYTES * BATCH_FRAMES - len(pending))
+        if not data:
+            break
+        pending.extend(data)
+        size = len(pending) - len(pending) % FRAME_BYTES
+        if size:
+            batch = bytes(pending[:size])
+            del pending[:size]
+            yield batch
+    if pending:
+        yield bytes(pending) + b"\x00" * (FRAME_BYTES - len(pending))
+
+
+def read_p3_frames(file_path: str) -> Iterator[bytes]:
+    """逐帧读取p3文件中的Opus数据"""
+    with open(file_path, "rb") as f:
+        while True:
+            # 头部（4字节）：[1字节类型，1字节保留，2字节长度]
+            header = f.read(4)
+            if len(header) < 4:
+                break
+            _, _, data_len = struct.unpack(">BBH", header)
+            opus_data = f.read(data_len)
+            if len(opus_data) != data_len:
+                break
+            yield opus_data
+
+
+class P3Writer:
+    """写入p3文件，先写临时文件，完整写完后才替换到目标路径"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self.file = open(self.tmp_path, "wb")
+
+    def write(self, opus_data: bytes):
+        self.file.write(struct.pack(">BBH", 0, 0, len(opus_data)))
+        self.file.write(opus_data)
+
+    def close(self, commit: bool):
+        """关闭文件，commit为True时替换到目标路径，否则丢弃"""
+        self.file.close()
+        try:
+            if commit:
+                os.replace(self.tmp_path, self.file_path)
+            else:
+                os.remove(self.tmp_path)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"保存p3缓存失败: {self.file_path}, {e}")
+
+
+class P3DiskQuota:
+    """p3缓存目录的磁盘占用上限，超出时按最近访问时间淘汰缓存文件"""
+
+    def __init__(self, cache_dir: str, name: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.name = name
+        self.max_bytes = max_bytes
+        self.used_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _list_files(self):
+        files = []
+        if not os.path.isdir(self.cache_dir):
+            return files
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".p3"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def add(self, size: int):
+        """累计磁盘占用，超出上限时删除最久未访问的文件到上限的90%"""
+        with self._lock:
+            if self.used_bytes is None:
+                # 首次写入时统计已有缓存文件，已包含刚写入的文件
+                self.used_bytes = sum(f[1] for f in self._list_files())
+            else:
+                self.used_bytes += size
+            if self.used_bytes <= self.max_bytes:
+                return
+            files = sorted(self._list_files())
+            total = sum(f[1] for f in files)
+            target = self.max_bytes * 0.9
+            removed = 0
+            for _, file_size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= file_size
+                removed += 1
+            self.used_bytes = total
+        logger.bind(tag=TAG).info(f"{self.name}超出上限，已淘汰 {removed} 个文件")
+
+
+class MusicTranscodeCache:
+    """音乐文件的p3转码缓存
+
+    缓存文件名由源文件路径、修改时间和大小计算，源文件变化后自动使用新的缓存；
+    后台线程按顺序转码排队的文件，同一时间只运行一个ffmpeg进程。
+    磁盘占用超出上限时删除最久未播放的缓存，源文件变化后不再使用的旧缓存随之淘汰。
+    """
+
+    def __init__(self, cache_dir: str = MUSIC_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.enabled = False
+        self._disk_quota = P3DiskQuota(cache_dir, "音乐p3缓存", 0)
+        self._pending = deque()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._worker_running = False
+        self.configure(False)
+
+    def configure(self, enabled: bool, max_disk_mb: float = 2048):
+        self.enabled = enabled
+        self._disk_quota.max_bytes = int(float(max_disk_mb) * 1024 * 1024)
+
+    def cache_path(self, file_path: str) -> Optional[str]:
+        """源文件对应的缓存路径，源文件不存在时返回None"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        key = hashlib.md5(
+            f"{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}".encode(
+                "utf-8"
+            )
+        ).hexdigest()
+        return os.path.join(self.cache_dir, key + ".p3")
+
+    def get(self, file_path: str) -> Optional[str]:
+        """返回已转码好的缓存文件路径，没有缓存时返回None"""
+        if not self.enabled:
+            return None
+        cache_path = self.cache_path(file_path)
+        if not cache_path:
+            return None
+        try:
+            # 更新访问时间，磁盘淘汰时按该时间排序
+            os.utime(cache_path)
+        except OSError:
+            return None
+        return cache_path
+
+    def open_writer(self, file_path: str) -> Optional[P3Writer]:
+        """为源文件创建缓存写入器，未启用缓存时返回None"""
+        if not self.enabled:
+            return None
+        cache_path = self.cache_path(file_path)
+        if not cache_path:
+            return None
+        try:
+            return P3Writer(cache_path)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"创建p3缓存失败: {cache_path}, {e}")
+            return None
+
+    def close_writer(self, writer: P3Writer, completed: bool):
+        """关闭缓存写入器，完整写入的缓存计入磁盘占用"""
+        writer.close(completed)
+        if not completed:
+            return
+        try:
+            size = os.path.getsize(writer.file_path)
+        except OSError:
+            return
+        self._disk_quota.add(size)
+
+    def schedule(self, file_paths: Iterable[str]):
+        """把文件加入后台转码队列，已排队或不需要转码的文件会被跳过"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for file_path in file_paths:
+                if file_path.endswith(".p3") or file_path in self._queued:
+                    continue
+                self._queued.add(file_path)
+                self._pending.append(file_path)
+            if self._pending and not self._worker_running:
+                self._worker_running = True
+                threading.Thread(target=self._transcode_worker, daemon=True).start()
+
+    def _transcode_worker(self):
+        count = 0
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._worker_running = False
+                    break
+                file_path = self._pending.popleft()
+                self._queued.discard(file_path)
+            try:
+                if self.get(file_path) is None and self.transcode(file_path):
+                    count += 1
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"音乐转码失败: {file_path}, {e}")
+        if count:
+            logger.bind(tag=TAG).info(f"后台转码完成，新增 {count} 个p3缓存")
+
+    def transcode(self, file_path: str) -> bool:
+        """把源文件完整转码为p3缓存，阻塞执行"""
+        writer = self.open_writer(file_path)
+        if writer is None:
+            return False
+        completed = False
+        process = subprocess.Popen(
+            _ffmpeg_pcm_command(file_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            with opus_encoder_pool.encoder(SAMPLE_RATE, 1, "music") as encoder:
+                while True:
+                    chunk = process.stdout.read(FRAME_BYTES)
+                    if not chunk:
+                        break
+                    if len(chunk) < FRAME_BYTES:
+                        chunk += b"\x00" * (FRAME_BYTES - len(chunk))
+                    writer.write(encoder.encode(chunk, FRAME_SIZE))
+            completed = process.wait() == 0
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            self.close_writer(writer, completed)
+        return completed
+
+
+# 进程内共享的音乐转码缓存，由play_music按配置启用
+music_transcode_cache = MusicTranscodeCache()
+
+
+async def decode_audio_chunks(
+    chunks: AsyncIterator[bytes], file_type: str, is_opus: bool = True
+) -> AsyncIterator[bytes]:
+    """
+    把陆续到达的编码音频流式解码为16kHz单声道PCM并逐帧编码。
+
+    能在进程内解码的格式在工作线程中解码和编码，不启动ffmpeg：WAV边到达边增量解码，
+    安装了soundfile时的MP3等格式全部到达后解码一次；其他格式或进程内解码失败时
+    交给ffmpeg。
+    """
+    if not StreamingAudioDecoder.supports(file_type):
+        frames = _ffmpeg_decode_chunks(chunks, file_type, is_opus)
+        async with aclosing(frames):
+            async for frame in frames:
+                yield frame
+        return
+
+    decoder = StreamingAudioDecoder(file_type)
+    pending = bytearray()
+    emitted = False
+    with _pooled_encoder(is_opus, "speech") as encoder:
+
+        def decode(chunk: Optional[bytes]) -> Optional[List[bytes]]:
+            """chunk为None表示音频已全部到达，进程内无法解码时返回None"""
+            pcm = decoder.feed(chunk) if chunk is not None else decoder.flush()
+            if pcm is None:
+                return None
+            pending.extend(pcm)
+            if chunk is None and len(pending) % FRAME_BYTES:
+                # 最后一帧不足时补零
+                pending.extend(b"\x00" * (FRAME_BYTES - len(pending) % FRAME_BYTES))
+            size = len(pending) - len(pending) % FRAME_BYTES
+            pcm = bytes(pending[:size])
+            del pending[:size]
+            return _encode_pcm_frames(encoder, pcm)
+
+        async for chunk in chunks:
+            for frame in await asyncio.to_thread(decode, chunk):
+                emitted = True
+                yield frame
+        frames = await asyncio.to_thread(decode, None)
+        if frames is not None:
+            for frame in frames:
+                yield frame
+            return
+    if emitted:
+        raise RuntimeError(f"进程内解码{file_type}音频失败")
+
+    logger.bind(tag=TAG).warning(f"进程内解码{file_type}音频失败，改用ffmpeg")
+
+    async def buffered_chunks():
+        yield bytes(decoder.data)
+
+    async with aclosing(
+        _ffmpeg_decode_chunks(buffered_chunks(), file_type, is_opus)
+    ) as frames:
+        async for frame in frames:
+            yield frame
+
+
+async def _ffmpeg_decode_chunks(
+    chunks: AsyncIterator[bytes], file_type: str, is_opus: bool
+) -> AsyncIterator[bytes]:
+    """音频块边到达边写入ffmpeg标准输入，解码、重采样后的PCM分批在工作线程中编码"""
+    # 尽量少探测输入，收到第一块音频就开始解码
+    input_options = ["-probesize", "32", "-analyzeduration", "0", "-fflags", "nobuffer"]
+    if file_type:
+        input_options += ["-f", file_type]
+    process = await asyncio.create_subprocess_exec(
+        *_ffmpeg_pcm_command("pipe:0", input_options),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    async def feed():
+        try:
+            async for chunk in chunks:
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        finally:
+            process.stdin.close()
+
+    feeder = asyncio.create_task(feed())
+    try:
+        with _pooled_encoder(is_opus, "speech") as encoder:
+            async for pcm in _read_pcm_batches(process.stdout):
+                for frame in await _encode_batch(encoder, pcm):
+                    yield frame
+        # 音频源的异常在这里抛出给调用方
+        await feeder
+        if await process.wait() != 0:
+            raise RuntimeError(f"ffmpeg解码失败，返回码 {process.returncode}")
+    finally:
+        feeder.cancel()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+class AudioStream(ABC):
+    """按帧产出的音频流，发送音频时逐帧读取"""
+
+    @abstractmethod
+    def frames(self) -> AsyncIterator[bytes]:
+        """逐帧产出音频数据的异步迭代器"""
+
+    def report_frames(self):
+        """用于聊天记录上报的音频帧"""
+        return []
+
+
+class AudioFileStream(AudioStream):
+    """按帧流式读取的音频文件
+
+    创建时不做任何IO，发送音频时才打开文件或启动ffmpeg，
+    中途打断时关闭迭代器即可停止读取和解码。
+    """
+
+    def __init__(self, file_path: str, audio_format: str = "opus"):
+        self.file_path = file_path
+        self.audio_format = audio_format
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """逐帧产出音频数据，p3文件和p3缓存始终产出Opus帧"""
+        p3_path = None
+        if self.file_path.endswith(".p3"):
+            p3_path = self.file_path
+        elif self.audio_format != "pcm":
+            p3_path = music_transcode_cache.get(self.file_path)
+
+        if p3_path:
+            p3_frames = read_p3_frames(p3_path)
+            try:
+                for opus_data in p3_frames:
+                    yield opus_data
+            finally:
+                p3_frames.close()
+            return
+
+        async with aclosing(self._ffmpeg_frames()) as ffmpeg_frames:
+            async for frame in ffmpeg_frames:
+                yield frame
+
+    async def _ffmpeg_frames(self) -> AsyncIterator[bytes]:
+        """由ffmpeg流式解码并分批编码，完整播放完时同时生成p3缓存"""
+        is_opus = self.audio_format != "pcm"
+        writer = music_transcode_cache.open_writer(self.file_path) if is_opus else None
+        completed = False
+        process = await asyncio.create_subprocess_exec(
+            *_ffmpeg_pcm_command(self.file_path),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            with _pooled_encoder(is_opus, "music") as encoder:
+                async for pcm in _read_pcm_batches(process.stdout):
+                    for frame in await _encode_batch(encoder, pcm):
+                        if writer:
+                            writer.write(frame)
+                        yield frame
+            completed = await process.wait() == 0
+            if not completed:
+                logger.bind(tag=TAG).error(
+                    f"ffmpeg解码失败: {self.file_path}, 返回码 {process.returncode}"
+                )
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            if writer:
+                # 提交缓存时可能遍历缓存目录并淘汰文件，不在事件循环上执行
+                await asyncio.to_thread(
+                    music_transcode_cache.close_writer, writer, completed
+                )
@@ -0,0 +1,78 @@
+"""后台定时刷新任务
+
+插件被调用时登记刷新任务，任务按固定间隔在事件循环上执行，
+长时间没有调用后自动停止，下次调用时重新启动，避免无人使用时持续请求上游服务。
+"""
+
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class BackgroundRefresher:
+    """按固定间隔执行的后台刷新任务"""
+
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        refresh: Callable[[], Awaitable[None]],
+        idle_timeout: float = 3600,
+    ):
+        self.name = name
+        self.interval = interval
+        self.refresh = refresh
+        self.idle_timeout = idle_timeout
+        self.last_used = 0.0
+        self.last_refresh = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    def touch(self):
+        """记录一次使用，任务未运行时在当前事件循环上启动"""
+        self.last_used = time.monotonic()
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        logger.bind(tag=TAG).info(f"后台刷新任务已启动: {self.name}")
+        while time.monotonic() - self.last_used < self.idle_timeout:
+            try:
+                await self.refresh()
+                self.last_refresh = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"后台刷新任务 {self.name} 执行失败: {e}")
+            await asyncio.sleep(self.interval)
+        logger.bind(tag=TAG).info(f"后台刷新任务长时间未使用，已停止: {self.name}")
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+
+_refreshers: Dict[str, BackgroundRefresher] = {}
+
+
+def ensure_refresher(
+    name: str,
+    interval: float,
+    refresh: Callable[[], Awaitable[None]],
+    idle_timeout: float = 3600,
+) -> BackgroundRefresher:
+    """获取或创建指定名称的刷新任务，并记录一次使用"""
+    refresher = _refreshers.get(name)
+    if refresher is None:
+        refresher = BackgroundRefresher(name, interval, refresh, idle_timeout)
+        _refreshers[name] = refresher
+    else:
+        refresher.interval = interval
+        refresher.refresh = refresh
+        refresher.idle_timeout = idle_timeout
+    refresher.touch()
+    return refresher
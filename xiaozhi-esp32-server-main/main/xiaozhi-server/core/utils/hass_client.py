@@ -0,0 +1,259 @@
+"""Home Assistant websocket客户端
+
+每个Home Assistant地址在进程内只维持一条websocket连接：连接后拉取全部实体状态，
+订阅state_changed事件维护内存中的状态镜像，状态查询直接读取镜像；
+服务调用通过同一连接按消息id复用，断线后自动重连并重新同步状态。
+"""
+
+import json
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+import websockets
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 断线重连的退避时间范围(秒)
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+# 单个websocket请求的超时时间(秒)
+REQUEST_TIMEOUT = 10
+# 自动生成设备列表时包含的实体类型
+DEVICE_DOMAINS = (
+    "light",
+    "switch",
+    "fan",
+    "cover",
+    "climate",
+    "media_player",
+    "vacuum",
+    "lock",
+    "humidifier",
+    "water_heater",
+)
+
+
+class HomeAssistantClient:
+    """单个Home Assistant实例的websocket连接与实体状态镜像"""
+
+    def __init__(self, base_url: str, api_key: str):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self.entity_areas: Dict[str, str] = {}
+        self.websocket = None
+        self.ready = asyncio.Event()
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.next_id = 1
+        self.connection_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    @property
+    def websocket_url(self) -> str:
+        if self.base_url.startswith("https://"):
+            url = "wss://" + self.base_url[len("https://") :]
+        elif self.base_url.startswith("http://"):
+            url = "ws://" + self.base_url[len("http://") :]
+        else:
+            url = self.base_url
+        return url + "/api/websocket"
+
+    def is_ready(self) -> bool:
+        return self.ready.is_set()
+
+    def start(self):
+        """在当前事件循环上启动连接维护任务，不在事件循环中调用时不启动"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self.connection_task is None or self.connection_task.done():
+            self.closed = False
+            self.connection_task = asyncio.create_task(self._connection_loop())
+
+    async def close(self):
+        """关闭连接并停止自动重连"""
+        self.closed = True
+        if self.connection_task:
+            self.connection_task.cancel()
+            self.connection_task = None
+        if self.websocket:
+            await self.websocket.close()
+            self.websocket = None
+        self.ready.clear()
+
+    async def _connection_loop(self):
+        """维持与Home Assistant的连接，断开后按指数退避自动重连"""
+        delay = RECONNECT_MIN_DELAY
+        while not self.closed:
+            try:
+                async with websockets.connect(
+                    self.websocket_url, max_size=None
+                ) as websocket:
+                    self.websocket = websocket
+                    await self._authenticate(websocket)
+                    listener = asyncio.create_task(self._message_listener(websocket))
+                    try:
+                        await self._sync_states()
+                        self.ready.set()
+                        delay = RECONNECT_MIN_DELAY
+                        logger.bind(tag=TAG).info(
+                            f"Home Assistant状态镜像已同步: {self.base_url}，"
+                            f"共 {len(self.states)} 个实体"
+                        )
+                        await listener
+                    finally:
+                        listener.cancel()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"Home Assistant连接失败: {e}")
+            finally:
+                self.websocket = None
+                self.ready.clear()
+                for future in self.pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("Home Assistant连接已断开"))
+                self.pending.clear()
+
+            if self.closed:
+                break
+            logger.bind(tag=TAG).info(f"{delay}秒后重新连接Home Assistant")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def _authenticate(self, websocket):
+        """完成Home Assistant websocket认证"""
+        message = json.loads(await websocket.recv())
+        if message.get("type") != "auth_required":
+            raise ConnectionError(f"Home Assistant握手消息异常: {message}")
+        await websocket.send(
+            json.dumps({"type": "auth", "access_token": self.api_key})
+        )
+        message = json.loads(await websocket.recv())
+        if message.get("type") != "auth_ok":
+            raise ConnectionError(f"Home Assistant认证失败: {message.get('message')}")
+
+    async def _sync_states(self):
+        """订阅状态变化后拉取全量状态和区域信息"""
+        await self.request({"type": "subscribe_events", "event_type": "state_changed"})
+        states = await self.request({"type": "get_states"})
+        self.states = {state["entity_id"]: state for state in states or []}
+        try:
+            self.entity_areas = await self._load_entity_areas()
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"获取Home Assistant区域信息失败: {e}")
+
+    async def _load_entity_areas(self) -> Dict[str, str]:
+        """根据区域、设备和实体注册表计算每个实体所在的区域名称"""
+        areas, devices, entities = await asyncio.gather(
+            self.request({"type": "config/area_registry/list"}),
+            self.request({"type": "config/device_registry/list"}),
+            self.request({"type": "config/entity_registry/list"}),
+        )
+        area_names = {area["area_id"]: area.get("name", "") for area in areas or []}
+        device_areas = {
+            device["id"]: device.get("area_id") for device in devices or []
+        }
+        entity_areas = {}
+        for entity in entities or []:
+            area_id = entity.get("area_id") or device_areas.get(entity.get("device_id"))
+            if area_id in area_names:
+                entity_areas[entity["entity_id"]] = area_names[area_id]
+        return entity_areas
+
+    async def _message_listener(self, websocket):
+        """处理请求结果和状态变化事件"""
+        async for raw in websocket:
+            message = json.loads(raw)
+            message_type = message.get("type")
+            if message_type == "event":
+                self._apply_event(message.get("event", {}))
+            elif message_type == "result":
+                future = self.pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if message.get("success"):
+                    future.set_result(message.get("result"))
+                else:
+                    error = message.get("error") or {}
+                    future.set_exception(
+                        RuntimeError(error.get("message", "Home Assistant请求失败"))
+                    )
+
+    def _apply_event(self, event: Dict[str, Any]):
+        """根据state_changed事件更新状态镜像"""
+        if event.get("event_type") != "state_changed":
+            return
+        data = event.get("data", {})
+        entity_id = data.get("entity_id")
+        if not entity_id:
+            return
+        new_state = data.get("new_state")
+        if new_state is None:
+            self.states.pop(entity_id, None)
+        else:
+            self.states[entity_id] = new_state
+
+    async def request(self, payload: Dict[str, Any], timeout: float = REQUEST_TIMEOUT):
+        """通过共享连接发送请求并等待对应id的结果"""
+        if self.websocket is None:
+            raise ConnectionError("Home Assistant未连接")
+        message_id = self.next_id
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message_id] = future
+        try:
+            await self.websocket.send(json.dumps({**payload, "id": message_id}))
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self.pending.pop(message_id, None)
+
+    def get_state(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        """从状态镜像读取实体状态，镜像未就绪时返回None"""
+        if not self.is_ready():
+            return None
+        return self.states.get(entity_id)
+
+    async def call_service(
+        self, domain: str, service: str, service_data: Dict[str, Any]
+    ) -> Any:
+        """调用Home Assistant服务"""
+        return await self.request(
+            {
+                "type": "call_service",
+                "domain": domain,
+                "service": service,
+                "service_data": service_data,
+            }
+        )
+
+    def get_devices(self) -> List[str]:
+        """根据状态镜像生成设备列表，格式与配置中的devices一致：位置,设备名,entity_id"""
+        devices = []
+        for entity_id, state in sorted(self.states.items()):
+            if entity_id.split(".")[0] not in DEVICE_DOMAINS:
+                continue
+            name = state.get("attributes", {}).get("friendly_name", entity_id)
+            area = self.entity_areas.get(entity_id, "")
+            devices.append(f"{area},{name},{entity_id}")
+        return devices
+
+
+# 进程内共享的Home Assistant客户端，按(base_url, api_key)复用
+_clients: Dict[Tuple[str, str], HomeAssistantClient] = {}
+
+
+def get_hass_client(base_url: str, api_key: str) -> Optional[HomeAssistantClient]:
+    """获取Home Assistant客户端，首次获取时在当前事件循环上启动连接"""
+    if not base_url or not api_key or "你的" in api_key:
+        return None
+    key = (base_url.rstrip("/"), api_key)
+    client = _clients.get(key)
+    if client is None:
+        client = HomeAssistantClient(base_url, api_key)
+        _clients[key] = client
+    # 不在事件循环中调用时不启动连接，由后续在事件循环中的调用启动
+    client.start()
+    return client
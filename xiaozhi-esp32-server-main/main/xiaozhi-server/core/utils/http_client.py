@@ -0,0 +1,217 @@
+"""插件共用的异步HTTP客户端
+
+进程内共享一个aiohttp会话，按主机复用keep-alive连接，并统一超时、重试和单主机并发上限，
+插件请求不会再阻塞事件循环，一个响应缓慢的服务也不会影响其他设备。
+"""
+
+import json
+import time
+import asyncio
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from multidict import CIMultiDict
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 可以安全重试的请求方法
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+# 遇到这些状态码时重试
+RETRY_STATUS = {502, 503, 504}
+
+
+class HttpStatusError(Exception):
+    """响应状态码表示请求失败"""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status}: {url}")
+        self.status = status
+        self.url = url
+
+
+class HttpResponse:
+    """已读取完响应体的HTTP响应"""
+
+    def __init__(self, status: int, headers: CIMultiDict, body: bytes, url: str):
+        self.status = status
+        self.status_code = status
+        self.headers = headers
+        self.content = body
+        self.url = url
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def charset(self) -> Optional[str]:
+        content_type = self.headers.get("Content-Type", "")
+        for part in content_type.split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"')
+        return None
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.charset or "utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise HttpStatusError(self.status, self.url)
+
+
+class AsyncHttpClient:
+    """带连接池、超时、重试和单主机并发限制的异步HTTP客户端"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        # 主机 -> 上次预热时间
+        self._warmed_up: Dict[str, float] = {}
+        # 限流键 -> 共享的并发请求信号量
+        self._limiters: Dict[str, asyncio.Semaphore] = {}
+        self.configure(config)
+
+    def configure(self, config: Optional[Dict[str, Any]] = None):
+        """根据配置设置连接池和超时参数，已创建的会话在下次关闭后生效"""
+        config = config or {}
+        self.timeout = float(config.get("timeout", 10))
+        self.connect_timeout = float(config.get("connect_timeout", 5))
+        self.retries = int(config.get("retries", 2))
+        self.retry_backoff = float(config.get("retry_backoff", 0.5))
+        self.limit = int(config.get("max_connections", 100))
+        self.limit_per_host = int(config.get("max_connections_per_host", 10))
+        self.keepalive_timeout = float(config.get("keepalive_timeout", 30))
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.timeout, sock_connect=self.connect_timeout
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def _get_session(self):
+        """获取当前事件循环上的共享会话，返回(会话, 是否为临时会话)"""
+        loop = asyncio.get_running_loop()
+        if (
+            self.session is None
+            or self.session.closed
+            or (self._session_loop is not None and self._session_loop.is_closed())
+        ):
+            self.session = self._create_session()
+            self._session_loop = loop
+        if self._session_loop is not loop:
+            # aiohttp会话不能跨事件循环使用，其他循环上的调用使用临时会话
+            return self._create_session(), True
+        return self.session, False
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> HttpResponse:
+        """发送请求并读取完整响应体；幂等请求在连接错误、超时和网关错误时按退避重试"""
+        method = method.upper()
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(
+                total=timeout, sock_connect=min(timeout, self.connect_timeout)
+            )
+
+        session, temporary = self._get_session()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    async with session.request(method, url, **kwargs) as resp:
+                        body = await resp.read()
+                        response = HttpResponse(
+                            resp.status, CIMultiDict(resp.headers), body, str(resp.url)
+                        )
+                    if response.status not in RETRY_STATUS or attempt == retries:
+                        return response
+                    logger.bind(tag=TAG).warning(
+                        f"请求 {url} 返回 {response.status}，重试 {attempt + 1}/{retries}"
+                    )
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if attempt == retries:
+                        raise
+                    logger.bind(tag=TAG).warning(
+                        f"请求 {url} 失败: {e!r}，重试 {attempt + 1}/{retries}"
+                    )
+                await asyncio.sleep(self.retry_backoff * (2**attempt))
+        finally:
+            if temporary:
+                await session.close()
+
+    def limiter(self, key: str, limit: int) -> asyncio.Semaphore:
+        """同一key的请求共享的并发上限，首次获取时按limit创建，只能在当前事件循环上使用"""
+        semaphore = self._limiters.get(key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, limit))
+            self._limiters[key] = semaphore
+        return semaphore
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def warmup(self, url: str):
+        """
+        预先建立到目标主机的连接并放入连接池，第一次正式请求不再等待TCP和TLS握手。
+        连接仍处于keep-alive期间的主机不重复预热，失败时忽略。
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            return
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        now = time.monotonic()
+        last_warmup = self._warmed_up.get(origin)
+        if last_warmup is not None and now - last_warmup < self.keepalive_timeout / 2:
+            return
+        self._warmed_up[origin] = now
+        try:
+            await self.request(
+                "HEAD",
+                origin,
+                retries=0,
+                timeout=self.connect_timeout,
+                allow_redirects=False,
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).debug(f"预热连接 {origin} 失败: {e!r}")
+
+    async def close(self):
+        """关闭共享会话"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self._session_loop = None
+
+
+# 进程内共享的HTTP客户端，由WebSocketServer按配置初始化
+http_client = AsyncHttpClient()
+# TTS共用的HTTP客户端，与插件请求分开限制连接数，由WebSocketServer按配置初始化
+tts_http_client = AsyncHttpClient()
+
+
+def get_http_client(conn=None) -> AsyncHttpClient:
+    """获取注入到连接所属服务器上的HTTP客户端，没有时使用进程内默认客户端"""
+    server = getattr(conn, "server", None)
+    return getattr(server, "http_client", None) or http_client
@@ -0,0 +1,127 @@
+"""歌曲名模糊检索索引"""
+
+import re
+import math
+import heapq
+from collections import defaultdict
+from typing import Dict, List, Set
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    # 未安装pypinyin时只按字符检索
+    lazy_pinyin = None
+
+# 拼音n-gram的前缀，与字符n-gram区分
+PINYIN_PREFIX = "py:"
+# 拼音命中的权重，低于字符命中，同音字只用于召回
+PINYIN_WEIGHT = 0.5
+
+# 用户指令中常见的与歌名无关的词，检索前剔除，避免干扰打分
+QUERY_STOP_WORDS = (
+    "随机播放音乐",
+    "播放音乐",
+    "来一首",
+    "我想听",
+    "给我放",
+    "帮我放",
+    "播放",
+    "音乐",
+    "歌曲",
+    "一首",
+)
+
+_NON_WORD_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """统一大小写并去除空白和标点"""
+    return _NON_WORD_PATTERN.sub("", text.lower()).replace("_", "")
+
+
+def build_ngrams(text: str) -> Set[str]:
+    """生成单字与双字的字符n-gram集合，安装了pypinyin时同时生成拼音n-gram"""
+    text = normalize_text(text)
+    grams = set(text)
+    for i in range(len(text) - 1):
+        grams.add(text[i : i + 2])
+    if lazy_pinyin is not None and text:
+        # 语音识别常把歌名识别成同音字，拼音n-gram可以召回这类结果
+        syllables = lazy_pinyin(text)
+        for i, syllable in enumerate(syllables):
+            grams.add(PINYIN_PREFIX + syllable)
+            if i + 1 < len(syllables):
+                grams.add(f"{PINYIN_PREFIX}{syllable} {syllables[i + 1]}")
+    return grams
+
+
+class MusicNameIndex:
+    """基于字符n-gram倒排表的歌曲名检索索引
+
+    构建一次后，每次检索只访问查询语句中n-gram对应的倒排链，
+    耗时与曲库规模基本无关，用于给意图识别提示词挑选少量候选歌曲。
+    """
+
+    def __init__(self, names: List[str] = None):
+        self.names: List[str] = []
+        self.inverted: Dict[str, List[int]] = defaultdict(list)
+        self.idf: Dict[str, float] = {}
+        self.norms: List[float] = []
+        if names:
+            self.build(names)
+
+    def build(self, names: List[str]):
+        """根据歌曲名列表重建索引"""
+        inverted = defaultdict(list)
+        norms = []
+        for doc_id, name in enumerate(names):
+            grams = build_ngrams(name)
+            for gram in grams:
+                inverted[gram].append(doc_id)
+            norms.append(math.sqrt(len(grams)) if grams else 1.0)
+
+        total = max(len(names), 1)
+        self.idf = {
+            gram: math.log(1 + total / len(doc_ids))
+            for gram, doc_ids in inverted.items()
+        }
+        self.names = list(names)
+        self.inverted = inverted
+        self.norms = norms
+
+    def search(self, query: str, top_k: int = 10) -> List[str]:
+        """返回与查询语句最相关的top_k个歌曲名"""
+        return [self.names[doc_id] for doc_id in self.search_ids(query, top_k)]
+
+    def search_ids(self, query: str, top_k: int = 10) -> List[int]:
+        """返回与查询语句最相关的top_k个歌曲在构建列表中的下标"""
+        if not self.names or not query or top_k <= 0:
+            return []
+        for word in QUERY_STOP_WORDS:
+            query = query.replace(word, "")
+
+        scores = defaultdict(float)
+        for gram in build_ngrams(query):
+            doc_ids = self.inverted.get(gram)
+            if not doc_ids:
+                continue
+            # 双字命中比单字命中更能说明相关性
+            weight = self.idf[gram] * (2.0 if len(gram) > 1 else 1.0)
+            if gram.startswith(PINYIN_PREFIX):
+                weight = self.idf[gram] * PINYIN_WEIGHT
+                if " " in gram:
+                    weight *= 2.0
+            for doc_id in doc_ids:
+                scores[doc_id] += weight
+
+        if not scores:
+            return []
+        best = heapq.nlargest(
+            top_k,
+            scores.items(),
+            key=lambda item: item[1] / self.norms[item[0]],
+        )
+        return [doc_id for doc_id, _ in best]
+
+    def __len__(self):
+        return len(self.names)
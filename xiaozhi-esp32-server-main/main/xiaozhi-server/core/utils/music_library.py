@@ -0,0 +1,121 @@
+"""本地曲库扫描
+
+按目录记录修改时间和其中的音乐文件，重新扫描时只列出修改时间变化的目录，
+其余目录直接复用上次的结果；扫描结果持久化到磁盘，服务重启后无需全量扫描。
+"""
+
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+from config.config_loader import get_project_dir
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 曲库扫描结果缓存文件
+MUSIC_LIBRARY_PATH = get_project_dir() + "data/.music_library.json"
+MUSIC_LIBRARY_VERSION = 1
+
+
+def scan_music_dirs(
+    music_dir: str, music_ext, previous: Optional[Dict[str, Dict]] = None
+) -> Dict[str, Dict]:
+    """
+    增量扫描音乐目录。
+
+    目录中新增、删除或重命名文件都会改变目录的修改时间，修改时间未变的目录
+    直接复用上次记录的文件列表，只需读取目录属性，不再逐个列出文件。
+
+    Returns:
+        相对目录路径到 {"mtime_ns", "files", "subdirs"} 的映射
+    """
+    previous = previous or {}
+    music_ext = tuple(ext.lower() for ext in music_ext)
+    dirs = {}
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        abs_dir = os.path.join(music_dir, rel_dir) if rel_dir else music_dir
+        try:
+            mtime_ns = os.stat(abs_dir).st_mtime_ns
+        except OSError:
+            continue
+
+        entry = previous.get(rel_dir)
+        if entry is None or entry.get("mtime_ns") != mtime_ns:
+            files, subdirs = [], []
+            try:
+                with os.scandir(abs_dir) as it:
+                    for item in it:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                subdirs.append(item.name)
+                            elif (
+                                item.is_file()
+                                and os.path.splitext(item.name)[1].lower()
+                                in music_ext
+                            ):
+                                files.append(item.name)
+                        except OSError:
+                            continue
+            except OSError as e:
+                logger.bind(tag=TAG).warning(f"读取音乐目录失败: {abs_dir}, {e}")
+                continue
+            entry = {
+                "mtime_ns": mtime_ns,
+                "files": sorted(files),
+                "subdirs": sorted(subdirs),
+            }
+
+        dirs[rel_dir] = entry
+        for subdir in entry["subdirs"]:
+            pending.append(os.path.join(rel_dir, subdir) if rel_dir else subdir)
+    return dirs
+
+
+def list_music_files(dirs: Dict[str, Dict]) -> Tuple[List[str], List[str]]:
+    """根据扫描结果生成音乐文件相对路径和去掉扩展名的歌曲名，顺序固定"""
+    music_files = []
+    for rel_dir in sorted(dirs):
+        for name in dirs[rel_dir]["files"]:
+            music_files.append(os.path.join(rel_dir, name) if rel_dir else name)
+    music_file_names = [os.path.splitext(file)[0] for file in music_files]
+    return music_files, music_file_names
+
+
+def load_music_library(music_dir: str, music_ext) -> Optional[Dict[str, Dict]]:
+    """读取与当前音乐目录和扩展名配置匹配的扫描结果，不匹配时返回None"""
+    if not os.path.exists(MUSIC_LIBRARY_PATH):
+        return None
+    try:
+        with open(MUSIC_LIBRARY_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except Exception as e:
+        logger.bind(tag=TAG).warning(f"读取曲库缓存失败: {e}")
+        return None
+    if (
+        state.get("version") != MUSIC_LIBRARY_VERSION
+        or state.get("music_dir") != music_dir
+        or state.get("music_ext") != sorted(ext.lower() for ext in music_ext)
+    ):
+        return None
+    return state.get("dirs")
+
+
+def save_music_library(music_dir: str, music_ext, dirs: Dict[str, Dict]):
+    """把扫描结果写入磁盘"""
+    state = {
+        "version": MUSIC_LIBRARY_VERSION,
+        "music_dir": music_dir,
+        "music_ext": sorted(ext.lower() for ext in music_ext),
+        "dirs": dirs,
+    }
+    try:
+        os.makedirs(os.path.dirname(MUSIC_LIBRARY_PATH), exist_ok=True)
+        tmp_path = MUSIC_LIBRARY_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, MUSIC_LIBRARY_PATH)
+    except Exception as e:
+        logger.bind(tag=TAG).warning(f"写入曲库缓存失败: {e}")
@@ -4,13 +4,129 @@ Opus编码工具类
 """
 
 import logging
+import threading
 import traceback
-
-import numpy as np
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from opuslib_next import Encoder
 from opuslib_next import constants
 
+# 各编码场景的默认复杂度：语音降低复杂度换取编码速度，音乐保持最高质量
+DEFAULT_COMPLEXITY = {"speech": 5, "music": 10}
+# 各编码场景的信号类型
+PROFILE_SIGNALS = {"speech": constants.SIGNAL_VOICE, "music": constants.SIGNAL_MUSIC}
+
+
+class OpusEncoderPool:
+    """
+    Opus编码器池
+
+    按(采样率, 通道数, 场景)复用编码器，用完后重置状态放回池中，不再每次调用都创建编码器。
+    opuslib通过ctypes调用libopus，编码期间释放GIL，整段PCM可以放到工作线程中编码。
+    """
+
+    def __init__(self):
+        self._idle: Dict[Tuple[int, int, str], List[Encoder]] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.frames_encoded = 0
+        self.configure()
+
+    def configure(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.complexity = {
+            "speech": int(config.get("speech_complexity", DEFAULT_COMPLEXITY["speech"])),
+            "music": int(config.get("music_complexity", DEFAULT_COMPLEXITY["music"])),
+        }
+        # 每种编码器最多保留的空闲数量
+        self.max_idle = int(config.get("max_idle", 8))
+        with self._lock:
+            # 复杂度可能已变化，丢弃旧的空闲编码器
+            self._idle.clear()
+
+    def _create(self, sample_rate: int, channels: int, profile: str) -> Encoder:
+        encoder = Encoder(sample_rate, channels, constants.APPLICATION_AUDIO)
+        encoder.complexity = self.complexity[profile]
+        encoder.signal = PROFILE_SIGNALS[profile]
+        return encoder
+
+    @contextmanager
+    def encoder(
+        self, sample_rate: int = 16000, channels: int = 1, profile: str = "speech"
+    ) -> Iterator[Encoder]:
+        """借出一个编码器，退出时重置状态后归还"""
+        key = (sample_rate, channels, profile)
+        with self._lock:
+            idle = self._idle.get(key)
+            encoder = idle.pop() if idle else None
+            if encoder is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if encoder is None:
+            encoder = self._create(sample_rate, channels, profile)
+        try:
+            yield encoder
+        finally:
+            encoder.reset_state()
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(encoder)
+
+    def encode_frames(
+        self, encoder: Encoder, pcm_data: bytes, frame_size: int, channels: int = 1
+    ) -> List[bytes]:
+        """
+        用借出的编码器逐帧编码PCM，pcm_data长度须为帧长的整数倍。
+
+        流式编码时同一个编码器分批在工作线程中调用，批次之间保持编码器状态。
+        """
+        frame_bytes = frame_size * channels * 2
+        with memoryview(pcm_data) as view:
+            datas = [
+                encoder.encode(view[i : i + frame_bytes].tobytes(), frame_size)
+                for i in range(0, len(view), frame_bytes)
+            ]
+        with self._lock:
+            self.frames_encoded += len(datas)
+        return datas
+
+    def encode_pcm(
+        self,
+        pcm_data: bytes,
+        profile: str = "speech",
+        sample_rate: int = 16000,
+        channels: int = 1,
+        frame_duration: int = 60,
+    ) -> List[bytes]:
+        """把整段16位PCM按帧编码为Opus，最后一帧不足时补零"""
+        frame_size = sample_rate * frame_duration // 1000
+        frame_bytes = frame_size * channels * 2
+        if len(pcm_data) % frame_bytes:
+            pcm_data = bytes(pcm_data) + b"\x00" * (
+                frame_bytes - len(pcm_data) % frame_bytes
+            )
+        with self.encoder(sample_rate, channels, profile) as encoder:
+            return self.encode_frames(encoder, pcm_data, frame_size, channels)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取编码器池统计信息"""
+        with self._lock:
+            idle = sum(len(encoders) for encoders in self._idle.values())
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "idle": idle,
+            "frames_encoded": self.frames_encoded,
+            "complexity": dict(self.complexity),
+        }
+
+
+# 进程内共享的Opus编码器池，由WebSocketServer按配置初始化
+opus_encoder_pool = OpusEncoderPool()
+
 
 class OpusEncoderUtils:
     """PCM到Opus的编码器"""
@@ -31,13 +147,15 @@ class OpusEncoderUtils:
         self.frame_size = (sample_rate * frame_size_ms) // 1000
         # 总帧大小 = 每帧样本数 * 通道数
         self.total_frame_size = self.frame_size * channels
+        # 每帧字节数（16位PCM）
+        self.frame_bytes = self.total_frame_size * 2
 
         # 比特率和复杂度设置
         self.bitrate = 24000  # bps
         self.complexity = 10  # 最高质量
 
-        # 缓冲区初始化为空
-        self.buffer = np.array([], dtype=np.int16)
+        # 未凑满一帧的PCM数据，原地追加和截断，不再每次重新分配整个缓冲区
+        self.buffer = bytearray()
 
         try:
             # 创建Opus编码器
@@ -54,60 +172,51 @@ class OpusEncoderUtils:
     def reset_state(self):
         """重置编码器状态"""
         self.encoder.reset_state()
-        self.buffer = np.array([], dtype=np.int16)
+        self.buffer.clear()
 
     def encode_pcm_to_opus(self, pcm_data: bytes, end_of_stream: bool) -> List[bytes]:
         """
         将PCM数据编码为Opus格式
 
         Args:
-            pcm_data: PCM字节数据
+            pcm_data: PCM字节数据（小端16位）
             end_of_stream: 是否为流的结束
 
         Returns:
             Opus数据包列表
         """
-        # 将字节数据转换为short数组
-        new_samples = self._convert_bytes_to_shorts(pcm_data)
-
-        # 校验PCM数据
-        self._validate_pcm_data(new_samples)
-
-        # 将新数据追加到缓冲区
-        self.buffer = np.append(self.buffer, new_samples)
+        self.buffer += pcm_data
 
         opus_packets = []
         offset = 0
 
         # 处理所有完整帧
-        while offset <= len(self.buffer) - self.total_frame_size:
-            frame = self.buffer[offset : offset + self.total_frame_size]
-            output = self._encode(frame)
-            if output:
-                opus_packets.append(output)
-            offset += self.total_frame_size
+        with memoryview(self.buffer) as view:
+            while offset + self.frame_bytes <= len(view):
+                output = self._encode(view[offset : offset + self.frame_bytes].tobytes())
+                if output:
+                    opus_packets.append(output)
+                offset += self.frame_bytes
 
         # 保留未处理的样本
-        self.buffer = self.buffer[offset:]
+        del self.buffer[:offset]
 
         # 流结束时处理剩余数据
-        if end_of_stream and len(self.buffer) > 0:
+        if end_of_stream and self.buffer:
             # 创建最后一帧并用0填充
-            last_frame = np.zeros(self.total_frame_size, dtype=np.int16)
-            last_frame[: len(self.buffer)] = self.buffer
-
+            last_frame = bytes(self.buffer) + b"\x00" * (
+                self.frame_bytes - len(self.buffer)
+            )
             output = self._encode(last_frame)
             if output:
                 opus_packets.append(output)
-            self.buffer = np.array([], dtype=np.int16)
+            self.buffer.clear()
 
         return opus_packets
 
-    def _encode(self, frame: np.ndarray) -> Optional[bytes]:
+    def _encode(self, frame_bytes: bytes) -> Optional[bytes]:
         """编码一帧音频数据"""
         try:
-            # 将numpy数组转换为bytes
-            frame_bytes = frame.tobytes()
             # opuslib要求输入字节数必须是channels*2的倍数
             encoded = self.encoder.encode(frame_bytes, self.frame_size)
             return encoded
@@ -116,20 +225,6 @@ class OpusEncoderUtils:
             traceback.print_exc()
             return None
 
-    def _convert_bytes_to_shorts(self, bytes_data: bytes) -> np.ndarray:
-        """将字节数组转换为short数组 (16位PCM)"""
-        # 假设输入是小端字节序的16位PCM
-        return np.frombuffer(bytes_data, dtype=np.int16)
-
-    def _validate_pcm_data(self, pcm_shorts: np.ndarray) -> None:
-        """验证PCM数据是否有效"""
-        # 16位PCM数据范围是 -32768 到 32767
-        if np.any((pcm_shorts < -32768) | (pcm_shorts > 32767)):
-            invalid_samples = pcm_shorts[(pcm_shorts < -32768) | (pcm_shorts > 32767)]
-            logging.warning(f"发现无效PCM样本: {invalid_samples[:5]}...")
-            # 在实际应用中可以选择裁剪而不是抛出异常
-            # np.clip(pcm_shorts, -32768, 32767, out=pcm_shorts)
-
     def close(self):
         """关闭编码器并释放资源"""
         # opuslib没有明确的关闭方法，Python的垃圾回收会处理
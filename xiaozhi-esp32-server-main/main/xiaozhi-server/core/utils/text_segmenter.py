@@ -0,0 +1,186 @@
+"""LLM输出文本的流式分句
+
+逐字符扫描新到达的文本，每个字符只处理一次，遇到分句标点立即切出一句，
+不再每收到一个token就拼接全部文本重新查找标点。
+分句时记录Markdown状态：代码块内的内容不朗读，表格整块切出后交给MarkdownCleaner转换，
+跨句的粗体标记在句尾补齐、下一句开头重新打开，保证每一句都能单独清理。
+首句在LLM输出较慢或迟迟没有标点时，按等待时间和字数提前切分，缩短首句出声时间。
+"""
+
+import time
+from typing import List, Optional, Sequence
+from core.utils import textUtils
+
+# 成对出现的强调标记
+EMPHASIS_MARKS = ("**", "__")
+# 连续出现时需要合并判断的Markdown标记字符
+RUN_CHARS = "`*_"
+
+
+class TextSegmenter:
+    """单轮对话的流式分句器，每轮对话开始时调用reset"""
+
+    def __init__(
+        self,
+        punctuations: Sequence[str],
+        first_sentence_punctuations: Sequence[str],
+        first_max_chars: int = 24,
+        first_max_wait: float = 0.8,
+        first_min_chars: int = 4,
+    ):
+        """
+        Args:
+            punctuations: 分句标点
+            first_sentence_punctuations: 首句的分句标点，通常包含逗号等以尽早出声
+            first_max_chars: 首句超过该字数仍没有标点时直接切分
+            first_max_wait: 首个token到达后超过该时间(秒)仍没有切出首句时，
+                收到下一个token即切分
+            first_min_chars: 按等待时间切分首句时的最少字数
+        """
+        self.punctuations = frozenset(punctuations)
+        self.first_sentence_punctuations = frozenset(first_sentence_punctuations)
+        self.first_max_chars = first_max_chars
+        self.first_max_wait = first_max_wait
+        self.first_min_chars = first_min_chars
+        self.reset()
+
+    def reset(self):
+        """清空缓冲和Markdown状态"""
+        self._chars: List[str] = []
+        self._is_first = True
+        self._first_token_time: Optional[float] = None
+        self._run_char = ""
+        self._run_len = 0
+        self._in_fence = False
+        self._in_table = False
+        self._line_start = True
+        self._open_emphasis: Optional[str] = None
+
+    def feed(self, text: str) -> List[str]:
+        """
+        处理新到达的文本。
+
+        Returns:
+            本次切出的句子，已去除首尾标点和表情，可能为空
+        """
+        segments = []
+        if self._first_token_time is None:
+            self._first_token_time = time.monotonic()
+        for char in text:
+            if char in RUN_CHARS:
+                if char != self._run_char:
+                    self._flush_run(segments)
+                    self._run_char = char
+                self._run_len += 1
+                continue
+            self._flush_run(segments)
+            self._scan_char(char, segments)
+
+        if self._is_first and self._should_cut_first():
+            self._emit(segments, keep_word=True)
+        return segments
+
+    def flush(self) -> List[str]:
+        """切出剩余的全部文本，例如插入音频文件前或本轮文本结束时"""
+        segments = []
+        self._flush_run(segments)
+        # 未闭合的强调标记不再补齐
+        self._open_emphasis = None
+        self._emit(segments)
+        # 已经切出过首句时，后续文本仍按普通句子切分
+        is_first = self._is_first
+        self.reset()
+        self._is_first = is_first
+        return segments
+
+    def _should_cut_first(self) -> bool:
+        """首句是否不等标点提前切分"""
+        if self._in_fence or self._in_table or not self._chars:
+            return False
+        length = len("".join(self._chars).strip())
+        if length >= self.first_max_chars:
+            return True
+        waited = time.monotonic() - self._first_token_time
+        return waited >= self.first_max_wait and length >= self.first_min_chars
+
+    def _flush_run(self, segments: List[str]):
+        """处理累计的连续标记字符，例如代码块围栏和粗体标记"""
+        if not self._run_len:
+            return
+        mark = self._run_char * self._run_len
+        self._run_char, self._run_len = "", 0
+        if mark[0] == "`" and len(mark) >= 3:
+            # 代码块整体不朗读
+            self._in_fence = not self._in_fence
+            return
+        if self._in_fence:
+            return
+        self._check_line_start(mark[0], segments)
+        if mark in EMPHASIS_MARKS:
+            if self._open_emphasis == mark:
+                self._open_emphasis = None
+            elif self._open_emphasis is None:
+                self._open_emphasis = mark
+        self._chars.extend(mark)
+
+    def _scan_char(self, char: str, segments: List[str]):
+        if self._in_fence:
+            return
+        self._check_line_start(char, segments)
+        self._chars.append(char)
+        if char == "\n":
+            self._line_start = True
+            return
+        if self._in_table:
+            return
+        punctuations = (
+            self.first_sentence_punctuations if self._is_first else self.punctuations
+        )
+        if char in punctuations:
+            self._emit(segments)
+
+    def _check_line_start(self, char: str, segments: List[str]):
+        """行首字符决定是否进入或离开表格"""
+        if not self._line_start or char in " \t":
+            return
+        self._line_start = False
+        if char == "|":
+            if not self._in_table:
+                # 表格前的文字先切出，表格整块交给MarkdownCleaner转换
+                self._emit(segments)
+                self._in_table = True
+        elif self._in_table:
+            self._emit(segments)
+            self._in_table = False
+
+    def _emit(self, segments: List[str], keep_word: bool = False):
+        """
+        切出当前缓冲的文本。
+
+        Args:
+            keep_word: 提前切分时不截断英文单词，单词剩余部分留到下一句
+        """
+        chars, tail = self._chars, []
+        if keep_word and chars and chars[-1].isascii() and chars[-1].isalnum():
+            for i in range(len(chars) - 1, 0, -1):
+                if chars[i].isspace():
+                    chars, tail = chars[: i + 1], chars[i + 1 :]
+                    break
+        raw = "".join(chars)
+        self._chars = []
+        if self._open_emphasis:
+            raw += self._open_emphasis
+            self._chars.extend(self._open_emphasis)
+        self._chars.extend(tail)
+
+        segment = textUtils.get_string_no_punctuation_or_emoji(raw)
+        content = segment
+        if self._open_emphasis:
+            content = content.replace(self._open_emphasis, "").strip()
+        if not content:
+            return
+        if self._in_table:
+            # MarkdownCleaner按以换行结尾的行识别表格
+            segment += "\n"
+        segments.append(segment)
+        self._is_first = False
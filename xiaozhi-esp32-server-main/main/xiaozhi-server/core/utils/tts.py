@@ -22,6 +22,8 @@ class MarkdownCleaner:
     """
     封装 Markdown 清理逻辑：直接用 MarkdownCleaner.clean_markdown(text) 即可
     """
+    # 出现这些字符时才可能包含Markdown元素，否则无需逐个执行正则
+    MARKDOWN_CHARS = re.compile(r'[`#*_\[>|+\-$\n]')
     # 公式字符
     NORMAL_FORMULA_CHARS = re.compile(r'[a-zA-Z\\^_{}\+\-\(\)\[\]=]')
 
@@ -107,6 +109,8 @@ class MarkdownCleaner:
         """
         主入口方法：依序执行所有正则，移除或替换 Markdown 元素
         """
+        if not MarkdownCleaner.MARKDOWN_CHARS.search(text):
+            return text.strip()
         for regex, replacement in MarkdownCleaner.REGEXES:
             text = regex.sub(replacement, text)
         return text.strip()
\ No newline at end of file
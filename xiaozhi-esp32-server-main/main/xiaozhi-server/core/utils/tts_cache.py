@@ -0,0 +1,157 @@
+"""TTS音频缓存
+
+按(TTS类型, 音色和参数, 规范化后的文本)缓存合成后的Opus帧列表，问候语、工具回复、
+错误提示等重复出现的句子命中后既不请求TTS服务也不重新编码。
+内存中保留最近使用的音频，超出上限按LRU淘汰；磁盘上以p3格式保存，按最近访问时间淘汰。
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from config.config_loader import get_project_dir
+from config.logger import setup_logging
+from core.utils.audio_stream import P3DiskQuota, P3Writer, read_p3_frames
+
+TAG = __name__
+logger = setup_logging()
+
+# 磁盘缓存目录
+TTS_CACHE_DIR = get_project_dir() + "data/tts_cache/"
+# 计算缓存键时忽略的配置项
+IGNORED_CONFIG_KEYS = ("output_dir",)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_tts_text(text: str) -> str:
+    """去掉首尾空白并合并连续空白，避免空白差异导致缓存未命中"""
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def get_params_fingerprint(provider_type: str, config: Dict[str, Any], **params) -> str:
+    """TTS类型、配置和运行时参数的指纹，任一变化都会使用新的缓存"""
+    data = {k: v for k, v in config.items() if k not in IGNORED_CONFIG_KEYS}
+    return hashlib.md5(
+        json.dumps(
+            [provider_type, data, params], sort_keys=True, ensure_ascii=False, default=str
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+class TTSAudioCache:
+    """内存LRU加磁盘p3两级的TTS音频缓存"""
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._memory: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_quota = P3DiskQuota(cache_dir, "TTS磁盘缓存", 0)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.configure()
+
+    def configure(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = bool(config.get("enabled", True))
+        self.max_memory_bytes = int(float(config.get("max_memory_mb", 64)) * 1024 * 1024)
+        self._disk_quota.max_bytes = int(
+            float(config.get("max_disk_mb", 1024)) * 1024 * 1024
+        )
+        self.max_text_length = int(config.get("max_text_length", 100))
+
+    def make_key(self, fingerprint: str, text: str) -> Optional[str]:
+        """生成缓存键，未启用缓存或文本过长时返回None"""
+        text = normalize_tts_text(text)
+        if not self.enabled or not text or len(text) > self.max_text_length:
+            return None
+        return hashlib.md5(f"{fingerprint}:{text}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".p3")
+
+    def get(self, key: str) -> Optional[List[bytes]]:
+        """读取缓存的Opus帧列表，先查内存再查磁盘"""
+        with self._lock:
+            audio_datas = self._memory.get(key)
+            if audio_datas is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.bytes_saved += sum(len(data) for data in audio_datas)
+                return audio_datas
+
+        disk_path = self._disk_path(key)
+        try:
+            audio_datas = list(read_p3_frames(disk_path))
+            # 更新访问时间，磁盘淘汰时按该时间排序
+            os.utime(disk_path)
+        except OSError:
+            audio_datas = None
+
+        with self._lock:
+            if not audio_datas:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.bytes_saved += sum(len(data) for data in audio_datas)
+            self._put_memory(key, audio_datas)
+        return audio_datas
+
+    def set(self, key: str, audio_datas: List[bytes]):
+        """写入内存和磁盘缓存"""
+        if not audio_datas:
+            return
+        with self._lock:
+            self._put_memory(key, audio_datas)
+
+        disk_path = self._disk_path(key)
+        if os.path.exists(disk_path):
+            return
+        try:
+            writer = P3Writer(disk_path)
+            for data in audio_datas:
+                writer.write(data)
+            writer.close(True)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"写入TTS磁盘缓存失败: {e}")
+            return
+        self._disk_quota.add(os.path.getsize(disk_path))
+
+    def _put_memory(self, key: str, audio_datas: List[bytes]):
+        """调用方需持有锁"""
+        size = sum(len(data) for data in audio_datas)
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= sum(len(data) for data in old)
+        self._memory[key] = audio_datas
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sum(len(data) for data in evicted)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_size": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_bytes": self._disk_quota.used_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+# 进程内共享的TTS音频缓存，由WebSocketServer按配置初始化
+tts_audio_cache = TTSAudioCache()
@@ -5,8 +5,8 @@ import re
 import os
 import wave
 from io import BytesIO
-from core.utils import p3
-import numpy as np
+from core.utils import p3, audio_decoder
+from core.utils.opus_encoder_utils import opus_encoder_pool
 import requests
 import opuslib_next
 from pydub import AudioSegment
@@ -107,6 +107,27 @@ def get_ip_info(ip_addr, logger):
         return {}
 
 
+async def get_ip_info_async(ip_addr, logger, http_client=None):
+    """异步获取IP所在城市，使用共享的HTTP客户端"""
+    from core.utils.http_client import http_client as default_http_client
+
+    try:
+        if is_private_ip(ip_addr):
+            ip_addr = ""
+        url = f"https://whois.pconline.com.cn/ipJson.jsp?json=true&ip={ip_addr}"
+        resp = await (http_client or default_http_client).get(url)
+        try:
+            resp = resp.json()
+        except ValueError:
+            # 未声明编码时该接口可能返回GBK编码的内容
+            resp = json.loads(resp.content.decode("gbk", errors="replace"))
+        ip_info = {"city": resp.get("city")}
+        return ip_info
+    except Exception as e:
+        logger.bind(tag=TAG).error(f"Error getting client ip info: {e}")
+        return {}
+
+
 def write_json_file(file_path, data):
     """将数据写入 JSON 文件"""
     with open(file_path, "w", encoding="utf-8") as file:
@@ -758,6 +779,10 @@ def audio_to_data(audio_file_path, is_opus=True):
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
         file_type = file_type.lstrip(".")
+    with open(audio_file_path, "rb") as f:
+        result = _native_audio_to_data(f.read(), file_type, is_opus)
+    if result is not None:
+        return result
     # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
     audio = AudioSegment.from_file(
         audio_file_path, format=file_type, parameters=["-nostdin"]
@@ -781,45 +806,50 @@ def audio_bytes_to_data(audio_bytes, file_type, is_opus=True):
     if file_type == "p3":
         # 直接用p3解码
         return p3.decode_opus_from_bytes(audio_bytes)
-    else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
-        )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        duration = len(audio) / 1000.0
-        raw_data = audio.raw_data
-        return pcm_to_data(raw_data, is_opus), duration
-
-
-def pcm_to_data(raw_data, is_opus=True):
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
-    # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
-    datas = []
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
+    result = _native_audio_to_data(audio_bytes, file_type, is_opus)
+    if result is not None:
+        return result
+    # 进程内无法解码的格式用pydub
+    audio = AudioSegment.from_file(
+        BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
+    )
+    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    duration = len(audio) / 1000.0
+    raw_data = audio.raw_data
+    return pcm_to_data(raw_data, is_opus), duration
 
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
 
+def _native_audio_to_data(audio_bytes, file_type, is_opus=True):
+    """
+    进程内解码音频，返回(opus/pcm数据, 时长)，无法在进程内解码时返回None。
+    Ogg/Opus且需要Opus输出时直接重新打包，不再解码和重新编码。
+    """
+    try:
         if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
+            packets = audio_decoder.ogg_opus_to_packets(audio_bytes)
+            if packets is not None:
+                return packets, len(packets) * audio_decoder.FRAME_DURATION / 1000.0
+        raw_data = audio_decoder.decode_to_pcm(audio_bytes, file_type)
+    except Exception:
+        return None
+    if raw_data is None:
+        return None
+    return pcm_to_data(raw_data, is_opus), len(raw_data) / (16000 * 2)
 
-        datas.append(frame_data)
 
+def pcm_to_data(raw_data, is_opus=True):
+    """16kHz单声道PCM按60ms分帧，is_opus为True时用编码器池编码为Opus"""
+    if is_opus:
+        return opus_encoder_pool.encode_pcm(raw_data, profile="speech")
+
+    frame_bytes = 960 * 2  # 60ms per frame, 16bit=2bytes/sample
+    datas = []
+    # 按帧切分所有音频数据（最后一帧不足时补零）
+    for i in range(0, len(raw_data), frame_bytes):
+        chunk = bytes(raw_data[i : i + frame_bytes])
+        if len(chunk) < frame_bytes:
+            chunk += b"\x00" * (frame_bytes - len(chunk))
+        datas.append(chunk)
     return datas
 
 
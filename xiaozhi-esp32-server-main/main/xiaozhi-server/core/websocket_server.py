@@ -5,6 +5,10 @@ from core.connection import ConnectionHandler
 from config.config_loader import get_config_from_api
 from core.utils.modules_initialize import initialize_modules
 from core.utils.util import check_vad_update, check_asr_update
+from core.providers.tools.server_mcp import ServerMCPPool
+from core.utils.http_client import http_client, tts_http_client
+from core.utils.tts_cache import tts_audio_cache
+from core.utils.opus_encoder_utils import opus_encoder_pool
 
 TAG = __name__
 
@@ -31,16 +35,36 @@ class WebSocketServer:
         self._memory = modules["memory"] if "memory" in modules else None
 
         self.active_connections = set()
+        # 所有连接共享的服务端MCP客户端池，首次使用时才启动MCP服务
+        self.server_mcp_pool = ServerMCPPool()
+        # 所有连接共享的插件HTTP客户端
+        self.http_client = http_client
+        self.http_client.configure(self.config.get("http_client"))
+        # 所有连接共享的TTS连接池
+        tts_http_client.configure(self.config.get("tts_http"))
+        # 所有连接共享的TTS音频缓存
+        tts_audio_cache.configure(self.config.get("tts_cache"))
+        # 所有连接共享的Opus编码器池
+        opus_encoder_pool.configure(self.config.get("opus_encoder"))
 
     async def start(self):
         server_config = self.config["server"]
         host = server_config.get("ip", "0.0.0.0")
         port = int(server_config.get("port", 8000))
 
-        async with websockets.serve(
-            self._handle_connection, host, port, process_request=self._http_response
-        ):
-            await asyncio.Future()
+        try:
+            async with websockets.serve(
+                self._handle_connection, host, port, process_request=self._http_response
+            ):
+                await asyncio.Future()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """服务器停止时关闭所有连接共享的MCP服务和HTTP连接池"""
+        await self.server_mcp_pool.close()
+        await self.http_client.close()
+        await tts_http_client.close()
 
     async def _handle_connection(self, websocket):
         """处理新连接，每次创建独立的ConnectionHandler"""
@@ -1,13 +1,22 @@
 import random
-import requests
+import asyncio
 import xml.etree.ElementTree as ET
 from bs4 import BeautifulSoup
 from config.logger import setup_logging
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
+from core.providers.tools.base import tool_result_cache
+from core.utils.http_client import get_http_client
+from core.utils.background_refresher import ensure_refresher
 
 TAG = __name__
 logger = setup_logging()
 
+# 新闻列表和详情在所有连接间共享缓存的时间(秒)
+NEWS_CACHE_TTL = 300
+# 后台预取的默认间隔(秒)与每个新闻源预取详情的新闻条数
+DEFAULT_PREFETCH_INTERVAL = 300
+DEFAULT_PREFETCH_COUNT = 5
+
 GET_NEWS_FROM_CHINANEWS_FUNCTION_DESC = {
     "type": "function",
     "function": {
@@ -40,10 +49,10 @@ GET_NEWS_FROM_CHINANEWS_FUNCTION_DESC = {
 }
 
 
-def fetch_news_from_rss(rss_url):
+async def fetch_news_from_rss(http_client, rss_url):
     """从RSS源获取新闻列表"""
     try:
-        response = requests.get(rss_url)
+        response = await http_client.get(rss_url)
         response.raise_for_status()
 
         # 解析XML
@@ -82,13 +91,23 @@ def fetch_news_from_rss(rss_url):
         return []
 
 
-def fetch_news_detail(url):
+async def fetch_news_detail(http_client, url):
     """获取新闻详情页内容并总结"""
     try:
-        response = requests.get(url)
+        response = await http_client.get(url)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, "html.parser")
+        # 页面解析耗时较长，放到线程中执行，避免阻塞事件循环
+        return await asyncio.to_thread(extract_news_content, response.content)
+    except Exception as e:
+        logger.bind(tag=TAG).error(f"获取新闻详情失败: {e}")
+        return "无法获取详细内容"
+
+
+def extract_news_content(html):
+    """从新闻详情页HTML中提取正文"""
+    try:
+        soup = BeautifulSoup(html, "html.parser")
 
         # 尝试提取正文内容 (这里的选择器需要根据实际网站结构调整)
         content_div = soup.select_one(
@@ -108,10 +127,66 @@ def fetch_news_detail(url):
             )
             return content[:2000]  # 限制长度
     except Exception as e:
-        logger.bind(tag=TAG).error(f"获取新闻详情失败: {e}")
+        logger.bind(tag=TAG).error(f"解析新闻详情失败: {e}")
         return "无法获取详细内容"
 
 
+def get_prefetch_config(conn):
+    """获取后台预取配置，返回(间隔, 每个新闻源预取详情的条数)，间隔为0表示关闭预取"""
+    rss_config = conn.config["plugins"].get("get_news_from_chinanews") or {}
+    interval = float(rss_config.get("prefetch_interval", DEFAULT_PREFETCH_INTERVAL))
+    count = int(rss_config.get("prefetch_count", DEFAULT_PREFETCH_COUNT))
+    return interval, count
+
+
+def ensure_news_prefetch(conn):
+    """启动所有已配置RSS源的后台预取，定时刷新新闻列表和排名靠前新闻的详情"""
+    interval, count = get_prefetch_config(conn)
+    if interval <= 0:
+        return
+    rss_config = conn.config["plugins"].get("get_news_from_chinanews") or {}
+    rss_urls = sorted(
+        {
+            url
+            for key, url in rss_config.items()
+            if key.endswith("_rss_url") and isinstance(url, str) and url
+        }
+    )
+    if not rss_urls:
+        return
+    http_client = get_http_client(conn)
+    # 缓存时间长于刷新间隔，刷新期间缓存不会过期
+    ttl = interval * 2 + NEWS_CACHE_TTL
+
+    async def refresh():
+        for rss_url in rss_urls:
+            news_items = await fetch_news_from_rss(http_client, rss_url)
+            if not news_items:
+                continue
+            tool_result_cache.set(f"chinanews_rss:{rss_url}", news_items, ttl)
+            for item in news_items[:count]:
+                await _prefetch_news_detail(http_client, item.get("link"), ttl)
+
+    ensure_refresher(f"chinanews:{','.join(rss_urls)}", interval, refresh)
+
+
+async def _prefetch_news_detail(http_client, link, ttl):
+    """预取新闻详情，已缓存的详情只延长缓存时间"""
+    if not link or link == "#":
+        return
+    key = f"chinanews_detail:{link}"
+    hit, content = tool_result_cache.get(key)
+    if not hit:
+        content = await fetch_news_detail(http_client, link)
+        if not is_valid_detail(content):
+            return
+    tool_result_cache.set(key, content, ttl)
+
+
+def is_valid_detail(content):
+    return bool(content) and content != "无法获取详细内容"
+
+
 def map_category(category_text):
     """将用户输入的中文类别映射到配置文件中的类别键"""
     if not category_text:
@@ -144,11 +219,13 @@ def map_category(category_text):
     GET_NEWS_FROM_CHINANEWS_FUNCTION_DESC,
     ToolType.SYSTEM_CTL,
 )
-def get_news_from_chinanews(
+async def get_news_from_chinanews(
     conn, category: str = None, detail: bool = False, lang: str = "zh_CN"
 ):
     """获取新闻并随机选择一条进行播报，或获取上一条新闻的详细内容"""
     try:
+        ensure_news_prefetch(conn)
+
         # 如果detail为True，获取上一条新闻的详细内容
         if detail:
             if (
@@ -173,7 +250,12 @@ def get_news_from_chinanews(
             logger.bind(tag=TAG).debug(f"获取新闻详情: {title}, URL={link}")
 
             # 获取新闻详情
-            detail_content = fetch_news_detail(link)
+            detail_content = await tool_result_cache.get_or_execute(
+                f"chinanews_detail:{link}",
+                NEWS_CACHE_TTL,
+                lambda: fetch_news_detail(get_http_client(conn), link),
+                should_cache=is_valid_detail,
+            )
 
             if not detail_content or detail_content == "无法获取详细内容":
                 return ActionResponse(
@@ -213,14 +295,19 @@ def get_news_from_chinanews(
         )
 
         # 获取新闻列表
-        news_items = fetch_news_from_rss(rss_url)
+        news_items = await tool_result_cache.get_or_execute(
+            f"chinanews_rss:{rss_url}",
+            NEWS_CACHE_TTL,
+            lambda: fetch_news_from_rss(get_http_client(conn), rss_url),
+            should_cache=bool,
+        )
 
         if not news_items:
             return ActionResponse(
                 Action.REQLLM, "抱歉，未能获取到新闻信息，请稍后再试。", None
             )
 
-        # 随机选择一条新闻
+        # 从完整列表中随机选择一条新闻，选中靠前的新闻时详情查询直接命中预取缓存
         selected_news = random.choice(news_items)
 
         # 保存当前新闻链接到连接对象，以便后续查询详情
@@ -1,13 +1,25 @@
+import io
 import random
-import requests
-import json
+import asyncio
 from config.logger import setup_logging
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
-from markitdown import MarkItDown
+from markitdown import MarkItDown, StreamInfo
+from core.providers.tools.base import tool_result_cache
+from core.utils.http_client import get_http_client
+from core.utils.tts import MarkdownCleaner
+from core.utils.background_refresher import ensure_refresher
 
 TAG = __name__
 logger = setup_logging()
 
+# 新闻列表和详情在所有连接间共享缓存的时间(秒)
+NEWS_CACHE_TTL = 300
+# 后台预取的默认间隔(秒)与每个新闻源预取详情的新闻条数
+DEFAULT_PREFETCH_INTERVAL = 300
+DEFAULT_PREFETCH_COUNT = 5
+# 详情内容的最大长度
+MAX_DETAIL_LENGTH = 2000
+
 # 新闻来源字典，包含名称和对应的API ID
 NEWS_SOURCES = {
     "thepaper": "澎湃新闻",
@@ -56,16 +68,79 @@ GET_NEWS_FROM_NEWSNOW_FUNCTION_DESC = {
 }
 
 
-def fetch_news_from_api(conn, source="thepaper"):
+def get_news_api_url(conn, source="thepaper"):
+    """获取新闻源的API地址"""
+    api_url = f"https://newsnow.busiyi.world/api/s?id={source}"
+    if conn.config["plugins"].get("get_news_from_newsnow") and conn.config[
+        "plugins"
+    ]["get_news_from_newsnow"].get("url"):
+        api_url = conn.config["plugins"]["get_news_from_newsnow"]["url"] + source
+    return api_url
+
+
+def get_prefetch_config(conn):
+    """获取后台预取配置，返回(间隔, 每个新闻源预取详情的条数)，间隔为0表示关闭预取"""
+    plugin_config = conn.config["plugins"].get("get_news_from_newsnow") or {}
+    interval = float(plugin_config.get("prefetch_interval", DEFAULT_PREFETCH_INTERVAL))
+    count = int(plugin_config.get("prefetch_count", DEFAULT_PREFETCH_COUNT))
+    return interval, count
+
+
+def ensure_news_prefetch(conn):
+    """启动所有新闻源的后台预取，定时刷新新闻列表和排名靠前新闻的详情"""
+    interval, count = get_prefetch_config(conn)
+    if interval <= 0:
+        return
+    http_client = get_http_client(conn)
+    api_urls = [get_news_api_url(conn, source) for source in NEWS_SOURCES]
+    # 缓存时间长于刷新间隔，刷新期间缓存不会过期
+    ttl = interval * 2 + NEWS_CACHE_TTL
+
+    async def refresh():
+        for api_url in api_urls:
+            news_items = await _request_news_items(http_client, api_url)
+            if not news_items:
+                continue
+            tool_result_cache.set(f"newsnow_list:{api_url}", news_items, ttl)
+            for item in news_items[:count]:
+                await _prefetch_news_detail(http_client, item.get("url"), ttl)
+
+    ensure_refresher(f"newsnow:{','.join(api_urls)}", interval, refresh)
+
+
+async def _prefetch_news_detail(http_client, url, ttl):
+    """预取新闻详情，已缓存的详情只延长缓存时间"""
+    if not url or url == "#":
+        return
+    key = f"newsnow_detail:{url}"
+    hit, content = tool_result_cache.get(key)
+    if not hit:
+        content = await fetch_news_detail(http_client, url)
+        if not is_valid_detail(content):
+            return
+    tool_result_cache.set(key, content, ttl)
+
+
+def is_valid_detail(content):
+    return bool(content) and content != "无法获取详细内容"
+
+
+async def fetch_news_from_api(conn, source="thepaper"):
     """从API获取新闻列表"""
-    try:
-        api_url = f"https://newsnow.busiyi.world/api/s?id={source}"
-        if conn.config["plugins"].get("get_news_from_newsnow") and conn.config[
-            "plugins"
-        ]["get_news_from_newsnow"].get("url"):
-            api_url = conn.config["plugins"]["get_news_from_newsnow"]["url"] + source
+    api_url = get_news_api_url(conn, source)
+
+    return await tool_result_cache.get_or_execute(
+        f"newsnow_list:{api_url}",
+        NEWS_CACHE_TTL,
+        lambda: _request_news_items(get_http_client(conn), api_url),
+        should_cache=bool,
+    )
 
-        response = requests.get(api_url, timeout=10)
+
+async def _request_news_items(http_client, api_url):
+    """请求新闻API并返回新闻列表"""
+    try:
+        response = await http_client.get(api_url, timeout=10)
         response.raise_for_status()
 
         data = response.json()
@@ -81,40 +156,52 @@ def fetch_news_from_api(conn, source="thepaper"):
         return []
 
 
-def fetch_news_detail(url):
+async def fetch_news_detail(http_client, url):
     """获取新闻详情页内容并使用MarkItDown清理HTML"""
     try:
-        response = requests.get(url, timeout=10)
+        response = await http_client.get(url, timeout=10)
         response.raise_for_status()
 
-        # 使用MarkItDown清理HTML内容
-        md = MarkItDown(enable_plugins=False)
-        result = md.convert(response)
-
-        # 获取清理后的文本内容
-        clean_text = result.text_content
+        # 使用MarkItDown清理HTML内容，转换耗时较长，放到线程中执行
+        clean_text = await asyncio.to_thread(convert_html_to_text, response)
 
         # 如果清理后的内容为空，返回提示信息
         if not clean_text or len(clean_text.strip()) == 0:
             logger.bind(tag=TAG).warning(f"清理后的新闻内容为空: {url}")
             return "无法解析新闻详情内容，可能是网站结构特殊或内容受限。"
 
-        return clean_text
+        # 去除Markdown标记并限制长度，可直接用于播报
+        return MarkdownCleaner.clean_markdown(clean_text)[:MAX_DETAIL_LENGTH]
     except Exception as e:
         logger.bind(tag=TAG).error(f"获取新闻详情失败: {e}")
         return "无法获取详细内容"
 
 
+def convert_html_to_text(response):
+    """使用MarkItDown将HTML响应转换为纯文本"""
+    md = MarkItDown(enable_plugins=False)
+    stream_info = StreamInfo(
+        mimetype=response.headers.get("Content-Type", "text/html").split(";")[0],
+        extension=".html",
+        charset=response.charset,
+        url=response.url,
+    )
+    result = md.convert_stream(io.BytesIO(response.content), stream_info=stream_info)
+    return result.text_content
+
+
 @register_function(
     "get_news_from_newsnow",
     GET_NEWS_FROM_NEWSNOW_FUNCTION_DESC,
     ToolType.SYSTEM_CTL,
 )
-def get_news_from_newsnow(
+async def get_news_from_newsnow(
     conn, source: str = "thepaper", detail: bool = False, lang: str = "zh_CN"
 ):
     """获取新闻并随机选择一条进行播报，或获取上一条新闻的详细内容"""
     try:
+        ensure_news_prefetch(conn)
+
         # 如果detail为True，获取上一条新闻的详细内容
         detail = str(detail).lower() == "true"
         if detail:
@@ -144,7 +231,12 @@ def get_news_from_newsnow(
             )
 
             # 获取新闻详情
-            detail_content = fetch_news_detail(url)
+            detail_content = await tool_result_cache.get_or_execute(
+                f"newsnow_detail:{url}",
+                NEWS_CACHE_TTL,
+                lambda: fetch_news_detail(get_http_client(conn), url),
+                should_cache=is_valid_detail,
+            )
 
             if not detail_content or detail_content == "无法获取详细内容":
                 return ActionResponse(
@@ -175,7 +267,7 @@ def get_news_from_newsnow(
         logger.bind(tag=TAG).info(f"获取新闻: 新闻源={source}({source_name})")
 
         # 获取新闻列表
-        news_items = fetch_news_from_api(conn, source)
+        news_items = await fetch_news_from_api(conn, source)
 
         if not news_items:
             return ActionResponse(
@@ -184,7 +276,7 @@ def get_news_from_newsnow(
                 None,
             )
 
-        # 随机选择一条新闻
+        # 从完整列表中随机选择一条新闻，选中靠前的新闻时详情查询直接命中预取缓存
         selected_news = random.choice(news_items)
 
         # 保存当前新闻链接到连接对象，以便后续查询详情
@@ -1,8 +1,9 @@
-import requests
+import asyncio
 from bs4 import BeautifulSoup
 from config.logger import setup_logging
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
-from core.utils.util import get_ip_info
+from core.utils.util import get_ip_info_async
+from core.utils.http_client import get_http_client
 
 TAG = __name__
 logger = setup_logging()
@@ -107,15 +108,19 @@ WEATHER_CODE_MAP = {
 }
 
 
-def fetch_city_info(location, api_key, api_host):
-    url = f"https://{api_host}/geo/v2/city/lookup?key={api_key}&location={location}&lang=zh"
-    response = requests.get(url, headers=HEADERS).json()
+async def fetch_city_info(http_client, location, api_key, api_host):
+    url = f"https://{api_host}/geo/v2/city/lookup"
+    params = {"key": api_key, "location": location, "lang": "zh"}
+    response = (await http_client.get(url, headers=HEADERS, params=params)).json()
     return response.get("location", [])[0] if response.get("location") else None
 
 
-def fetch_weather_page(url):
-    response = requests.get(url, headers=HEADERS)
-    return BeautifulSoup(response.text, "html.parser") if response.ok else None
+async def fetch_weather_page(http_client, url):
+    response = await http_client.get(url, headers=HEADERS)
+    if not response.ok:
+        return None
+    # 页面解析耗时较长，放到线程中执行，避免阻塞事件循环
+    return await asyncio.to_thread(BeautifulSoup, response.text, "html.parser")
 
 
 def parse_weather_info(soup):
@@ -149,28 +154,41 @@ def parse_weather_info(soup):
     return city_name, current_abstract, current_basic, temps_list
 
 
-@register_function("get_weather", GET_WEATHER_FUNCTION_DESC, ToolType.SYSTEM_CTL)
-def get_weather(conn, location: str = None, lang: str = "zh_CN"):
+def _weather_cache_key(conn, arguments):
+    """相同地点共用天气结果，未指定地点时按客户端IP区分"""
+    location = arguments.get("location") or f"ip:{conn.client_ip}"
+    return f"{location}:{arguments.get('lang', 'zh_CN')}"
+
+
+@register_function(
+    "get_weather",
+    GET_WEATHER_FUNCTION_DESC,
+    ToolType.SYSTEM_CTL,
+    cache_ttl=600,
+    cache_key=_weather_cache_key,
+)
+async def get_weather(conn, location: str = None, lang: str = "zh_CN"):
     api_host = conn.config["plugins"]["get_weather"].get("api_host", "mj7p3y7naa.re.qweatherapi.com")
     api_key = conn.config["plugins"]["get_weather"].get("api_key", "a861d0d5e7bf4ee1a83d9a9e4f96d4da")
     default_location = conn.config["plugins"]["get_weather"]["default_location"]
     client_ip = conn.client_ip
+    http_client = get_http_client(conn)
     # 优先使用用户提供的location参数
     if not location:
         # 通过客户端IP解析城市
         if client_ip:
             # 动态解析IP对应的城市信息
-            ip_info = get_ip_info(client_ip, logger)
+            ip_info = await get_ip_info_async(client_ip, logger, http_client)
             location = ip_info.get("city") if ip_info and "city" in ip_info else None
         else:
             # 若IP解析失败或无IP，使用默认位置
             location = default_location
-    city_info = fetch_city_info(location, api_key, api_host)
+    city_info = await fetch_city_info(http_client, location, api_key, api_host)
     if not city_info:
         return ActionResponse(
             Action.REQLLM, f"未找到相关的城市: {location}，请确认地点是否正确", None
         )
-    soup = fetch_weather_page(city_info["fxLink"])
+    soup = await fetch_weather_page(http_client, city_info["fxLink"])
     if not soup:
         return ActionResponse(Action.REQLLM, None, "请求失败")
     city_name, current_abstract, current_basic, temps_list = parse_weather_info(soup)
@@ -1,8 +1,7 @@
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
-from plugins_func.functions.hass_init import initialize_hass_handler
+from plugins_func.functions.hass_init import initialize_hass_handler, get_hass_ws_client
 from config.logger import setup_logging
-import asyncio
-import requests
+from core.utils.http_client import get_http_client
 
 TAG = __name__
 logger = setup_logging()
@@ -26,69 +25,80 @@ hass_get_state_function_desc = {
 }
 
 
-@register_function("hass_get_state", hass_get_state_function_desc, ToolType.SYSTEM_CTL)
-def hass_get_state(conn, entity_id=""):
+# 状态优先从websocket状态镜像读取，始终是最新状态，不再使用结果缓存
+@register_function(
+    "hass_get_state",
+    hass_get_state_function_desc,
+    ToolType.SYSTEM_CTL,
+)
+async def hass_get_state(conn, entity_id=""):
     try:
-
-        future = asyncio.run_coroutine_threadsafe(
-            handle_hass_get_state(conn, entity_id), conn.loop
-        )
-        ha_response = future.result()
+        ha_response = await handle_hass_get_state(conn, entity_id)
         return ActionResponse(Action.REQLLM, ha_response, None)
     except Exception as e:
         logger.bind(tag=TAG).error(f"处理设置属性意图错误: {e}")
 
 
 async def handle_hass_get_state(conn, entity_id):
+    # 状态镜像已就绪时直接读取，无需请求Home Assistant
+    client = get_hass_ws_client(conn)
+    if client and client.is_ready():
+        state = client.get_state(entity_id)
+        if state is None:
+            return f"未找到设备: {entity_id}"
+        return format_hass_state(state)
+
     ha_config = initialize_hass_handler(conn)
     api_key = ha_config.get("api_key")
     base_url = ha_config.get("base_url")
     url = f"{base_url}/api/states/{entity_id}"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    response = requests.get(url, headers=headers)
+    response = await get_http_client(conn).get(url, headers=headers)
     if response.status_code == 200:
-        responsetext = "设备状态:" + response.json()["state"] + " "
-        logger.bind(tag=TAG).info(f"api返回内容: {response.json()}")
-
-        if "media_title" in response.json()["attributes"]:
-            responsetext = (
-                responsetext
-                + "正在播放的是:"
-                + str(response.json()["attributes"]["media_title"])
-                + " "
-            )
-        if "volume_level" in response.json()["attributes"]:
-            responsetext = (
-                responsetext
-                + "音量是:"
-                + str(response.json()["attributes"]["volume_level"])
-                + " "
-            )
-        if "color_temp_kelvin" in response.json()["attributes"]:
-            responsetext = (
-                responsetext
-                + "色温是:"
-                + str(response.json()["attributes"]["color_temp_kelvin"])
-                + " "
-            )
-        if "rgb_color" in response.json()["attributes"]:
-            responsetext = (
-                responsetext
-                + "rgb颜色是:"
-                + str(response.json()["attributes"]["rgb_color"])
-                + " "
-            )
-        if "brightness" in response.json()["attributes"]:
-            responsetext = (
-                responsetext
-                + "亮度是:"
-                + str(response.json()["attributes"]["brightness"])
-                + " "
-            )
-        logger.bind(tag=TAG).info(f"查询返回内容: {responsetext}")
-        return responsetext
-        # return response.json()['attributes']
-        # response.attributes
-
+        return format_hass_state(response.json())
     else:
         return f"切换失败，错误码: {response.status_code}"
+
+
+def format_hass_state(state):
+    """将实体状态转换为播报文本"""
+    responsetext = "设备状态:" + state["state"] + " "
+    logger.bind(tag=TAG).info(f"设备状态内容: {state}")
+
+    if "media_title" in state["attributes"]:
+        responsetext = (
+            responsetext
+            + "正在播放的是:"
+            + str(state["attributes"]["media_title"])
+            + " "
+        )
+    if "volume_level" in state["attributes"]:
+        responsetext = (
+            responsetext
+            + "音量是:"
+            + str(state["attributes"]["volume_level"])
+            + " "
+        )
+    if "color_temp_kelvin" in state["attributes"]:
+        responsetext = (
+            responsetext
+            + "色温是:"
+            + str(state["attributes"]["color_temp_kelvin"])
+            + " "
+        )
+    if "rgb_color" in state["attributes"]:
+        responsetext = (
+            responsetext
+            + "rgb颜色是:"
+            + str(state["attributes"]["rgb_color"])
+            + " "
+        )
+    if "brightness" in state["attributes"]:
+        responsetext = (
+            responsetext
+            + "亮度是:"
+            + str(state["attributes"]["brightness"])
+            + " "
+        )
+    logger.bind(tag=TAG).info(f"查询返回内容: {responsetext}")
+    return responsetext
@@ -1,5 +1,6 @@
 from config.logger import setup_logging
 from core.utils.util import check_model_key
+from core.utils.hass_client import get_hass_client
 
 TAG = __name__
 logger = setup_logging()
@@ -11,15 +12,9 @@ def append_devices_to_prompt(conn):
             "functions", []
         )
 
-        config_source = (
-            "home_assistant"
-            if conn.config["plugins"].get("home_assistant")
-            else "hass_get_state"
-        )
-
         if "hass_get_state" in funcs or "hass_set_state" in funcs:
             prompt = "\n下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
-            deviceStr = conn.config["plugins"].get(config_source, {}).get("devices", "")
+            deviceStr = "\n".join(get_hass_devices(conn))
             conn.prompt += prompt + deviceStr + "\n"
             # 更新提示词
             conn.dialogue.update_system_message(conn.prompt)
@@ -43,6 +38,9 @@ def initialize_hass_handler(conn):
     plugin_config = conn.config["plugins"][config_source]
     ha_config["base_url"] = plugin_config.get("base_url")
     ha_config["api_key"] = plugin_config.get("api_key")
+    ha_config["devices"] = plugin_config.get("devices")
+    ha_config["ws_mirror"] = plugin_config.get("ws_mirror", True)
+    ha_config["auto_devices"] = plugin_config.get("auto_devices", False)
 
     # 统一检查API密钥
     model_key_msg = check_model_key("home_assistant", ha_config.get("api_key"))
@@ -50,3 +48,25 @@ def initialize_hass_handler(conn):
         logger.bind(tag=TAG).error(model_key_msg)
 
     return ha_config
+
+
+def get_hass_ws_client(conn):
+    """获取连接对应的Home Assistant websocket客户端，未启用状态镜像时返回None"""
+    ha_config = initialize_hass_handler(conn)
+    if not ha_config.get("ws_mirror", True):
+        return None
+    return get_hass_client(ha_config.get("base_url"), ha_config.get("api_key"))
+
+
+def get_hass_devices(conn):
+    """获取设备列表，开启auto_devices且状态镜像已就绪时使用Home Assistant中的实体"""
+    ha_config = initialize_hass_handler(conn)
+    if ha_config.get("auto_devices"):
+        client = get_hass_ws_client(conn)
+        if client and client.is_ready():
+            return client.get_devices()
+
+    devices = ha_config.get("devices") or []
+    if isinstance(devices, str):
+        devices = [line for line in devices.splitlines() if line.strip()]
+    return list(devices)
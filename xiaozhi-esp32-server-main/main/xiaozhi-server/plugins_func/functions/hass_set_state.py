@@ -1,8 +1,7 @@
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
-from plugins_func.functions.hass_init import initialize_hass_handler
+from plugins_func.functions.hass_init import initialize_hass_handler, get_hass_ws_client
 from config.logger import setup_logging
-import asyncio
-import requests
+from core.utils.http_client import get_http_client
 
 TAG = __name__
 logger = setup_logging()
@@ -50,12 +49,9 @@ hass_set_state_function_desc = {
 
 
 @register_function("hass_set_state", hass_set_state_function_desc, ToolType.SYSTEM_CTL)
-def hass_set_state(conn, entity_id="", state={}):
+async def hass_set_state(conn, entity_id="", state={}):
     try:
-        future = asyncio.run_coroutine_threadsafe(
-            handle_hass_set_state(conn, entity_id, state), conn.loop
-        )
-        ha_response = future.result()
+        ha_response = await handle_hass_set_state(conn, entity_id, state)
         return ActionResponse(Action.REQLLM, ha_response, None)
     except Exception as e:
         logger.bind(tag=TAG).error(f"处理设置属性意图错误: {e}")
@@ -159,9 +155,19 @@ async def handle_hass_set_state(conn, entity_id, state):
         }
     else:
         data = {"entity_id": entity_id, arg: value}
+    # 状态镜像的websocket连接可用时，服务调用复用该连接
+    client = get_hass_ws_client(conn)
+    if client and client.is_ready():
+        try:
+            await client.call_service(domain, action, data)
+            logger.bind(tag=TAG).info(f"设置状态:{description},service:{domain}.{action}")
+            return description
+        except Exception as e:
+            return f"设置失败: {e}"
+
     url = f"{base_url}/api/services/{domain}/{action}"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    response = requests.post(url, headers=headers, json=data)
+    response = await get_http_client(conn).post(url, headers=headers, json=data)
     logger.bind(tag=TAG).info(
         f"设置状态:{description},url:{url},return_code:{response.status_code}"
     )
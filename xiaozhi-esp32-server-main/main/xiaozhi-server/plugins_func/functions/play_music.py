@@ -6,8 +6,16 @@ import random
 import asyncio
 import difflib
 import traceback
-from pathlib import Path
 from core.utils import p3
+from core.utils.music_index import MusicNameIndex
+from core.utils.music_library import (
+    scan_music_dirs,
+    list_music_files,
+    load_music_library,
+    save_music_library,
+)
+from core.utils.background_refresher import ensure_refresher
+from core.utils.audio_stream import music_transcode_cache
 from core.handle.sendAudioHandle import send_stt_message
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 from core.utils.dialogue import Message
@@ -16,6 +24,12 @@ from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType, ContentType
 TAG = __name__
 
 MUSIC_CACHE = {}
+# 模糊匹配歌名时从索引召回的候选数量
+MATCH_CANDIDATES = 20
+# 播放指定歌曲时等待首次加载曲库的最长时间(秒)
+LIBRARY_WAIT_TIMEOUT = 10
+# 首次加载曲库完成后置位
+_library_ready = asyncio.Event()
 
 play_music_function_desc = {
     "type": "function",
@@ -36,7 +50,9 @@ play_music_function_desc = {
 }
 
 
-@register_function("play_music", play_music_function_desc, ToolType.SYSTEM_CTL)
+@register_function(
+    "play_music", play_music_function_desc, ToolType.SYSTEM_CTL, order_sensitive=True
+)
 def play_music(conn, song_name: str):
     try:
         music_intent = (
@@ -85,12 +101,17 @@ def _extract_song_name(text):
     return None
 
 
-def _find_best_match(potential_song, music_files):
-    """查找最匹配的歌曲"""
+def _find_best_match(potential_song, music_index, music_files):
+    """查找最匹配的歌曲
+
+    先用倒排索引召回少量候选，再在候选中按编辑相似度挑选最佳结果，
+    匹配耗时不随曲库规模线性增长。
+    """
     best_match = None
     highest_ratio = 0
 
-    for music_file in music_files:
+    for doc_id in music_index.search_ids(potential_song, MATCH_CANDIDATES):
+        music_file = music_files[doc_id]
         song_name = os.path.splitext(music_file)[0]
         ratio = difflib.SequenceMatcher(None, potential_song, song_name).ratio()
         if ratio > highest_ratio and ratio > 0.4:
@@ -99,27 +120,83 @@ def _find_best_match(potential_song, music_files):
     return best_match
 
 
-def get_music_files(music_dir, music_ext):
-    music_dir = Path(music_dir)
-    music_files = []
-    music_file_names = []
-    for file in music_dir.rglob("*"):
-        # 判断是否是文件
-        if file.is_file():
-            # 获取文件扩展名
-            ext = file.suffix.lower()
-            # 判断扩展名是否在列表中
-            if ext in music_ext:
-                # 添加相对路径
-                music_files.append(str(file.relative_to(music_dir)))
-                music_file_names.append(
-                    os.path.splitext(str(file.relative_to(music_dir)))[0]
-                )
-    return music_files, music_file_names
+def get_music_files(music_dir, music_ext, previous_dirs=None):
+    """增量扫描音乐目录，返回(扫描结果, 音乐文件相对路径, 歌曲名)"""
+    dirs = scan_music_dirs(music_dir, music_ext, previous_dirs)
+    return (dirs, *list_music_files(dirs))
+
+
+def _build_music_library(music_files, music_file_names):
+    """生成音乐文件列表及对应的歌曲名检索索引，歌曲名未变化时复用已有索引"""
+    if music_file_names == MUSIC_CACHE.get("music_file_names"):
+        return music_files, music_file_names, MUSIC_CACHE["music_index"]
+    return music_files, music_file_names, MusicNameIndex(music_file_names)
+
+
+def _update_music_files(music_files, music_file_names, music_index):
+    """更新音乐文件列表和检索索引，歌曲名变化时更新曲库版本"""
+    MUSIC_CACHE["music_files"] = music_files
+    MUSIC_CACHE["scan_time"] = time.time()
+    if music_index is not MUSIC_CACHE.get("music_index"):
+        MUSIC_CACHE["music_file_names"] = music_file_names
+        MUSIC_CACHE["music_index"] = music_index
+        MUSIC_CACHE["music_version"] = MUSIC_CACHE.get("music_version", 0) + 1
+
+
+def _rescan_music_library():
+    """增量扫描曲库并在需要时重建索引，在线程池中执行
+
+    首次加载时优先以上次保存的扫描结果为基础增量扫描，没有时才全量扫描。
+    """
+    music_dir = MUSIC_CACHE["music_dir"]
+    music_ext = MUSIC_CACHE["music_ext"]
+    previous_dirs = MUSIC_CACHE.get("music_dirs")
+    if previous_dirs is None:
+        previous_dirs = load_music_library(music_dir, music_ext)
+    dirs, music_files, music_file_names = get_music_files(
+        music_dir, music_ext, previous_dirs
+    )
+    if dirs != previous_dirs:
+        save_music_library(music_dir, music_ext, dirs)
+    return dirs, _build_music_library(music_files, music_file_names)
+
+
+async def _refresh_music_library():
+    dirs, library = await asyncio.to_thread(_rescan_music_library)
+    MUSIC_CACHE["music_dirs"] = dirs
+    _update_music_files(*library)
+    _library_ready.set()
+    if MUSIC_CACHE["pre_transcode"]:
+        # 后台把曲库中尚未缓存的文件转码为p3，已缓存的文件会被跳过
+        music_transcode_cache.schedule(
+            os.path.join(MUSIC_CACHE["music_dir"], file)
+            for file in MUSIC_CACHE["music_files"]
+        )
+
+
+def _ensure_music_refresh():
+    """在事件循环上登记曲库的后台增量扫描任务"""
+    try:
+        ensure_refresher(
+            "play_music_library",
+            MUSIC_CACHE["refresh_time"],
+            _refresh_music_library,
+        )
+    except RuntimeError:
+        # 不在事件循环中调用时不启动任务，由后续在事件循环中的调用启动
+        pass
+
+
+def search_music_candidates(conn, text, top_k=None):
+    """根据用户语句检索最相关的候选歌曲名，供意图识别提示词使用"""
+    music_cache = initialize_music_handler(conn)
+    _ensure_music_refresh()
+    if top_k is None:
+        top_k = music_cache["prompt_top_k"]
+    return music_cache["music_index"].search(text, top_k)
 
 
 def initialize_music_handler(conn):
-    global MUSIC_CACHE
     if MUSIC_CACHE == {}:
         if "play_music" in conn.config["plugins"]:
             MUSIC_CACHE["music_config"] = conn.config["plugins"]["play_music"]
@@ -132,38 +209,62 @@ def initialize_music_handler(conn):
             MUSIC_CACHE["refresh_time"] = MUSIC_CACHE["music_config"].get(
                 "refresh_time", 60
             )
+            MUSIC_CACHE["prompt_top_k"] = int(
+                MUSIC_CACHE["music_config"].get("prompt_top_k", 10)
+            )
+            MUSIC_CACHE["p3_cache"] = MUSIC_CACHE["music_config"].get("p3_cache", True)
+            MUSIC_CACHE["p3_cache_max_mb"] = MUSIC_CACHE["music_config"].get(
+                "p3_cache_max_mb", 2048
+            )
+            MUSIC_CACHE["pre_transcode"] = MUSIC_CACHE["music_config"].get(
+                "pre_transcode", False
+            )
         else:
             MUSIC_CACHE["music_dir"] = os.path.abspath("./music")
             MUSIC_CACHE["music_ext"] = (".mp3", ".wav", ".p3")
             MUSIC_CACHE["refresh_time"] = 60
-        # 获取音乐文件列表
-        MUSIC_CACHE["music_files"], MUSIC_CACHE["music_file_names"] = get_music_files(
-            MUSIC_CACHE["music_dir"], MUSIC_CACHE["music_ext"]
+            MUSIC_CACHE["prompt_top_k"] = 10
+            MUSIC_CACHE["p3_cache"] = True
+            MUSIC_CACHE["p3_cache_max_mb"] = 2048
+            MUSIC_CACHE["pre_transcode"] = False
+        MUSIC_CACHE["pre_transcode"] = (
+            MUSIC_CACHE["p3_cache"] and MUSIC_CACHE["pre_transcode"]
+        )
+        music_transcode_cache.configure(
+            MUSIC_CACHE["p3_cache"], MUSIC_CACHE["p3_cache_max_mb"]
         )
-        MUSIC_CACHE["scan_time"] = time.time()
+        # 扫描曲库和建立索引由后台任务在线程池中完成，完成前使用空曲库
+        MUSIC_CACHE["music_dirs"] = None
+        _update_music_files([], [], MusicNameIndex([]))
     return MUSIC_CACHE
 
 
+async def _wait_music_library(conn):
+    """等待首次加载曲库，超时后使用当前曲库"""
+    if _library_ready.is_set():
+        return
+    try:
+        await asyncio.wait_for(_library_ready.wait(), timeout=LIBRARY_WAIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        conn.logger.bind(tag=TAG).warning("曲库尚未加载完成，使用当前曲库")
+
+
 async def handle_music_command(conn, text):
     initialize_music_handler(conn)
-    global MUSIC_CACHE
+    _ensure_music_refresh()
+    await _wait_music_library(conn)
 
     """处理音乐播放指令"""
     clean_text = re.sub(r"[^\w\s]", "", text).strip()
     conn.logger.bind(tag=TAG).debug(f"检查是否是音乐命令: {clean_text}")
 
-    # 尝试匹配具体歌名
+    # 尝试匹配具体歌名，曲库由后台任务定期增量刷新
     if os.path.exists(MUSIC_CACHE["music_dir"]):
-        if time.time() - MUSIC_CACHE["scan_time"] > MUSIC_CACHE["refresh_time"]:
-            # 刷新音乐文件列表
-            MUSIC_CACHE["music_files"], MUSIC_CACHE["music_file_names"] = (
-                get_music_files(MUSIC_CACHE["music_dir"], MUSIC_CACHE["music_ext"])
-            )
-            MUSIC_CACHE["scan_time"] = time.time()
-
         potential_song = _extract_song_name(clean_text)
         if potential_song:
-            best_match = _find_best_match(potential_song, MUSIC_CACHE["music_files"])
+            best_match = _find_best_match(
+                potential_song, MUSIC_CACHE["music_index"], MUSIC_CACHE["music_files"]
+            )
             if best_match:
                 conn.logger.bind(tag=TAG).info(f"找到最匹配的歌曲: {best_match}")
                 await play_local_music(conn, specific_file=best_match)
@@ -191,7 +292,6 @@ def _get_random_play_prompt(song_name):
 
 
 async def play_local_music(conn, specific_file=None):
-    global MUSIC_CACHE
     """播放本地音乐文件"""
     try:
         if not os.path.exists(MUSIC_CACHE["music_dir"]):
@@ -1,11 +1,24 @@
+import os
+import json
+import threading
 import importlib
 import pkgutil
+from config.config_loader import get_project_dir
 from config.logger import setup_logging
+from plugins_func.register import all_function_registry, FunctionItem, ToolType
 
 TAG = __name__
 
 logger = setup_logging()
 
+# 插件清单缓存文件，记录每个插件函数的名称、描述和所在模块
+PLUGIN_MANIFEST_PATH = get_project_dir() + "data/.plugin_manifest.json"
+PLUGIN_MANIFEST_VERSION = 1
+
+_loaded_packages = set()
+_load_lock = threading.Lock()
+
+
 def auto_import_modules(package_name):
     """
     自动导入指定包内的所有模块。
@@ -22,4 +35,156 @@ def auto_import_modules(package_name):
         # 导入模块
         full_module_name = f"{package_name}.{module_name}"
         importlib.import_module(full_module_name)
-        #logger.bind(tag=TAG).info(f"模块 '{full_module_name}' 已加载")
\ No newline at end of file
+        #logger.bind(tag=TAG).info(f"模块 '{full_module_name}' 已加载")
+
+
+class _LazyPluginAttr:
+    """插件函数的延迟加载代理，首次调用时才导入插件模块"""
+
+    def __init__(self, module_name, func_name, attr):
+        self.module_name = module_name
+        self.func_name = func_name
+        self.attr = attr
+
+    def __call__(self, *args, **kwargs):
+        # 导入模块时register_function会用真实的函数覆盖注册表中的延迟项
+        importlib.import_module(self.module_name)
+        func_item = all_function_registry.get(self.func_name)
+        target = getattr(func_item, self.attr, None)
+        if target is None or isinstance(target, _LazyPluginAttr):
+            raise RuntimeError(
+                f"插件模块 {self.module_name} 中未找到函数 {self.func_name}"
+            )
+        return target(*args, **kwargs)
+
+
+def _get_package_fingerprint(package_name):
+    """插件源码的指纹，任意插件文件新增、删除或修改后清单失效"""
+    package = importlib.import_module(package_name)
+    fingerprint = []
+    for _, module_name, _ in pkgutil.iter_modules(package.__path__):
+        for path in package.__path__:
+            file_path = os.path.join(path, module_name + ".py")
+            if os.path.exists(file_path):
+                stat = os.stat(file_path)
+                fingerprint.append([module_name, stat.st_mtime_ns, stat.st_size])
+                break
+        else:
+            fingerprint.append([module_name, 0, 0])
+    return fingerprint
+
+
+def _read_manifest(package_name, fingerprint):
+    """读取与当前插件源码匹配的清单，不匹配时返回None"""
+    if not os.path.exists(PLUGIN_MANIFEST_PATH):
+        return None
+    try:
+        with open(PLUGIN_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.bind(tag=TAG).warning(f"读取插件清单失败: {e}")
+        return None
+    package_manifest = manifest.get("packages", {}).get(package_name)
+    if (
+        manifest.get("version") != PLUGIN_MANIFEST_VERSION
+        or not package_manifest
+        or package_manifest.get("fingerprint") != fingerprint
+    ):
+        return None
+    return package_manifest.get("functions", [])
+
+
+def _write_manifest(package_name, fingerprint):
+    """根据已导入的插件生成清单并写入磁盘"""
+    functions = []
+    for name, func_item in all_function_registry.items():
+        module_name = getattr(func_item.func, "__module__", "") or ""
+        if not module_name.startswith(package_name + "."):
+            continue
+        functions.append(
+            {
+                "name": name,
+                "description": func_item.description,
+                "module": module_name,
+                "type": func_item.type.name if func_item.type else None,
+                "order_sensitive": func_item.order_sensitive,
+                "timeout": func_item.timeout,
+                "cache_ttl": func_item.cache_ttl,
+                "has_cache_key": func_item.cache_key is not None,
+                "cache_invalidates": func_item.cache_invalidates,
+            }
+        )
+
+    manifest = {"version": PLUGIN_MANIFEST_VERSION, "packages": {}}
+    try:
+        if os.path.exists(PLUGIN_MANIFEST_PATH):
+            with open(PLUGIN_MANIFEST_PATH, "r", encoding="utf-8") as f:
+                old_manifest = json.load(f)
+            if old_manifest.get("version") == PLUGIN_MANIFEST_VERSION:
+                manifest["packages"] = old_manifest.get("packages", {})
+    except Exception:
+        pass
+    manifest["packages"][package_name] = {
+        "fingerprint": fingerprint,
+        "functions": functions,
+    }
+
+    try:
+        os.makedirs(os.path.dirname(PLUGIN_MANIFEST_PATH), exist_ok=True)
+        tmp_path = PLUGIN_MANIFEST_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, PLUGIN_MANIFEST_PATH)
+        logger.bind(tag=TAG).info(f"插件清单已生成，共 {len(functions)} 个函数")
+    except Exception as e:
+        logger.bind(tag=TAG).warning(f"写入插件清单失败: {e}")
+
+
+def _register_lazy_functions(functions):
+    """根据清单注册延迟加载的插件函数，已导入的插件保持不变"""
+    for entry in functions:
+        name = entry["name"]
+        if name in all_function_registry:
+            continue
+        module_name = entry["module"]
+        all_function_registry[name] = FunctionItem(
+            name,
+            entry["description"],
+            _LazyPluginAttr(module_name, name, "func"),
+            ToolType[entry["type"]] if entry.get("type") else None,
+            entry.get("order_sensitive", False),
+            entry.get("timeout"),
+            entry.get("cache_ttl"),
+            (
+                _LazyPluginAttr(module_name, name, "cache_key")
+                if entry.get("has_cache_key")
+                else None
+            ),
+            entry.get("cache_invalidates"),
+        )
+
+
+def load_plugin_registry(package_name):
+    """
+    加载插件函数注册表。
+
+    插件清单与源码匹配时只注册清单中的函数描述，插件模块在首次调用时才导入；
+    否则导入全部插件模块并重新生成清单。同一进程内重复调用直接返回。
+
+    Args:
+        package_name (str): 包的名称，如 'plugins_func.functions'。
+    """
+    if package_name in _loaded_packages:
+        return
+    with _load_lock:
+        if package_name in _loaded_packages:
+            return
+        fingerprint = _get_package_fingerprint(package_name)
+        functions = _read_manifest(package_name, fingerprint)
+        if functions is not None:
+            _register_lazy_functions(functions)
+            logger.bind(tag=TAG).debug(f"已从插件清单加载 {len(functions)} 个函数")
+        else:
+            auto_import_modules(package_name)
+            _write_manifest(package_name, fingerprint)
+        _loaded_packages.add(package_name)
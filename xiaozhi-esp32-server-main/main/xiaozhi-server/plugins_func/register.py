@@ -42,11 +42,27 @@ class ActionResponse:
 
 
 class FunctionItem:
-    def __init__(self, name, description, func, type):
+    def __init__(
+        self,
+        name,
+        description,
+        func,
+        type,
+        order_sensitive=False,
+        timeout=None,
+        cache_ttl=None,
+        cache_key=None,
+        cache_invalidates=None,
+    ):
         self.name = name
         self.description = description
         self.func = func
         self.type = type
+        self.order_sensitive = order_sensitive  # 多函数调用时是否需要按声明顺序执行
+        self.timeout = timeout  # 单次调用超时时间(秒)，None表示使用全局配置
+        self.cache_ttl = cache_ttl  # 结果缓存时间(秒)，None表示不缓存
+        self.cache_key = cache_key  # 自定义缓存键函数 (conn, arguments) -> str
+        self.cache_invalidates = cache_invalidates or []  # 调用后需要清除缓存的工具
 
 
 class DeviceTypeRegistry:
@@ -79,11 +95,38 @@ class DeviceTypeRegistry:
 all_function_registry = {}
 
 
-def register_function(name, desc, type=None):
-    """注册函数到函数注册字典的装饰器"""
+def register_function(
+    name,
+    desc,
+    type=None,
+    order_sensitive=False,
+    timeout=None,
+    cache_ttl=None,
+    cache_key=None,
+    cache_invalidates=None,
+):
+    """注册函数到函数注册字典的装饰器
+
+    Args:
+        order_sensitive: 一次回复中有多个函数调用时，是否需要按声明顺序串行执行
+        timeout: 单次调用超时时间(秒)，不传则使用全局的tool_call.timeout配置
+        cache_ttl: 结果在所有连接间共享缓存的时间(秒)，有副作用的函数不要设置
+        cache_key: 自定义缓存键函数 (conn, arguments) -> str，返回None表示本次不缓存
+        cache_invalidates: 调用后需要清除缓存的函数名列表，如写入数据后清除对应查询的缓存
+    """
 
     def decorator(func):
-        all_function_registry[name] = FunctionItem(name, desc, func, type)
+        all_function_registry[name] = FunctionItem(
+            name,
+            desc,
+            func,
+            type,
+            order_sensitive,
+            timeout,
+            cache_ttl,
+            cache_key,
+            cache_invalidates,
+        )
         logger.bind(tag=TAG).debug(f"函数 '{name}' 已加载，可以注册使用")
         return func
 
@@ -0,0 +1,18 @@
+"""单元测试公共配置
+
+测试直接使用仓库中的默认配置config.yaml，不依赖data/.config.yaml。
+"""
+
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from config import config_loader, settings  # noqa: E402
+
+config_loader._config_cache = config_loader.read_config(
+    os.path.join(SERVER_DIR, "config.yaml")
+)
+settings.config_file_valid = True
@@ -0,0 +1,101 @@
+"""使用本地模拟的Home Assistant websocket服务测试HomeAssistantClient"""
+
+import json
+import asyncio
+import websockets
+from core.utils.hass_client import HomeAssistantClient
+
+API_KEY = "test-token"
+
+STATES = [
+    {
+        "entity_id": "light.living_room",
+        "state": "off",
+        "attributes": {"friendly_name": "客厅灯"},
+    },
+    {
+        "entity_id": "sensor.temperature",
+        "state": "22",
+        "attributes": {"friendly_name": "温度"},
+    },
+]
+
+
+class FakeHomeAssistant:
+    """只实现客户端用到的消息的Home Assistant websocket服务"""
+
+    def __init__(self):
+        self.service_calls = []
+        self.connections = 0
+
+    async def handler(self, websocket):
+        self.connections += 1
+        await websocket.send(json.dumps({"type": "auth_required"}))
+        auth = json.loads(await websocket.recv())
+        if auth.get("access_token") != API_KEY:
+            await websocket.send(json.dumps({"type": "auth_invalid"}))
+            return
+        await websocket.send(json.dumps({"type": "auth_ok"}))
+        async for raw in websocket:
+            message = json.loads(raw)
+            await self.handle(websocket, message)
+
+    async def handle(self, websocket, message):
+        message_type = message["type"]
+        result = None
+        if message_type == "get_states":
+            result = STATES
+        elif message_type == "config/area_registry/list":
+            result = [{"area_id": "living", "name": "客厅"}]
+        elif message_type == "config/device_registry/list":
+            result = [{"id": "dev1", "area_id": "living"}]
+        elif message_type == "config/entity_registry/list":
+            result = [{"entity_id": "light.living_room", "device_id": "dev1"}]
+        elif message_type == "call_service":
+            self.service_calls.append(message)
+        reply = {"id": message["id"], "type": "result", "success": True}
+        await websocket.send(json.dumps({**reply, "result": result}))
+        if message_type == "call_service":
+            # 和真实的Home Assistant一样，服务调用后推送状态变化事件
+            new_state = dict(STATES[0], state="on")
+            event = {
+                "event_type": "state_changed",
+                "data": {"entity_id": new_state["entity_id"], "new_state": new_state},
+            }
+            await websocket.send(json.dumps({"type": "event", "event": event}))
+
+
+async def _run_client(fake: FakeHomeAssistant):
+    async with websockets.serve(fake.handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        client = HomeAssistantClient(f"http://127.0.0.1:{port}", API_KEY)
+        client.start()
+        try:
+            await asyncio.wait_for(client.ready.wait(), timeout=5)
+            assert client.get_state("light.living_room")["state"] == "off"
+            assert client.get_devices() == ["客厅,客厅灯,light.living_room"]
+
+            await client.call_service(
+                "light", "turn_on", {"entity_id": "light.living_room"}
+            )
+            for _ in range(50):
+                if client.get_state("light.living_room")["state"] == "on":
+                    break
+                await asyncio.sleep(0.01)
+            assert client.get_state("light.living_room")["state"] == "on"
+            assert fake.service_calls[0]["domain"] == "light"
+            assert fake.service_calls[0]["service"] == "turn_on"
+            # 查询和服务调用复用同一条连接
+            assert fake.connections == 1
+        finally:
+            await client.close()
+
+
+def test_state_mirror_and_call_service():
+    asyncio.run(_run_client(FakeHomeAssistant()))
+
+
+def test_start_without_running_loop():
+    client = HomeAssistantClient("http://127.0.0.1:1", API_KEY)
+    client.start()
+    assert client.connection_task is None
@@ -0,0 +1,102 @@
+"""使用本地aiohttp服务测试TTS共享连接池的连接复用、并发限制和预热"""
+
+import asyncio
+from aiohttp import web
+from core.utils.http_client import AsyncHttpClient
+
+
+class StandInServer:
+    """记录客户端连接端口和同时处理的请求数的本地HTTP服务"""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.ports = []
+        self.methods = []
+        self.inflight = 0
+        self.max_inflight = 0
+        self.runner = None
+        self.url = None
+
+    async def handler(self, request):
+        self.ports.append(request.transport.get_extra_info("peername")[1])
+        self.methods.append(request.method)
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(self.delay)
+            return web.Response(body=b"audio")
+        finally:
+            self.inflight -= 1
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/", self.handler)
+        app.router.add_post("/tts", self.handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.runner.cleanup()
+
+
+def test_connection_reuse():
+    async def run():
+        client = AsyncHttpClient()
+        async with StandInServer() as server:
+            try:
+                for _ in range(5):
+                    response = await client.post(server.url + "tts")
+                    assert response.content == b"audio"
+            finally:
+                await client.close()
+        # 顺序请求复用同一条keep-alive连接
+        assert len(server.ports) == 5
+        assert len(set(server.ports)) == 1
+
+    asyncio.run(run())
+
+
+def test_limiter_caps_concurrency():
+    async def run():
+        client = AsyncHttpClient()
+
+        async def request(url):
+            async with client.limiter("tts", 3):
+                return await client.post(url)
+
+        async with StandInServer(delay=0.05) as server:
+            try:
+                responses = await asyncio.gather(
+                    *(request(server.url + "tts") for _ in range(10))
+                )
+            finally:
+                await client.close()
+        assert all(response.ok for response in responses)
+        assert server.max_inflight == 3
+        # 同一key共享同一个信号量，之后传入的limit不会改变已创建的上限
+        assert client.limiter("tts", 5) is client.limiter("tts", 3)
+
+    asyncio.run(run())
+
+
+def test_warmup_opens_reusable_connection():
+    async def run():
+        client = AsyncHttpClient()
+        async with StandInServer() as server:
+            try:
+                await client.warmup(server.url + "tts")
+                # keep-alive期间同一主机不重复预热
+                await client.warmup(server.url + "tts")
+                await client.post(server.url + "tts")
+            finally:
+                await client.close()
+        assert server.methods == ["HEAD", "POST"]
+        # 正式请求使用预热时建立的连接
+        assert server.ports[0] == server.ports[1]
+
+    asyncio.run(run())